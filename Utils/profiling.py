@@ -0,0 +1,259 @@
+"""
+Instrumentation for the hot paths of track generation and the other modules.
+Records counters and wall time for named phases into a global report, with
+optional hooks for cProfile or pyinstrument, and provides the leveled logger
+used in place of print statements.
+
+Instrumentation is disabled by default, in which case timer() and count() do
+nothing so they can be left in the hot paths.
+"""
+
+# Import packages
+import io
+import time
+import pstats
+import logging
+import cProfile
+import contextlib
+
+# Logger constants
+LOGGER_NAME = "LapSpinCrapSim"          # Name of the parent logger of all the module loggers
+LOG_LEVEL_DEFAULT = logging.INFO        # Default log level - per-gate messages are logged at DEBUG so are hidden by default
+LOG_FORMAT = "%(message)s"              # Format of the logged messages, matching the print statements they replaced
+
+# Profiling constants
+PROFILE_STATS_LINES = 30                # Number of lines of the cProfile statistics to print, sorted by cumulative time
+
+# Global dictionary storing the profiling data - see getReport() for the structure of the report
+PROFILE_DICT = {
+    'Enabled': False,
+    'Timers': {},                       # Phase name -> [number of calls, total wall time in seconds]
+    'Counters': {},                     # Counter name -> count
+}
+
+
+class _PrintHandler(logging.Handler):
+    """
+    Logging handler which prints the formatted messages, so they go to the
+    current sys.stdout like the print statements the logger replaced.
+    """
+    def emit(self,
+             record: logging.LogRecord) -> None:
+        print(self.format(record))
+
+
+class _NullTimer:
+    """
+    Context manager that does nothing, returned by timer() when profiling is
+    disabled so the timed code has no overhead beyond the with statement.
+    """
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+
+    def __exit__(self, *args) -> None:
+        return None
+
+
+class _PhaseTimer:
+    """
+    Context manager that adds the wall time of the timed code to the phase in
+    PROFILE_DICT.
+    """
+    __slots__ = ('name', 'startTime')
+
+    def __init__(self,
+                 name: str) -> None:
+        self.name = name
+        self.startTime = 0.0
+
+
+    def __enter__(self) -> None:
+        self.startTime = time.perf_counter()
+
+
+    def __exit__(self, *args) -> None:
+        elapsed = time.perf_counter() - self.startTime
+        phase = PROFILE_DICT['Timers'].setdefault(self.name, [0, 0.0])
+        phase[0] += 1
+        phase[1] += elapsed
+
+
+NULL_TIMER = _NullTimer()
+
+
+def getLogger(name: str) -> logging.Logger:
+    """
+    Gets the logger for a module, as a child of the LapSpinCrapSim logger so
+    setLogLevel() applies to all modules.
+
+    Args:
+        name: Name of the module, e.g. __name__.
+
+    Returns:
+        Logger for the module.
+    """
+    return logging.getLogger(LOGGER_NAME + "." + name)
+
+
+def setLogLevel(level: int | str) -> None:
+    """
+    Sets the level of the LapSpinCrapSim logger, e.g. logging.DEBUG to show the
+    per-gate messages during gate creation or logging.WARNING to hide the
+    progress messages.
+
+    Args:
+        level: Logging level, as an int or its name.
+    """
+    logging.getLogger(LOGGER_NAME).setLevel(level)
+
+
+def enable() -> None:
+    """
+    Enables recording of the timers and counters.
+    """
+    PROFILE_DICT['Enabled'] = True
+
+
+def disable() -> None:
+    """
+    Disables recording of the timers and counters. Recorded data is kept until
+    reset() is called.
+    """
+    PROFILE_DICT['Enabled'] = False
+
+
+def reset() -> None:
+    """
+    Clears all the recorded timers and counters.
+    """
+    PROFILE_DICT['Timers'].clear()
+    PROFILE_DICT['Counters'].clear()
+
+
+def timer(name: str) -> _PhaseTimer | _NullTimer:
+    """
+    Creates a context manager which records the wall time and number of calls
+    of the code within it under the phase name.
+
+    Args:
+        name: Name of the phase.
+
+    Returns:
+        Context manager to time the phase, or one that does nothing if
+        profiling is disabled.
+    """
+    return _PhaseTimer(name) if PROFILE_DICT['Enabled'] else NULL_TIMER
+
+
+def count(name: str,
+          n: int = 1) -> None:
+    """
+    Increments the counter of the name by n.
+
+    Args:
+        name: Name of the counter.
+        n: Amount to increment the counter by.
+    """
+    if PROFILE_DICT['Enabled']:
+        PROFILE_DICT['Counters'][name] = PROFILE_DICT['Counters'].get(name, 0) + n
+
+
+def getReport() -> dict:
+    """
+    Creates a structured report of the recorded timers and counters.
+
+    Note the timers and counters of code run in worker processes (e.g. the
+    sectors of sectorised gate creation) are not recorded.
+
+    Returns:
+        Dictionary of {'Timers': {name: {'Calls', 'TotalTime', 'MeanTime'}},
+        'Counters': {name: count}}, with times in seconds and the timers sorted
+        by total time in descending order.
+    """
+    timers = sorted(PROFILE_DICT['Timers'].items(), key=lambda item: item[1][1], reverse=True)
+    return {
+        'Timers': {name: {'Calls': calls, 'TotalTime': totalTime, 'MeanTime': totalTime / calls} for name, (calls, totalTime) in timers},
+        'Counters': dict(PROFILE_DICT['Counters']),
+    }
+
+
+def formatReport(report: dict | None = None) -> str:
+    """
+    Formats the report as a table of the timers followed by the counters.
+
+    Args:
+        report: Report as returned by getReport(). Defaults to the current
+            report.
+
+    Returns:
+        String of the formatted report.
+    """
+    report = getReport() if report is None else report
+    lines = [f"{'Phase':<32}{'Calls':>10}{'Total (s)':>12}{'Mean (ms)':>12}"]
+    for name, phase in report['Timers'].items():
+        lines.append(f"{name:<32}{phase['Calls']:>10}{phase['TotalTime']:>12.4f}{phase['MeanTime'] * 1e3:>12.4f}")
+    lines.append(f"{'Counter':<32}{'Count':>10}")
+    for name, n in report['Counters'].items():
+        lines.append(f"{name:<32}{n:>10}")
+    return "\n".join(lines)
+
+
+@contextlib.contextmanager
+def codeProfiler(method: str = 'cProfile',
+                 outputPath: str | None = None):
+    """
+    Context manager which enables the timers and counters and profiles the
+    code within it with cProfile or pyinstrument (optional dependency). The
+    profile is printed when the context exits, along with the report.
+
+    Args:
+        method: 'cProfile' or 'pyinstrument'.
+        outputPath: If provided, the cProfile statistics are dumped to this
+            path (for snakeviz etc.), or the pyinstrument HTML is saved to it.
+    """
+    if method == 'cProfile':
+        profiler = cProfile.Profile()
+    elif method == 'pyinstrument':
+        try:
+            import pyinstrument
+        except ImportError:
+            raise Exception("pyinstrument is not installed - install it or use method='cProfile'")
+        profiler = pyinstrument.Profiler()
+    else:
+        raise Exception("Invalid profiling method " + str(method) + " - must be 'cProfile' or 'pyinstrument'")
+
+    wasEnabled = PROFILE_DICT['Enabled']
+    enable()
+    if method == 'cProfile':
+        profiler.enable()
+    else:
+        profiler.start()
+    try:
+        yield profiler
+    finally:
+        PROFILE_DICT['Enabled'] = wasEnabled
+        if method == 'cProfile':
+            profiler.disable()
+            statsStream = io.StringIO()
+            pstats.Stats(profiler, stream=statsStream).sort_stats('cumulative').print_stats(PROFILE_STATS_LINES)
+            print(statsStream.getvalue())
+            if outputPath is not None:
+                profiler.dump_stats(outputPath)
+        else:
+            profiler.stop()
+            print(profiler.output_text())
+            if outputPath is not None:
+                with open(outputPath, 'w') as f:
+                    f.write(profiler.output_html())
+        print(formatReport())
+
+
+# Set up the parent logger to print the messages like the print statements it replaced
+_handler = _PrintHandler()
+_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+logging.getLogger(LOGGER_NAME).addHandler(_handler)
+logging.getLogger(LOGGER_NAME).setLevel(LOG_LEVEL_DEFAULT)
+logging.getLogger(LOGGER_NAME).propagate = False
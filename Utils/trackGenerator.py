@@ -0,0 +1,335 @@
+"""
+Procedural generation of track limits, for testing the track and trajectory
+modules at realistic point densities without surveyed data.
+
+Layouts are composed from segments of linearly varying curvature, which covers
+straights, constant radius arcs and clothoids. Each segment is a tuple of
+(sLength, kStart, kEnd) - see getStraight(), getArc(), getClothoid() and
+getCorner() to create them. The heading along a segment is integrated exactly
+and the coordinates are computed with vectorised operations written into
+preallocated arrays, so million point limits take milliseconds.
+"""
+
+# Import packages
+from collections.abc import Callable
+import numpy as np
+
+# Import project python files
+from Utils.typeAliases import *
+
+# Generator constants
+CLOSED_HEADING_TOLERANCE = 1e-6         # Tolerance in radians of the total heading change of closed layouts from a multiple of 2 pi
+
+
+def getStraight(sLength: float) -> tuple[float, float, float]:
+    """
+    Creates a straight segment.
+
+    Args:
+        sLength: Length of the straight.
+
+    Returns:
+        Segment tuple of (sLength, kStart, kEnd).
+    """
+    return (sLength, 0, 0)
+
+
+def getArc(radius: float,
+           AAngle: float) -> tuple[float, float, float]:
+    """
+    Creates a constant radius arc segment.
+
+    Args:
+        radius: Radius of the arc.
+        AAngle: Angle turned through by the arc - positive for a left turn and
+            negative for a right turn.
+
+    Returns:
+        Segment tuple of (sLength, kStart, kEnd).
+    """
+    k = np.sign(AAngle) / radius
+    return (radius * abs(AAngle), k, k)
+
+
+def getClothoid(sLength: float,
+                kStart: float,
+                kEnd: float) -> tuple[float, float, float]:
+    """
+    Creates a clothoid segment, where the curvature varies linearly with
+    distance.
+
+    Args:
+        sLength: Length of the clothoid.
+        kStart: Curvature at the start of the clothoid.
+        kEnd: Curvature at the end of the clothoid.
+
+    Returns:
+        Segment tuple of (sLength, kStart, kEnd).
+    """
+    return (sLength, kStart, kEnd)
+
+
+def getCorner(radius: float,
+              AAngle: float,
+              sTransition: float = 0) -> list[tuple[float, float, float]]:
+    """
+    Creates the segments of a corner made of an arc with clothoid transitions
+    to and from a straight. The arc is shortened so the corner turns through
+    the full angle.
+
+    Args:
+        radius: Radius of the arc.
+        AAngle: Angle turned through by the corner - positive for a left turn
+            and negative for a right turn.
+        sTransition: Length of each clothoid transition.
+
+    Returns:
+        List of segment tuples of the corner.
+    """
+    k = np.sign(AAngle) / radius
+    sArc = radius * abs(AAngle) - sTransition
+    if sArc < 0:
+        raise Exception("Transition length " + str(sTransition) + " too long for a corner of radius " + str(radius) + " and angle " + str(AAngle))
+    if sTransition == 0:
+        return [(sArc, k, k)]
+    return [(sTransition, 0, k), (sArc, k, k), (sTransition, k, 0)]
+
+
+def getSinusoidalElevation(hAmplitude: float,
+                           nPeriods: int = 1,
+                           APhase: float = 0) -> Callable[[NDArrayFloat1D, float], NDArrayFloat1D]:
+    """
+    Creates a sinusoidal elevation profile with a whole number of periods over
+    the layout, so it is continuous for closed layouts. With the default phase,
+    the elevation peaks at the start.
+
+    Args:
+        hAmplitude: Amplitude of the elevation.
+        nPeriods: Number of periods over the layout.
+        APhase: Phase of the sinusoid in radians.
+
+    Returns:
+        Elevation profile function of (sCentre, sTotal), see getElevation().
+    """
+    def elevation(sCentre: NDArrayFloat1D,
+                  sTotal: float) -> NDArrayFloat1D:
+        return hAmplitude * np.cos(2 * np.pi * nPeriods * sCentre / sTotal + APhase)
+
+    return elevation
+
+
+def getElevation(sCentre: NDArrayFloat1D,
+                 sTotal: float,
+                 elevation: Callable[[NDArrayFloat1D, float], NDArrayFloat1D] | NDArrayFloat2D | None,
+                 isClosed: bool) -> NDArrayFloat1D:
+    """
+    Evaluates an elevation profile along the centreline.
+
+    Args:
+        sCentre: Distances along the centreline.
+        sTotal: Total length of the layout.
+        elevation: Elevation profile, either None for a flat layout, a
+            function of (sCentre, sTotal) returning the elevations, or a 2D
+            array of [s, h] breakpoints which are linearly interpolated
+            (periodically for closed layouts).
+        isClosed: Whether the layout is closed.
+
+    Returns:
+        Elevations at the distances along the centreline.
+    """
+    if elevation is None:
+        return np.zeros_like(sCentre)
+    if callable(elevation):
+        return elevation(sCentre, sTotal)
+    elevation = np.asarray(elevation, dtype=float)
+    return np.interp(sCentre, elevation[:, 0], elevation[:, 1], period=sTotal if isClosed else None)
+
+
+def getCentreline(segments: list[tuple[float, float, float]],
+                  pointSpacing: float,
+                  isClosed: bool,
+                  startCoord: tuple[float, float] = (0, 0),
+                  AStart: float = 0) -> tuple[NDArrayFloat2D, NDArrayFloat2D, NDArrayFloat1D, float]:
+    """
+    Creates the centreline of a layout from its segments, with points evenly
+    spaced along it.
+
+    The heading is the integral of the linearly varying curvature of each
+    segment (evaluated exactly), and the centreline is the integral of the
+    heading using the trapezoidal rule on the direction vectors. For closed
+    layouts, the segments must turn through a multiple of 2 pi and the small
+    remaining gap between the start and end of the centreline is distributed
+    linearly along it.
+
+    Args:
+        segments: List of segment tuples of (sLength, kStart, kEnd).
+        pointSpacing: Approximate distance between points along the
+            centreline (exact distance is the total length divided by the
+            number of steps).
+        isClosed: Whether the layout is closed.
+        startCoord: [x, y] coordinate of the start of the centreline.
+        AStart: Heading at the start of the centreline in radians.
+
+    Returns:
+        Tuple of (centre, direction, sCentre, sTotal).
+
+        centre: 2D array where each index is an [x, y] coordinate of the
+        centreline. Closed layouts don't repeat the first coordinate.
+
+        direction: 2D array of the unit [x, y] direction of the centreline at
+        each point.
+
+        sCentre: Distance along the centreline of each point.
+
+        sTotal: Total length of the layout.
+    """
+    segments = np.asarray(segments, dtype=float).reshape(-1, 3)
+    sLengths, kStarts, kEnds = segments.T
+    sSegmentEnds = np.cumsum(sLengths)
+    sSegmentStarts = sSegmentEnds - sLengths
+    sTotal = sSegmentEnds[-1]
+    ASegmentStarts = AStart + np.concat(([0], np.cumsum((kStarts + kEnds) / 2 * sLengths)))
+    if isClosed:
+        ATotal = ASegmentStarts[-1] - AStart
+        if abs(ATotal - 2 * np.pi * np.round(ATotal / (2 * np.pi))) > CLOSED_HEADING_TOLERANCE:
+            raise Exception("Segments of a closed layout must turn through a multiple of 2 pi, but turn through " + str(ATotal))
+
+    # Evenly spaced points and the index range of the points on each segment
+    nPoints = max(int(np.ceil(sTotal / pointSpacing)), 1) + 1
+    sStep = sTotal / (nPoints - 1)
+    sCentre = np.arange(nPoints) * sStep
+    segmentEndIndexes = np.searchsorted(sCentre, sSegmentEnds, side='right')
+    segmentEndIndexes[-1] = nPoints
+
+    # Direction of the points on each segment from the heading (quadratic in the distance along the segment), written into the preallocated
+    # arrays - straights have a constant direction so skip the trigonometric functions, which dominate the time for large numbers of points
+    AHeading = np.empty(nPoints)
+    direction = np.empty((nPoints, 2))
+    segmentStartIndex = 0
+    for i, segmentEndIndex in enumerate(segmentEndIndexes):
+        segmentSlice = slice(segmentStartIndex, segmentEndIndex)
+        segmentStartIndex = segmentEndIndex
+        if kStarts[i] == 0 and kEnds[i] == 0:
+            direction[segmentSlice] = [np.cos(ASegmentStarts[i]), np.sin(ASegmentStarts[i])]
+            continue
+        sSegment = AHeading[segmentSlice]
+        np.subtract(sCentre[segmentSlice], sSegmentStarts[i], out=sSegment)
+        AHeading[segmentSlice] = ASegmentStarts[i] + sSegment * (kStarts[i] + (kEnds[i] - kStarts[i]) / (2 * sLengths[i]) * sSegment)
+        np.cos(AHeading[segmentSlice], out=direction[segmentSlice, 0])
+        np.sin(AHeading[segmentSlice], out=direction[segmentSlice, 1])
+
+    # Integrate the direction vectors for the centreline
+    centre = np.empty((nPoints, 2))
+    centre[0] = startCoord
+    np.add(direction[1:], direction[:-1], out=centre[1:])
+    centre[1:] *= sStep / 2
+    np.cumsum(centre, axis=0, out=centre)
+
+    if isClosed:
+        gap = (centre[-1] - centre[0]) / sTotal
+        centre[:, 0] -= sCentre * gap[0]
+        centre[:, 1] -= sCentre * gap[1]
+        return centre[:-1], direction[:-1], sCentre[:-1], sTotal
+    return centre, direction, sCentre, sTotal
+
+
+def getLimitsFromSegments(segments: list[tuple[float, float, float]],
+                          pointSpacing: float,
+                          lTrackWidth: float,
+                          isClosed: bool,
+                          elevation: Callable[[NDArrayFloat1D, float], NDArrayFloat1D] | NDArrayFloat2D | None = None,
+                          startCoord: tuple[float, float] = (0, 0),
+                          AStart: float = 0) -> tuple[NDArrayFloat2D, NDArrayFloat2D]:
+    """
+    Creates the left and right track limits of a layout from its segments,
+    offset by half the track width either side of the centreline (see
+    getCentreline()).
+
+    Args:
+        segments: List of segment tuples of (sLength, kStart, kEnd).
+        pointSpacing: Approximate distance between points along the
+            centreline.
+        lTrackWidth: Width of the track.
+        isClosed: Whether the layout is closed.
+        elevation: Elevation profile along the centreline, see getElevation().
+        startCoord: [x, y] coordinate of the start of the centreline.
+        AStart: Heading at the start of the centreline in radians.
+
+    Returns:
+        Tuple of (left, right).
+
+        left: 2D array where each index is an [x, y, z] coordinate of the left
+        track limits. Closed layouts don't repeat the first coordinate.
+
+        right: 2D array of the right track limits, in the same format.
+    """
+    centre, direction, sCentre, sTotal = getCentreline(segments, pointSpacing, isClosed, startCoord, AStart)
+
+    # Offset the centreline by half the track width along the left normal [-y, x] of the direction for the left limits, and back for the right
+    nPoints = np.size(centre, 0)
+    left = np.empty((nPoints, 3))
+    right = np.empty((nPoints, 3))
+    offset = np.multiply(direction[:, 1], lTrackWidth / 2)
+    np.subtract(centre[:, 0], offset, out=left[:, 0])
+    np.add(centre[:, 0], offset, out=right[:, 0])
+    np.multiply(direction[:, 0], lTrackWidth / 2, out=offset)
+    np.add(centre[:, 1], offset, out=left[:, 1])
+    np.subtract(centre[:, 1], offset, out=right[:, 1])
+    left[:, 2] = getElevation(sCentre, sTotal, elevation, isClosed)
+    right[:, 2] = left[:, 2]
+    return left, right
+
+
+def getOvalLimits(straightLength: float,
+                  cornerRadius: float,
+                  trackWidth: float,
+                  straightStep: float = 5,
+                  cornerPoints: int = 15) -> tuple[NDArrayFloat2D, NDArrayFloat2D]:
+    """
+    Creates the limits of a flat anti-clockwise oval with 2 semicircular
+    corners, starting from the middle of the front straight. The straights are
+    sampled at a fixed step and each corner at a fixed number of points.
+
+    Args:
+        straightLength: Length of the straights.
+        cornerRadius: Radius of the centreline of the corners.
+        trackWidth: Width of the track.
+        straightStep: Distance between points on the straights.
+        cornerPoints: Number of points on each corner.
+
+    Returns:
+        Tuple of (left, right) 2D arrays where each index is an [x, y, z]
+        coordinate of the track limits. The first coordinate isn't repeated.
+    """
+    halfStraightLength = straightLength / 2
+    halfTrackWidth = trackWidth / 2
+    cornerCentreY = cornerRadius + halfTrackWidth
+
+    # Distances along each straight, in the direction of travel
+    startHalfStraight = np.arange(0, halfStraightLength, straightStep)
+    fullStraight = np.arange(halfStraightLength - straightStep, -halfStraightLength, -straightStep)
+    finishHalfStraight = np.arange(-halfStraightLength + straightStep, 0, straightStep)
+
+    # Index ranges of each part in the preallocated arrays
+    nParts = np.cumsum([0, len(startHalfStraight), cornerPoints, len(fullStraight), cornerPoints, len(finishHalfStraight)])
+    left = np.zeros((nParts[-1], 3))
+    right = np.zeros((nParts[-1], 3))
+
+    # Straights
+    for start, end, xStraight, yLeft, yRight in ((nParts[0], nParts[1], startHalfStraight, trackWidth, 0),
+                                                 (nParts[2], nParts[3], fullStraight, 2 * cornerRadius, 2 * cornerRadius + trackWidth),
+                                                 (nParts[4], nParts[5], finishHalfStraight, trackWidth, 0)):
+        left[start:end, 0] = xStraight
+        left[start:end, 1] = yLeft
+        right[start:end, 0] = xStraight
+        right[start:end, 1] = yRight
+
+    # Corners
+    for start, end, thetas, xCentre in ((nParts[1], nParts[2], np.linspace(np.pi, 0, cornerPoints), halfStraightLength),
+                                        (nParts[3], nParts[4], np.linspace(0, -np.pi, cornerPoints), -halfStraightLength)):
+        left[start:end, 0] = np.sin(thetas) * (cornerRadius - halfTrackWidth) + xCentre
+        left[start:end, 1] = np.cos(thetas) * (cornerRadius - halfTrackWidth) + cornerCentreY
+        right[start:end, 0] = np.sin(thetas) * (cornerRadius + halfTrackWidth) + xCentre
+        right[start:end, 1] = np.cos(thetas) * (cornerRadius + halfTrackWidth) + cornerCentreY
+
+    return left, right
@@ -13,3 +13,7 @@ NDArrayFloat1D = np.ndarray[tuple[int], np.dtype[np.floating]]
 NDArrayFloat2D = np.ndarray[tuple[int, int], np.dtype[np.floating]]
 
 NDArrayInt1D = np.ndarray[tuple[int], np.dtype[np.integer]]
+
+NDArrayObject1D = np.ndarray[tuple[int], np.dtype[np.object_]]
+
+NDArrayBool1D = np.ndarray[tuple[int], np.dtype[np.bool_]]
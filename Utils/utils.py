@@ -3,6 +3,7 @@ Collection of helper functions commonly used by the other modules.
 """
 
 # Import packages
+import os
 import time
 import scipy
 import shapely
@@ -11,9 +12,15 @@ import matplotlib.pyplot as plt
 
 # Import project python files
 from typeAliases import *
+from Utils import profiling
 from track import Track
 from trajectory import Trajectory
 
+# Logger for the module
+LOGGER = profiling.getLogger(__name__)
+
+# Cache file constants
+CACHE_VERSION_KEY = 'cacheVersion'      # Name of the array in each .npz cache file storing the cache version it was saved with
 
 def wrap(x: float | NDArrayFloat1D | NDArrayFloat2D,
          lowerBound: float,
@@ -64,21 +71,87 @@ def sideOfLine(xp: float,
     return ((xp - x1) * (y2 - y1)) - ((yp - y1) * (x2 - x1))
 
 
-def rotateVector2D(xyVector: NDArrayFloat1D,
-                   theta: float) -> NDArrayFloat1D:
+def rotateVector2D(xyVector: NDArrayFloat1D | NDArrayFloat2D,
+                   theta: float | NDArrayFloat1D) -> NDArrayFloat1D | NDArrayFloat2D:
     """
-    Rotates the 2D vector anti-clockwise by theta radians.
+    Rotates the 2D vector anti-clockwise by theta radians. Supports NumPy
+    arrays as arguments.
 
     Args:
-        xyVector: NumPy array in the form [x, y] representing the 2D vector.
-        theta: Angle in radians to rotate the vector, anti-clockwise.
+        xyVector: NumPy array in the form [x, y] representing the 2D vector, or
+            2D array where each index is an [x, y] vector.
+        theta: Angle in radians to rotate the vector, anti-clockwise. Can be a
+            1D array of angles to rotate by.
 
     Returns:
         NumPy array in the form [x*, y*] representing the rotated vector.
+
+        If xyVector is a 2D array or theta is a 1D array, returns a 2D array
+        where each index is an [x*, y*] rotated vector, broadcast across the
+        vectors and angles.
     """
     c = np.cos(theta)
     s = np.sin(theta)
-    xyVectorRotated = np.empty(2)
-    xyVectorRotated[0] = (c * xyVector[0]) - (s * xyVector[1])
-    xyVectorRotated[1] = (s * xyVector[0]) + (c * xyVector[1])
-    return xyVectorRotated
+    xyVector = np.asarray(xyVector)
+    xRotated = (c * xyVector[..., 0]) - (s * xyVector[..., 1])
+    yRotated = (s * xyVector[..., 0]) + (c * xyVector[..., 1])
+    return np.stack((xRotated, yRotated), axis=-1)
+
+
+def loadCacheFile(cachePath: str | os.PathLike | None,
+                  names: list[str],
+                  cacheVersion: int,
+                  cacheName: str) -> dict[str, np.ndarray] | None:
+    """
+    Loads the arrays from a .npz cache file saved by saveCacheFile(), e.g. the
+    track, GGV envelope and aero map caches. The cache file is then marked as
+    recently used (for caches which evict their oldest entries).
+
+    Args:
+        cachePath: Path to the cache file, or None if there is no cache folder.
+        names: Names of the arrays to load.
+        cacheVersion: Current version of the cache, cache files saved with a
+            different version aren't loaded.
+        cacheName: Name of the cache for the warning messages, e.g. 'track'.
+
+    Returns:
+        Dictionary of each name to its array.
+
+        None if the cache file does not exist, failed to load or was saved
+        with a different cache version, in which case the cached data needs
+        to be generated again.
+    """
+    if cachePath is None or not os.path.isfile(cachePath):
+        return None
+    try:
+        with np.load(cachePath) as cache:
+            savedVersion = int(cache[CACHE_VERSION_KEY])
+            arrays = {name: cache[name] for name in names}
+    except (OSError, KeyError, ValueError) as e:
+        LOGGER.warning("Failed to load %s cache file %s - %s", cacheName, cachePath, e)
+        return None
+    if savedVersion != cacheVersion:
+        LOGGER.warning("Failed to load %s cache file %s - saved with cache version %d rather than %d", cacheName, cachePath, savedVersion, cacheVersion)
+        return None
+    os.utime(cachePath)
+    return arrays
+
+
+def saveCacheFile(cachePath: str | os.PathLike,
+                  cacheVersion: int,
+                  **arrays: np.ndarray) -> None:
+    """
+    Saves arrays to a .npz cache file with the cache version, to be loaded by
+    loadCacheFile(). The file is written to a temporary file then renamed, so
+    a partially written cache file is never loaded.
+
+    Args:
+        cachePath: Path to the cache file, its folder is created if needed.
+        cacheVersion: Current version of the cache.
+        **arrays: Arrays to save, keyed by their names.
+    """
+    os.makedirs(os.path.dirname(cachePath) or '.', exist_ok=True)
+    tempPath = str(cachePath) + '.tmp'
+    with open(tempPath, 'wb') as f:
+        np.savez(f, **{CACHE_VERSION_KEY: cacheVersion}, **arrays)
+    os.replace(tempPath, cachePath)
@@ -0,0 +1,277 @@
+"""
+Aero maps of the vehicle and their related functions.
+
+An aero map is measured or simulated (e.g. wind tunnel or CFD runs) at
+scattered states of the vehicle, where the state is its ride heights, roll,
+yaw, speed and any wing angles. The map is resampled onto a regular grid once
+(the resampled grid is cached to disk by the hash of the map data), then all
+the aero loads are interpolated for arrays of states at once with a
+single RegularGridInterpolator call, clamped to the edges of the grid so
+states outside the map use the nearest edge of the map.
+"""
+
+# Import packages
+import os
+import math
+import hashlib
+import numpy as np
+import scipy
+
+# Import project python files
+from Utils import utils
+from Utils import profiling
+from Utils.typeAliases import *
+
+# Logger for the aero map module
+LOGGER = profiling.getLogger(__name__)
+
+# Aero map constants
+AERO_MAP_CACHE_FILENAME_FORMAT = "AeroMap_{}.npz"  # Formatted with the hash of the aero map data and grid
+AERO_MAP_CACHE_VERSION = 1              # Included in the aero map cache hash - increment when the resampling changes to invalidate old cache entries
+AERO_MAP_MAX_GRID_POINTS = 2e6          # Maximum number of grid points of the resampled grid (each grid point stores every output)
+AERO_MAP_STATES = ['FrontRideHeight', 'RearRideHeight', 'Roll', 'Yaw', 'Speed']  # State dimensions every aero map has - any other dimensions are wing angles
+AERO_MAP_OUTPUTS = ['FrontDownforce', 'RearDownforce', 'Drag', 'SideForce', 'YawMoment']  # Outputs of the aero map, in row order of the aero loads array
+AERO_MAP_OUTPUT_INDEXES = {name: i for i, name in enumerate(AERO_MAP_OUTPUTS)}  # Row index of each output in the aero loads array
+
+
+def getGridAxes(points: NDArrayFloat2D) -> list[NDArrayFloat1D]:
+    """
+    Gets the grid axes of aero map data from the unique values of each
+    dimension, which is the grid the data was measured on if it was measured
+    as a sweep of each dimension.
+
+    Args:
+        points: 2D array of shape (N, nDimensions) of the states of the data.
+
+    Returns:
+        List of the sorted 1D array of the grid values of each dimension.
+    """
+    return [np.unique(points[:, i]) for i in range(np.size(points, 1))]
+
+
+def resampleToGrid(points: NDArrayFloat2D,
+                   values: NDArrayFloat2D,
+                   gridAxes: list[NDArrayFloat1D]) -> np.ndarray:
+    """
+    Resamples scattered aero map data onto a regular grid.
+
+    If every grid point is in the data the values are placed directly on the
+    grid. Otherwise the values are linearly interpolated from the data (over
+    the dimensions with more than 1 grid value, rescaled so each dimension has
+    the same range) and grid points outside the convex hull of the data use
+    nearest neighbour interpolation.
+
+    The linear interpolation triangulates the scattered data in up to 6
+    dimensions, which is a one-off cost that grows very quickly with the
+    number of data points and dimensions (minutes for a few thousand points in
+    6 dimensions). Cache the resampled grid (see AeroMap) so it's only done
+    once per map.
+
+    Args:
+        points: 2D array of shape (N, nDimensions) of the states of the data.
+        values: 2D array of shape (N, nOutputs) of the outputs of the data.
+        gridAxes: List of the sorted 1D array of the grid values of each
+            dimension.
+
+    Returns:
+        Array of shape (len(gridAxes[0]), ..., len(gridAxes[-1]), nOutputs)
+        of the outputs at the grid points.
+    """
+    gridShape = tuple(np.size(axis) for axis in gridAxes)
+    nOutputs = np.size(values, 1)
+    if math.prod(gridShape) > AERO_MAP_MAX_GRID_POINTS:
+        raise Exception("Aero map grid of shape " + str(gridShape) + " has more than " + str(int(AERO_MAP_MAX_GRID_POINTS))
+                        + " grid points - use coarser grid axes")
+
+    # Place the data directly on the grid if it covers every grid point
+    iGrid = []
+    BOnGrid = np.ones(np.size(points, 0), dtype=bool)
+    for i, axis in enumerate(gridAxes):
+        index = np.minimum(np.searchsorted(axis, points[:, i]), np.size(axis) - 1)
+        BOnGrid &= axis[index] == points[:, i]
+        iGrid.append(index)
+    iFlat = np.ravel_multi_index(tuple(iGrid), gridShape)[BOnGrid]
+    if np.size(np.unique(iFlat)) == np.prod(gridShape):
+        table = np.empty((np.prod(gridShape), nOutputs))
+        table[iFlat] = values[BOnGrid]
+        return table.reshape(gridShape + (nOutputs,))
+
+    # Otherwise interpolate the scattered data over the dimensions which vary
+    BActive = np.array([np.size(axis) > 1 for axis in gridAxes])
+    gridPoints = np.stack(np.meshgrid(*gridAxes, indexing='ij'), axis=-1).reshape(-1, len(gridAxes))
+    with profiling.timer('aeroMapResample'):
+        if np.count_nonzero(BActive) == 1:
+            dataCoords, gridCoords = points[:, BActive].ravel(), gridPoints[:, BActive].ravel()
+            order = np.argsort(dataCoords)
+            table = np.column_stack([np.interp(gridCoords, dataCoords[order], values[order, i]) for i in range(nOutputs)])
+        else:
+            linInterp = scipy.interpolate.LinearNDInterpolator(points[:, BActive], values, rescale=True)
+            table = linInterp(gridPoints[:, BActive])
+            BOutside = np.any(np.isnan(table), axis=1)
+            if np.any(BOutside):
+                nnInterp = scipy.interpolate.NearestNDInterpolator(points[:, BActive], values, rescale=True)
+                table[BOutside] = nnInterp(gridPoints[BOutside][:, BActive])
+    return table.reshape(gridShape + (nOutputs,))
+
+
+class AeroMap:
+    """
+    Aero map of a vehicle resampled onto a regular grid, to interpolate the
+    front and rear downforce, drag, side force and aero yaw moment for arrays
+    of vehicle states at once.
+
+    The dimensions of the map are the states in AERO_MAP_STATES plus any
+    number of wing angles, which can be named anything else. States outside
+    the map are clamped to its edges, which is the same as nearest neighbour
+    interpolation along each dimension outside the map.
+
+    The resampled grid can be saved to a cache folder, keyed by the hash of
+    the map data and the grid, and is loaded from it instead of resampled
+    when the same map is used again.
+    """
+    def __init__(self,
+                 points: NDArrayFloat2D,
+                 values: NDArrayFloat2D,
+                 dimensions: list[str],
+                 gridAxes: list[NDArrayFloat1D] | None = None,
+                 cacheDir: str | os.PathLike | None = None) -> None:
+        """
+        Args:
+            points: 2D array of shape (N, len(dimensions)) of the states of the
+                map data.
+            values: 2D array of shape (N, len(AERO_MAP_OUTPUTS)) of the
+                outputs of the map data, with the columns in the order of
+                AERO_MAP_OUTPUTS.
+            dimensions: Names of the dimensions of the states, in column order
+                of points.
+            gridAxes: List of the 1D array of the grid values of each
+                dimension, or None to use the unique values of each dimension
+                of the data, which is only allowed if the data is a complete
+                sweep of every combination of them (otherwise e.g. scattered
+                CFD data would give a grid of up to N^nDimensions points).
+            cacheDir: Path to the aero map cache folder, or None to always
+                resample the map without caching it.
+        """
+        points = np.asarray(points, dtype=float)
+        values = np.asarray(values, dtype=float)
+        if np.ndim(points) != 2 or np.size(points, 1) != len(dimensions):
+            raise Exception("Invalid aero map points shape " + str(np.shape(points)) + " - must be (N, " + str(len(dimensions)) + ")")
+        if np.shape(values) != (np.size(points, 0), len(AERO_MAP_OUTPUTS)):
+            raise Exception("Invalid aero map values shape " + str(np.shape(values)) + " - must be (" + str(np.size(points, 0)) + ", "
+                            + str(len(AERO_MAP_OUTPUTS)) + ")")
+        missingStates = [state for state in AERO_MAP_STATES if state not in dimensions]
+        if len(missingStates) > 0:
+            raise Exception("Aero map is missing the dimensions " + str(missingStates))
+        if len(set(dimensions)) != len(dimensions):
+            raise Exception("Aero map has duplicate dimensions " + str(dimensions))
+
+        self.dimensions = list(dimensions)
+        self.wingAngleDimensions = [dimension for dimension in dimensions if dimension not in AERO_MAP_STATES]
+        if gridAxes is None:
+            self.gridAxes = getGridAxes(points)
+            nGridPoints = math.prod(np.size(axis) for axis in self.gridAxes)
+            if nGridPoints != np.size(np.unique(points, axis=0), 0):
+                raise Exception("Aero map data isn't a complete sweep of its " + str(nGridPoints) + " unique value combinations - gridAxes must be provided")
+        else:
+            self.gridAxes = [np.unique(np.asarray(axis, dtype=float)) for axis in gridAxes]
+        if len(self.gridAxes) != len(dimensions) or all(np.size(axis) < 2 for axis in self.gridAxes):
+            raise Exception("Invalid aero map grid axes - must have 1 axis per dimension and at least 1 axis with more than 1 grid value")
+
+        cachePath = None
+        if cacheDir is not None:
+            cacheHash = hashlib.sha256()
+            for array in [points, values] + self.gridAxes:
+                cacheHash.update(np.ascontiguousarray(array).tobytes())
+            cacheHash.update(repr([self.dimensions, np.shape(points), [np.size(axis) for axis in self.gridAxes], AERO_MAP_CACHE_VERSION]).encode())
+            cachePath = os.path.join(cacheDir, AERO_MAP_CACHE_FILENAME_FORMAT.format(cacheHash.hexdigest()))
+
+        if self.__initFromCache(cachePath):
+            LOGGER.info("Aero map loaded from cache")
+        else:
+            self.table = resampleToGrid(points, values, self.gridAxes)
+            LOGGER.info("Aero map resampled onto a grid of shape %s", np.shape(self.table)[:-1])
+            if cachePath is not None:
+                self.__saveToCache(cachePath)
+        self.__initInterpolator()
+
+
+    def getAeroLoads(self,
+                     states: dict[str, float | NDArrayFloat1D]) -> NDArrayFloat2D:
+        """
+        Interpolates all the aero map outputs at an array of vehicle states.
+
+        Args:
+            states: Dictionary of each dimension name to its value, either a
+                float (e.g. a fixed wing angle) or a 1D array of the value at
+                each state. The arrays are broadcast together.
+
+        Returns:
+            2D array of shape (len(AERO_MAP_OUTPUTS), N) where each row is an
+            output in the order of AERO_MAP_OUTPUTS (see
+            AERO_MAP_OUTPUT_INDEXES) and each column is a state.
+        """
+        missingDimensions = [dimension for dimension in self.dimensions if dimension not in states]
+        if len(missingDimensions) > 0:
+            raise Exception("Aero map states are missing the dimensions " + str(missingDimensions))
+
+        with profiling.timer('aeroMapLookup'):
+            # Clamp the states to the edges of the grid, only for the dimensions the map varies along
+            columns = np.broadcast_arrays(*[np.atleast_1d(np.asarray(states[dimension], dtype=float))
+                                            for dimension, BVarying in zip(self.dimensions, self.BVaryingDimensions) if BVarying])
+            coords = np.minimum(np.maximum(np.column_stack(columns), self.gridLower), self.gridUpper)
+            profiling.count('aeroMapStates', np.size(coords, 0))
+            return self.interpolator(coords).T
+
+
+    def __initInterpolator(self) -> None:
+        """
+        Internal function to create the interpolator of the resampled grid.
+
+        Dimensions with a single grid value (e.g. a wing angle the map was
+        only measured at) are removed from the interpolator, as the map is
+        constant along them.
+        """
+        self.BVaryingDimensions = np.array([np.size(axis) > 1 for axis in self.gridAxes])
+        varyingAxes = [axis for axis in self.gridAxes if np.size(axis) > 1]
+        self.gridLower = np.array([axis[0] for axis in varyingAxes])
+        self.gridUpper = np.array([axis[-1] for axis in varyingAxes])
+        self.interpolator = scipy.interpolate.RegularGridInterpolator(varyingAxes, self.table.reshape(tuple(np.size(axis) for axis in varyingAxes)
+                                                                                                      + (len(AERO_MAP_OUTPUTS),)))
+
+
+    def __initFromCache(self,
+                        cachePath: str | os.PathLike | None) -> bool:
+        """
+        Internal function to load the resampled grid from the aero map cache
+        file at cachePath.
+
+        Args:
+            cachePath: Path to the aero map cache file, or None if there is
+                no cache folder.
+
+        Returns:
+            True if the grid was loaded, False if the cache file does not
+            exist or failed to load, in which case the map needs to be
+            resampled.
+        """
+        cache = utils.loadCacheFile(cachePath, ['table'], AERO_MAP_CACHE_VERSION, 'aero map')
+        if cache is None:
+            return False
+        table = cache['table']
+        if np.shape(table) != tuple(np.size(axis) for axis in self.gridAxes) + (len(AERO_MAP_OUTPUTS),):
+            LOGGER.warning("Failed to load aero map cache file %s - grid shape %s doesn't match the grid axes", cachePath, np.shape(table))
+            return False
+        self.table = table
+        return True
+
+
+    def __saveToCache(self,
+                      cachePath: str | os.PathLike) -> None:
+        """
+        Internal function to save the resampled grid to the aero map cache
+        file at cachePath.
+
+        Args:
+            cachePath: Path to the aero map cache file.
+        """
+        utils.saveCacheFile(cachePath, AERO_MAP_CACHE_VERSION, table=self.table)
@@ -0,0 +1,257 @@
+"""
+Benchmark suite for track generation over synthetic circuits.
+
+Times Track() over parameterised synthetic layouts (ovals, hairpins, chicanes,
+a figure-8 with a bridge and a long 7 km circuit) across gate steps and limits
+point spacings, recording the gates per second and peak memory. The results
+are saved as JSON so that regressions can be compared between commits, e.g.
+
+    python benchmark.py --layouts oval hairpins --gate-steps 10 5
+    python benchmark.py --compare Benchmarks/a.json Benchmarks/b.json
+"""
+
+# Import packages
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import platform
+import tracemalloc
+import subprocess
+import numpy as np
+
+# Import project python files
+from Utils.typeAliases import *
+from Utils import profiling
+from Utils import trackGenerator
+from track import Track
+
+# Benchmark constants
+BENCHMARK_FOLDER = "Benchmarks"                 # Folder the benchmark results are saved to
+BENCHMARK_FILENAME_FORMAT = "Benchmark_{}_{}.json"  # Formatted with the commit hash and the time of the benchmark
+BENCHMARK_GATE_STEPS = [20, 10, 5]              # Default gate steps to benchmark
+BENCHMARK_POINT_SPACINGS = [5, 1]               # Default spacings in metres of the limits points to benchmark
+BENCHMARK_REGRESSION_THRESHOLD = 1.1            # Ratio of time above which a case is flagged as a regression when comparing results
+
+# Synthetic layout constants
+BENCHMARK_LAYOUTS = ['oval', 'hairpins', 'chicanes', 'figure8', 'long7km']  # Names of the synthetic layouts
+LAYOUT_TRACK_WIDTH = 12                         # Width of the synthetic layouts in metres
+LAYOUT_HEIGHT_AMPLITUDE = 5                     # Amplitude in metres of the elevation profile of the layouts with elevation
+
+
+def getLayoutLimits(layout: str,
+                    pointSpacing: float) -> tuple[NDArrayFloat2D, NDArrayFloat2D]:
+    """
+    Creates the limits of a synthetic closed layout.
+
+    Args:
+        layout: Name of the layout, one of BENCHMARK_LAYOUTS.
+        pointSpacing: Approximate distance between the limits points along
+            the centreline.
+
+    Returns:
+        Tuple of (left, right) 2D arrays where each index is an [x, y, z]
+        coordinate of the track limits.
+    """
+    straight, arc, corner = trackGenerator.getStraight, trackGenerator.getArc, trackGenerator.getCorner
+    elevation = None
+    if layout == 'oval':
+        # Oval with 200 m straights and 50 m radius corners
+        segments = [straight(100), arc(50, np.pi), straight(200), arc(50, np.pi), straight(100)]
+    elif layout == 'hairpins':
+        # Long straights joined by 15 m radius hairpins with 30 m clothoid entries and exits
+        hairpin = corner(15, np.pi, 30)
+        segments = [straight(250)] + hairpin + [straight(500)] + hairpin + [straight(250)]
+    elif layout == 'chicanes':
+        # Oval with a left-right-left chicane of 25 m radius arcs in the middle of each straight
+        chicane = [arc(25, np.pi / 4), arc(25, -np.pi / 2), arc(25, np.pi / 4)]
+        segments = [straight(100)] + chicane + [straight(100), arc(60, np.pi), straight(100)] + chicane + [straight(100), arc(60, np.pi)]
+    elif layout == 'figure8':
+        # Figure-8 of two 270 degree loops of 60 m radius joined by straights crossing at 90 degrees, with elevation so the crossover is a bridge
+        segments = [arc(60, 1.5 * np.pi), straight(120), arc(60, -1.5 * np.pi), straight(120)]
+        elevation = trackGenerator.getSinusoidalElevation(LAYOUT_HEIGHT_AMPLITUDE)
+    elif layout == 'long7km':
+        # 7 km point symmetric circuit of long straights with chicanes, pairs of hairpins and 150 m radius sweepers, with elevation
+        chicane = [arc(25, np.pi / 4), arc(25, -np.pi / 2), arc(25, np.pi / 4)]
+        sweeper = corner(150, np.pi / 2, 40)
+        halfSegments = ([straight(800)] + chicane + [straight(800)] + sweeper
+                        + [straight(450)] + corner(40, np.pi, 30) + [straight(200)] + corner(40, -np.pi, 30) + [straight(450)] + sweeper)
+        segments = halfSegments + halfSegments
+        elevation = trackGenerator.getSinusoidalElevation(LAYOUT_HEIGHT_AMPLITUDE)
+    else:
+        raise Exception("Invalid layout " + str(layout) + " - must be one of " + str(BENCHMARK_LAYOUTS))
+    return trackGenerator.getLimitsFromSegments(segments, pointSpacing, LAYOUT_TRACK_WIDTH, True, elevation)
+
+
+def getGitCommit() -> str:
+    """
+    Gets the short hash of the current git commit, to label the results.
+
+    Returns:
+        Short commit hash, or 'unknown' if it can't be determined.
+    """
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def benchmarkCase(left: NDArrayFloat2D,
+                  right: NDArrayFloat2D,
+                  gateStep: float,
+                  BMeasureMemory: bool = True) -> dict:
+    """
+    Benchmarks generating a single Track.
+
+    The timed run is separate from the memory run as tracemalloc slows down
+    the code it traces.
+
+    Args:
+        left: 2D array of the left track limits.
+        right: 2D array of the right track limits.
+        gateStep: Distance between consecutive gate midpoints.
+        BMeasureMemory: Whether to also measure the peak memory with an
+            additional run under tracemalloc.
+
+    Returns:
+        Dictionary of the results of the case, with the keys 'nGates', 'tBuild'
+        (seconds), 'GatesPerSecond' and 'PeakMemory' (bytes, None if not
+        measured).
+    """
+    tStart = time.perf_counter()
+    track = Track(left, right, isClosed=True, gateStep=gateStep)
+    tBuild = time.perf_counter() - tStart
+
+    peakMemory = None
+    if BMeasureMemory:
+        tracemalloc.start()
+        Track(left, right, isClosed=True, gateStep=gateStep)
+        peakMemory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    nGates = len(track.gateTable)
+    return {'nGates': nGates, 'tBuild': tBuild, 'GatesPerSecond': nGates / tBuild, 'PeakMemory': peakMemory}
+
+
+def runBenchmark(layouts: list[str] = BENCHMARK_LAYOUTS,
+                 gateSteps: list[float] = BENCHMARK_GATE_STEPS,
+                 pointSpacings: list[float] = BENCHMARK_POINT_SPACINGS,
+                 BMeasureMemory: bool = True) -> dict:
+    """
+    Benchmarks generating a Track for every combination of the layouts, gate
+    steps and limits point spacings.
+
+    Args:
+        layouts: Names of the layouts to benchmark.
+        gateSteps: Gate steps to benchmark.
+        pointSpacings: Spacings of the limits points to benchmark.
+        BMeasureMemory: Whether to measure the peak memory of each case.
+
+    Returns:
+        Dictionary of the benchmark metadata and the list of the results of
+        each case under 'Results'.
+    """
+    # Hide the track generation messages while benchmarking
+    profiling.setLogLevel(logging.WARNING)
+
+    # Build a small track first so the one-off costs of the first call (lazy imports etc.) aren't included in the first case
+    warmupLeft, warmupRight = getLayoutLimits('oval', BENCHMARK_POINT_SPACINGS[0])
+    Track(warmupLeft, warmupRight, isClosed=True, gateStep=BENCHMARK_GATE_STEPS[0])
+
+    results = []
+    for layout in layouts:
+        for pointSpacing in pointSpacings:
+            left, right = getLayoutLimits(layout, pointSpacing)
+            for gateStep in gateSteps:
+                result = {'Layout': layout, 'PointSpacing': pointSpacing, 'GateStep': gateStep, 'nLimitsPoints': 2 * np.size(left, 0)}
+                result.update(benchmarkCase(left, right, gateStep, BMeasureMemory))
+                results.append(result)
+                print(f"{layout:<10} pointSpacing {pointSpacing:>4} gateStep {gateStep:>4}: {result['nGates']:>6} gates in {result['tBuild']:.3f} s "
+                      f"({result['GatesPerSecond']:.1f} gates/s)" + (f", peak memory {result['PeakMemory'] / 1e6:.1f} MB" if BMeasureMemory else ""))
+
+    profiling.setLogLevel(profiling.LOG_LEVEL_DEFAULT)
+    return {
+        'Commit': getGitCommit(),
+        'Date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'Python': platform.python_version(),
+        'NumPy': np.__version__,
+        'Machine': platform.platform(),
+        'Results': results,
+    }
+
+
+def saveBenchmark(benchmark: dict,
+                  outputPath: str | None = None) -> str:
+    """
+    Saves the benchmark results as JSON.
+
+    Args:
+        benchmark: Benchmark results as returned by runBenchmark().
+        outputPath: Path of the JSON file. Defaults to a file named after the
+            commit and time in BENCHMARK_FOLDER.
+
+    Returns:
+        Path of the saved JSON file.
+    """
+    if outputPath is None:
+        outputPath = os.path.join(BENCHMARK_FOLDER, BENCHMARK_FILENAME_FORMAT.format(benchmark['Commit'], time.strftime('%Y%m%d-%H%M%S')))
+    os.makedirs(os.path.dirname(outputPath) or '.', exist_ok=True)
+    with open(outputPath, 'w') as f:
+        json.dump(benchmark, f, indent=4)
+    return outputPath
+
+
+def compareBenchmarks(basePath: str,
+                      newPath: str) -> list[dict]:
+    """
+    Compares the build times of the cases common to 2 saved benchmarks and
+    prints the ratios, flagging the cases slower than the regression threshold.
+
+    Args:
+        basePath: Path of the JSON file of the baseline benchmark.
+        newPath: Path of the JSON file of the benchmark to compare.
+
+    Returns:
+        List of the comparison for each common case, with the keys 'Layout',
+        'PointSpacing', 'GateStep', 'tBase', 'tNew', 'rTime' and 'BRegression'.
+    """
+    with open(basePath) as f:
+        base = json.load(f)
+    with open(newPath) as f:
+        new = json.load(f)
+
+    baseResults = {(result['Layout'], result['PointSpacing'], result['GateStep']): result for result in base['Results']}
+    comparisons = []
+    print("Comparing", new['Commit'], "against", base['Commit'])
+    for result in new['Results']:
+        key = (result['Layout'], result['PointSpacing'], result['GateStep'])
+        if key not in baseResults:
+            continue
+        rTime = result['tBuild'] / baseResults[key]['tBuild']
+        BRegression = rTime > BENCHMARK_REGRESSION_THRESHOLD
+        comparisons.append({'Layout': key[0], 'PointSpacing': key[1], 'GateStep': key[2], 'tBase': baseResults[key]['tBuild'], 'tNew': result['tBuild'],
+                            'rTime': rTime, 'BRegression': BRegression})
+        print(f"{key[0]:<10} pointSpacing {key[1]:>4} gateStep {key[2]:>4}: {baseResults[key]['tBuild']:.3f} s -> {result['tBuild']:.3f} s "
+              f"(x{rTime:.2f})" + (" REGRESSION" if BRegression else ""))
+    return comparisons
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark track generation over synthetic circuits")
+    parser.add_argument('--layouts', nargs='+', default=BENCHMARK_LAYOUTS, choices=BENCHMARK_LAYOUTS)
+    parser.add_argument('--gate-steps', nargs='+', type=float, default=BENCHMARK_GATE_STEPS)
+    parser.add_argument('--point-spacings', nargs='+', type=float, default=BENCHMARK_POINT_SPACINGS)
+    parser.add_argument('--no-memory', action='store_true', help="Skip the peak memory runs")
+    parser.add_argument('--output', default=None, help="Path of the JSON results file")
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'NEW'), default=None, help="Compare 2 saved results files instead of benchmarking")
+    args = parser.parse_args()
+
+    if args.compare is not None:
+        comparisons = compareBenchmarks(*args.compare)
+        sys.exit(1 if any(comparison['BRegression'] for comparison in comparisons) else 0)
+
+    benchmark = runBenchmark(args.layouts, args.gate_steps, args.point_spacings, not args.no_memory)
+    print("Saved benchmark results to", saveBenchmark(benchmark, args.output))
@@ -0,0 +1,568 @@
+"""
+Quasistatic lap sim and its related functions.
+
+Runs a point mass over a discretised Trajectory: the apex speed at each point
+is limited by the lateral grip, then a forward pass accelerates out of each
+apex and a backward pass brakes into each apex. All the passes are NumPy
+array operations, where the forward and backward passes step a front from the
+start of each acceleration or braking zone at once, so the number of Python
+iterations is the length of the longest zone rather than the number of points.
+
+The vehicle can be a PointMass or a GGVEnvelope precomputed from it, which is
+cached to disk by the hash of the vehicle setup.
+"""
+
+# Import packages
+import os
+import hashlib
+import numpy as np
+
+# Import project python files
+from Utils import utils
+from Utils import profiling
+from Utils.typeAliases import *
+from trajectory import Trajectory
+
+# Logger for the lap sim module
+LOGGER = profiling.getLogger(__name__)
+
+# Physical constants
+GRAVITY = 9.81                          # Gravitational acceleration in m/s^2
+AIR_DENSITY = 1.225                     # Air density in kg/m^3
+
+# Lap sim constants
+LAP_SIM_MAX_SPEED = 150                 # Upper bound in m/s of the apex speed search, used as the apex speed of straights
+APEX_SPEED_ITERATIONS = 40              # Number of bisection iterations of the apex speed search (resolution of LAP_SIM_MAX_SPEED / 2^40)
+LAP_SIM_CHANNELS = ['S', 'Speed', 'ApexSpeed', 'LongAccel', 'LatAccel', 'Time']  # Channels of the lap sim results array, in row order
+LAP_SIM_CHANNEL_INDEXES = {name: i for i, name in enumerate(LAP_SIM_CHANNELS)}  # Row index of each channel in the lap sim results array
+
+# GGV envelope constants
+GGV_CACHE_FILENAME_FORMAT = "GGV_{}.npz"  # Formatted with the hash of the vehicle setup and the GGV grid
+GGV_CACHE_VERSION = 1                   # Included in the GGV cache hash - increment when the envelope solve changes to invalidate old cache entries
+GGV_SPEED_STEP = 2                      # Step in m/s of the speed grid of the GGV envelope, from 0 to LAP_SIM_MAX_SPEED
+GGV_LAT_ACCEL_STEPS = 25                # Number of lateral acceleration grid points of the GGV envelope, from 0 to the lateral acceleration limit
+GGV_LONG_ACCEL_BOUND = 200              # Longitudinal accelerations in m/s^2 are searched from -GGV_LONG_ACCEL_BOUND to GGV_LONG_ACCEL_BOUND
+GGV_LONG_ACCEL_SAMPLES = 401            # Number of longitudinal accelerations sampled to bracket the edges of the envelope before the root find
+GGV_ROOT_ITERATIONS = 40                # Number of bisection iterations of the root find of the edges of the envelope
+
+
+class PointMass:
+    """
+    Point mass vehicle model with a friction ellipse tyre model, downforce,
+    drag and a power limit.
+
+    This is the vehicle envelope interface used by the lap sim - any object
+    with vectorised getLatAccelLimit() and getLongAccelLimits() methods can be
+    used in its place (e.g. a precomputed GGV envelope).
+    """
+    def __init__(self,
+                 mass: float,
+                 power: float,
+                 muLong: float,
+                 muLat: float,
+                 CdA: float,
+                 ClA: float,
+                 airDensity: float = AIR_DENSITY) -> None:
+        """
+        Args:
+            mass: Mass of the vehicle in kg.
+            power: Maximum power at the wheels in W.
+            muLong: Longitudinal friction coefficient of the tyres.
+            muLat: Lateral friction coefficient of the tyres.
+            CdA: Drag coefficient multiplied by the frontal area in m^2.
+            ClA: Downforce coefficient multiplied by the frontal area in m^2.
+            airDensity: Air density in kg/m^3.
+        """
+        self.mass = mass
+        self.power = power
+        self.muLong = muLong
+        self.muLat = muLat
+        self.CdA = CdA
+        self.ClA = ClA
+        self.airDensity = airDensity
+
+
+    def getVerticalAccel(self,
+                         speeds: NDArrayFloat1D) -> NDArrayFloat1D:
+        """
+        Calculates the vertical load per unit mass (gravity plus downforce).
+
+        Args:
+            speeds: 1D array of the speeds in m/s.
+
+        Returns:
+            1D array of the vertical accelerations in m/s^2.
+        """
+        return GRAVITY + 0.5 * self.airDensity * self.ClA * speeds ** 2 / self.mass
+
+
+    def getLatAccelLimit(self,
+                         speeds: NDArrayFloat1D) -> NDArrayFloat1D:
+        """
+        Calculates the maximum lateral acceleration at each speed.
+
+        Args:
+            speeds: 1D array of the speeds in m/s.
+
+        Returns:
+            1D array of the maximum lateral accelerations in m/s^2.
+        """
+        return self.muLat * self.getVerticalAccel(speeds)
+
+
+    def getLongAccelLimits(self,
+                           speeds: NDArrayFloat1D,
+                           latAccels: NDArrayFloat1D) -> tuple[NDArrayFloat1D, NDArrayFloat1D]:
+        """
+        Calculates the maximum and minimum longitudinal acceleration on flat
+        ground at each speed and lateral acceleration, from the friction
+        ellipse, the power limit and drag.
+
+        Args:
+            speeds: 1D array of the speeds in m/s.
+            latAccels: 1D array of the lateral accelerations in m/s^2.
+
+        Returns:
+            Tuple of (maxLongAccels, minLongAccels) 1D arrays in m/s^2, where
+            the minimum longitudinal acceleration is negative under braking.
+        """
+        verticalAccels = self.getVerticalAccel(speeds)
+        rLat = np.minimum(np.abs(latAccels) / (self.muLat * verticalAccels), 1)
+        tyreLongAccels = self.muLong * verticalAccels * np.sqrt(1 - rLat ** 2)
+        dragAccels = 0.5 * self.airDensity * self.CdA * speeds ** 2 / self.mass
+        powerAccels = self.power / (self.mass * np.maximum(speeds, 1e-3))
+        return np.minimum(tyreLongAccels, powerAccels) - dragAccels, -tyreLongAccels - dragAccels
+
+
+    def getEnvelopeMargin(self,
+                          speeds: NDArrayFloat1D,
+                          latAccels: NDArrayFloat1D,
+                          longAccels: NDArrayFloat1D) -> NDArrayFloat1D:
+        """
+        Calculates how far within the GGV envelope each state is, as the
+        minimum of the throttle (power) margin and the tyre margin, which is
+        positive inside the envelope and 0 at its edge.
+
+        Args:
+            speeds: 1D array of the speeds in m/s.
+            latAccels: 1D array of the lateral accelerations in m/s^2.
+            longAccels: 1D array of the longitudinal accelerations in m/s^2.
+
+        Returns:
+            1D array of the envelope margins.
+        """
+        verticalAccels = self.getVerticalAccel(speeds)
+        tyreLongAccels = longAccels + 0.5 * self.airDensity * self.CdA * speeds ** 2 / self.mass
+        tyreMargins = 1 - np.hypot(latAccels / (self.muLat * verticalAccels), tyreLongAccels / (self.muLong * verticalAccels))
+        throttleMargins = 1 - tyreLongAccels * self.mass * np.maximum(speeds, 1e-3) / self.power
+        return np.minimum(tyreMargins, throttleMargins)
+
+
+def getVehicleSetupHash(vehicle: PointMass) -> str:
+    """
+    Calculates the hash of the setup of a vehicle from its class and all its
+    attributes, e.g. to key the GGV envelope cache.
+
+    Args:
+        vehicle: Vehicle object, e.g. a PointMass.
+
+    Returns:
+        Hexadecimal string of the SHA-256 hash.
+    """
+    return hashlib.sha256(repr((type(vehicle).__name__, sorted(vars(vehicle).items()))).encode()).hexdigest()
+
+
+def solveLongAccelLimits(vehicle: PointMass,
+                         speeds: NDArrayFloat1D,
+                         latAccels: NDArrayFloat1D) -> tuple[NDArrayFloat1D, NDArrayFloat1D]:
+    """
+    Finds the edges of the GGV envelope in the longitudinal direction, where
+    the vehicle's envelope margin (the minimum of the throttle, brake and tyre
+    margins) is 0, for all the speed and lateral acceleration pairs at once.
+
+    The longitudinal accelerations within GGV_LONG_ACCEL_BOUND are sampled to
+    bracket each edge, then the brackets are refined with a bisection. If no
+    sample is within the envelope (e.g. at the lateral acceleration limit),
+    both edges are the longitudinal acceleration with the largest margin,
+    refined with a ternary search around the best sample.
+
+    Args:
+        vehicle: Vehicle with a vectorised getEnvelopeMargin() method.
+        speeds: 1D array of the speeds in m/s.
+        latAccels: 1D array of the lateral accelerations in m/s^2.
+
+    Returns:
+        Tuple of (maxLongAccels, minLongAccels) 1D arrays in m/s^2.
+    """
+    # Bracket the edges from the samples within the envelope
+    longAccelSamples = np.linspace(-GGV_LONG_ACCEL_BOUND, GGV_LONG_ACCEL_BOUND, GGV_LONG_ACCEL_SAMPLES)
+    nPoints = np.size(speeds)
+    margins = vehicle.getEnvelopeMargin(np.repeat(speeds, GGV_LONG_ACCEL_SAMPLES), np.repeat(latAccels, GGV_LONG_ACCEL_SAMPLES),
+                                        np.tile(longAccelSamples, nPoints)).reshape(nPoints, GGV_LONG_ACCEL_SAMPLES)
+    BInside = margins >= 0
+    BAnyInside = np.any(BInside, axis=1)
+    iBest = np.argmax(margins, axis=1)
+    iFirst = np.where(BAnyInside, np.argmax(BInside, axis=1), iBest)
+    iLast = np.where(BAnyInside, GGV_LONG_ACCEL_SAMPLES - 1 - np.argmax(BInside[:, ::-1], axis=1), iBest)
+
+    # Bisect each bracket between the last sample inside and the next sample outside the envelope
+    def bisect(inside: NDArrayFloat1D, outside: NDArrayFloat1D) -> NDArrayFloat1D:
+        for _ in range(GGV_ROOT_ITERATIONS):
+            middle = (inside + outside) / 2
+            BMiddleInside = vehicle.getEnvelopeMargin(speeds, latAccels, middle) >= 0
+            inside = np.where(BMiddleInside, middle, inside)
+            outside = np.where(BMiddleInside, outside, middle)
+        return inside
+
+    maxLongAccels = bisect(longAccelSamples[iLast], longAccelSamples[np.minimum(iLast + 1, GGV_LONG_ACCEL_SAMPLES - 1)])
+    minLongAccels = bisect(longAccelSamples[iFirst], longAccelSamples[np.maximum(iFirst - 1, 0)])
+
+    # Ternary search for the largest margin between the samples either side of the best sample, for the points with no sample inside
+    BOutside = ~BAnyInside
+    lower = longAccelSamples[np.maximum(iBest[BOutside] - 1, 0)]
+    upper = longAccelSamples[np.minimum(iBest[BOutside] + 1, GGV_LONG_ACCEL_SAMPLES - 1)]
+    for _ in range(GGV_ROOT_ITERATIONS):
+        lowerThird, upperThird = (2 * lower + upper) / 3, (lower + 2 * upper) / 3
+        BLowerBetter = (vehicle.getEnvelopeMargin(speeds[BOutside], latAccels[BOutside], lowerThird)
+                        > vehicle.getEnvelopeMargin(speeds[BOutside], latAccels[BOutside], upperThird))
+        upper = np.where(BLowerBetter, upperThird, upper)
+        lower = np.where(BLowerBetter, lower, lowerThird)
+    maxLongAccels[BOutside] = minLongAccels[BOutside] = (lower + upper) / 2
+    return maxLongAccels, minLongAccels
+
+
+def interpolateBilinear(table: np.ndarray,
+                        x: NDArrayFloat1D,
+                        y: NDArrayFloat1D) -> np.ndarray:
+    """
+    Bilinear interpolation of a table on a uniform grid for all the points at
+    once, clamped to the edges of the grid.
+
+    Args:
+        table: Array of shape (nX, nY, ...) of the table values, where any
+            trailing dimensions are interpolated together.
+        x: 1D array of the positions of the points along the first axis of
+            the table, in grid steps from the first grid point.
+        y: 1D array of the positions of the points along the second axis of
+            the table, in grid steps from the first grid point.
+
+    Returns:
+        Array of shape (len(x), ...) of the interpolated values at the points.
+    """
+    nX, nY = np.shape(table)[:2]
+    x = np.minimum(np.maximum(x, 0), nX - 1)
+    y = np.minimum(np.maximum(y, 0), nY - 1)
+    ix = np.minimum(x.astype(np.intp), nX - 2)
+    iy = np.minimum(y.astype(np.intp), nY - 2)
+    tx = (x - ix)[:, np.newaxis]
+    ty = (y - iy)[:, np.newaxis]
+
+    # Gather the corners of each grid cell from the flattened table
+    flatTable = table.reshape(nX * nY, -1)
+    iCorners = ix * nY + iy
+    values = ((1 - tx) * ((1 - ty) * flatTable[iCorners] + ty * flatTable[iCorners + 1])
+              + tx * ((1 - ty) * flatTable[iCorners + nY] + ty * flatTable[iCorners + nY + 1]))
+    return values.reshape((-1,) + np.shape(table)[2:])
+
+
+class GGVEnvelope:
+    """
+    GGV envelope of a vehicle precomputed over a grid of speed and lateral
+    acceleration, so the lap sim looks up the longitudinal acceleration
+    limits with a vectorised bilinear interpolation instead of solving the
+    vehicle model at every point. It has the same getLatAccelLimit() and
+    getLongAccelLimits() methods as the vehicle so it can replace it in
+    runLapSim().
+
+    The lateral acceleration grid is a fraction of the lateral acceleration
+    limit at each speed, so every grid point is within the envelope even when
+    the limit increases with speed from downforce. The fractions are the sine
+    of uniformly spaced angles, clustering them towards the limit where the
+    envelope changes fastest. Both grids are uniform (in speed and in the
+    angle) so the lookups find the grid cells without a search.
+
+    The table can be saved to a cache folder, keyed by the hash of the vehicle
+    setup and the grid, and is loaded from it instead of solved when the same
+    setup is used again.
+    """
+    def __init__(self,
+                 vehicle: PointMass,
+                 speedStep: float = GGV_SPEED_STEP,
+                 nLatAccels: int = GGV_LAT_ACCEL_STEPS,
+                 cacheDir: str | os.PathLike | None = None) -> None:
+        """
+        Args:
+            vehicle: Vehicle with vectorised getLatAccelLimit() and
+                getEnvelopeMargin() methods, e.g. a PointMass.
+            speedStep: Step in m/s of the speed grid.
+            nLatAccels: Number of lateral acceleration grid points.
+            cacheDir: Path to the GGV cache folder, or None to always solve
+                the envelope without caching it.
+        """
+        self.speedStep = speedStep
+        self.speeds = np.arange(0, LAP_SIM_MAX_SPEED + speedStep, speedStep, dtype=float)
+        self.rLatAccels = np.sin(np.linspace(0, np.pi / 2, nLatAccels))
+        self.setupHash = getVehicleSetupHash(vehicle)
+
+        cachePath = None
+        if cacheDir is not None:
+            cacheKey = hashlib.sha256(repr([self.setupHash, speedStep, nLatAccels, LAP_SIM_MAX_SPEED, GGV_CACHE_VERSION, GGV_LONG_ACCEL_BOUND,
+                                            GGV_LONG_ACCEL_SAMPLES, GGV_ROOT_ITERATIONS]).encode()).hexdigest()
+            cachePath = os.path.join(cacheDir, GGV_CACHE_FILENAME_FORMAT.format(cacheKey))
+            if self.__initFromCache(cachePath):
+                LOGGER.info("GGV envelope loaded from cache")
+                return
+
+        # Solve the edges of the envelope for the whole grid at once
+        with profiling.timer('ggvSolve'):
+            self.latAccelLimits = vehicle.getLatAccelLimit(self.speeds)
+            gridSpeeds, gridRLatAccels = np.meshgrid(self.speeds, self.rLatAccels, indexing='ij')
+            maxLongAccels, minLongAccels = solveLongAccelLimits(vehicle, gridSpeeds.ravel(), (gridRLatAccels * self.latAccelLimits[:, np.newaxis]).ravel())
+            self.longAccelLimits = np.stack((maxLongAccels, minLongAccels), axis=-1).reshape(np.shape(gridSpeeds) + (2,))
+        LOGGER.info("GGV envelope solved - %d speeds, %d lateral accelerations", np.size(self.speeds), nLatAccels)
+        if cachePath is not None:
+            self.__saveToCache(cachePath)
+
+
+    def getLatAccelLimit(self,
+                         speeds: NDArrayFloat1D) -> NDArrayFloat1D:
+        """
+        Interpolates the maximum lateral acceleration at each speed.
+
+        Args:
+            speeds: 1D array of the speeds in m/s.
+
+        Returns:
+            1D array of the maximum lateral accelerations in m/s^2.
+        """
+        return np.interp(speeds, self.speeds, self.latAccelLimits)
+
+
+    def getLongAccelLimits(self,
+                           speeds: NDArrayFloat1D,
+                           latAccels: NDArrayFloat1D) -> tuple[NDArrayFloat1D, NDArrayFloat1D]:
+        """
+        Interpolates the maximum and minimum longitudinal acceleration at each
+        speed and lateral acceleration.
+
+        Args:
+            speeds: 1D array of the speeds in m/s.
+            latAccels: 1D array of the lateral accelerations in m/s^2.
+
+        Returns:
+            Tuple of (maxLongAccels, minLongAccels) 1D arrays in m/s^2.
+        """
+        rLatAccels = np.minimum(np.abs(latAccels) / self.getLatAccelLimit(speeds), 1)
+        longAccelLimits = interpolateBilinear(self.longAccelLimits, speeds / self.speedStep,
+                                              np.arcsin(rLatAccels) * ((np.size(self.rLatAccels) - 1) / (np.pi / 2)))
+        return longAccelLimits[:, 0], longAccelLimits[:, 1]
+
+
+    def __initFromCache(self,
+                        cachePath: str | os.PathLike) -> bool:
+        """
+        Internal function to load the envelope table from the GGV cache file at
+        cachePath.
+
+        Args:
+            cachePath: Path to the GGV cache file.
+
+        Returns:
+            True if the envelope was loaded, False if the cache file does not
+            exist or failed to load, in which case the envelope needs to be
+            solved.
+        """
+        cache = utils.loadCacheFile(cachePath, ['latAccelLimits', 'longAccelLimits'], GGV_CACHE_VERSION, 'GGV')
+        if cache is None:
+            return False
+        self.latAccelLimits = cache['latAccelLimits']
+        self.longAccelLimits = cache['longAccelLimits']
+        return True
+
+
+    def __saveToCache(self,
+                      cachePath: str | os.PathLike) -> None:
+        """
+        Internal function to save the envelope table to the GGV cache file at
+        cachePath.
+
+        Args:
+            cachePath: Path to the GGV cache file.
+        """
+        utils.saveCacheFile(cachePath, GGV_CACHE_VERSION, latAccelLimits=self.latAccelLimits, longAccelLimits=self.longAccelLimits)
+
+
+def getApexSpeeds(curvature: NDArrayFloat1D,
+                  vehicle: PointMass) -> NDArrayFloat1D:
+    """
+    Finds the maximum speed at each point where the lateral acceleration
+    required by the curvature is within the lateral acceleration limit, with
+    a bisection of all the points at once.
+
+    Args:
+        curvature: 1D array of the curvature at each point in 1/m.
+        vehicle: Vehicle envelope with a getLatAccelLimit() method.
+
+    Returns:
+        1D array of the apex speeds in m/s, LAP_SIM_MAX_SPEED where the
+        curvature doesn't limit the speed.
+    """
+    absCurvature = np.abs(curvature)
+    lower = np.zeros(np.size(curvature))
+    upper = np.full(np.size(curvature), float(LAP_SIM_MAX_SPEED))
+    BFeasible = absCurvature * upper ** 2 <= vehicle.getLatAccelLimit(upper)
+    for _ in range(APEX_SPEED_ITERATIONS):
+        middle = (lower + upper) / 2
+        BBelowLimit = absCurvature * middle ** 2 <= vehicle.getLatAccelLimit(middle)
+        lower = np.where(BBelowLimit, middle, lower)
+        upper = np.where(BBelowLimit, upper, middle)
+    return np.where(BFeasible, LAP_SIM_MAX_SPEED, lower)
+
+
+def getPassSpeeds(upperSpeeds: NDArrayFloat1D,
+                  ds: NDArrayFloat1D,
+                  curvature: NDArrayFloat1D,
+                  slopeAccels: NDArrayFloat1D,
+                  vehicle: PointMass,
+                  BForwards: bool) -> NDArrayFloat1D:
+    """
+    Runs the forward (acceleration) or backward (braking) pass of the lap sim
+    on the speed upper bounds, from each point to the next point in the
+    direction of the pass.
+
+    Every step is checked at once, and a front is started at the first point
+    of each run of points which are slower than their upper bound from the
+    previous point. Each iteration steps all the fronts at once until they
+    don't change the next point, then every step is checked again until none
+    change. Only starting fronts at the start of each run (rather than at
+    every point which changed) means the points along a straight the car
+    can't reach its upper bound on are only stepped when the front from the
+    corner exit reaches them. The speed of each point is recalculated from
+    its upper bound whenever the previous point changes, so the result is the
+    same as a sequential pass even where the grip available decreases with
+    speed (e.g. braking close to the lateral limit).
+
+    Args:
+        upperSpeeds: 1D array of the upper bounds of the speed at each point,
+            e.g. the apex speeds.
+        ds: 1D array of the distance from each point to the next point, of
+            length len(upperSpeeds) - 1.
+        curvature: 1D array of the curvature at each point in 1/m.
+        slopeAccels: 1D array of the longitudinal acceleration from gravity at
+            each point in m/s^2 (negative uphill).
+        vehicle: Vehicle envelope with a getLongAccelLimits() method.
+        BForwards: True for the forward acceleration pass, False for the
+            backward braking pass.
+
+    Returns:
+        1D array of the speed at each point after the pass.
+    """
+    speeds = upperSpeeds.copy()
+    nPoints = np.size(speeds)
+    step = 1 if BForwards else -1
+
+    def getNextSpeeds(points: NDArrayInt1D) -> NDArrayFloat1D:
+        # Speeds of the next points in the direction of the pass, stepping from the points
+        profiling.count('lapSimPassPoints', np.size(points))
+        pointSpeeds = speeds[points]
+        maxLongAccels, minLongAccels = vehicle.getLongAccelLimits(pointSpeeds, curvature[points] * pointSpeeds ** 2)
+        if BForwards:
+            speedsSquared = pointSpeeds ** 2 + 2 * (maxLongAccels + slopeAccels[points]) * ds[points]
+        else:
+            speedsSquared = pointSpeeds ** 2 - 2 * (minLongAccels + slopeAccels[points]) * ds[points - 1]
+        return np.minimum(np.sqrt(np.maximum(speedsSquared, 0)), upperSpeeds[points + step])
+
+    # Points stepped from, in the order of the pass
+    passPoints = np.arange(nPoints - 1) if BForwards else np.arange(nPoints - 1, 0, -1)
+    while True:
+        BChanged = getNextSpeeds(passPoints) != speeds[passPoints + step]
+        if not np.any(BChanged):
+            return speeds
+
+        # Start a front at the first point of each run of changed points, then step the fronts until they don't change the next point
+        active = passPoints[BChanged & ~np.concat(([False], BChanged[:-1]))]
+        while np.size(active) > 0:
+            profiling.count('lapSimPassIterations')
+            nextSpeeds = getNextSpeeds(active)
+            nextPoints = active + step
+            BChanged = nextSpeeds != speeds[nextPoints]
+            active = nextPoints[BChanged]
+            speeds[active] = nextSpeeds[BChanged]
+            active = active[(active < nPoints - 1) if BForwards else (active > 0)]
+
+
+def runLapSim(trajectory: Trajectory,
+              vehicle: PointMass,
+              initialSpeed: float | None = None) -> tuple[float, NDArrayFloat2D]:
+    """
+    Runs the quasistatic point mass lap sim over a discretised trajectory.
+
+    'Closed Circuit' trajectories are solved as a periodic lap, starting the
+    passes from the point with the lowest apex speed since the car is always
+    at its apex speed there. Other trajectory types start from the first point
+    of the trajectory (including any run up before the start line).
+
+    Args:
+        trajectory: Trajectory to run the lap sim on.
+        vehicle: Vehicle envelope with vectorised getLatAccelLimit() and
+            getLongAccelLimits() methods, e.g. a PointMass.
+        initialSpeed: Speed in m/s at the first point of trajectory types other
+            than 'Closed Circuit'. Defaults to a standing start for 'Point to
+            Point' and the apex speed of the first point otherwise.
+
+    Returns:
+        Tuple of (lapTime, results) where lapTime is the time from the start
+        line to the finish line in seconds, and results is a contiguous 2D
+        array with a row for each channel in LAP_SIM_CHANNELS (see
+        LAP_SIM_CHANNEL_INDEXES) and a column for each trajectory point.
+    """
+    S = trajectory.S
+    nPoints = np.size(S)
+    BClosed = trajectory.trajType == 'Closed Circuit'
+    slopeAccels = -GRAVITY * np.sin(trajectory.slope)
+    with profiling.timer('lapSimApexSpeeds'):
+        apexSpeeds = getApexSpeeds(trajectory.curvature, vehicle)
+
+    with profiling.timer('lapSimPasses'):
+        if BClosed:
+            # Rotate the lap to start and finish at the lowest apex speed, and include the step from the last point back to the first
+            iStart = int(np.argmin(apexSpeeds))
+            order = np.concat((np.arange(iStart, nPoints), np.arange(iStart + 1)))
+            ds = np.diff(np.concat((S, [trajectory.sTotal])))[order[:-1]]
+            speeds = apexSpeeds[order]
+        else:
+            order = np.arange(nPoints)
+            ds = np.diff(S)
+            speeds = apexSpeeds.copy()
+            if initialSpeed is None:
+                initialSpeed = 0 if trajectory.trajType == 'Point to Point' else apexSpeeds[0]
+            speeds[0] = min(initialSpeed, speeds[0])
+        forwardSpeeds = getPassSpeeds(speeds, ds, trajectory.curvature[order], slopeAccels[order], vehicle, True)
+        speeds = getPassSpeeds(forwardSpeeds, ds, trajectory.curvature[order], slopeAccels[order], vehicle, False)
+
+    # Time and longitudinal acceleration of each step (steps from a standstill to a standstill take forever)
+    stepTimes = np.divide(2 * ds, speeds[:-1] + speeds[1:], out=np.full(np.size(ds), np.inf), where=speeds[:-1] + speeds[1:] > 0)
+    stepLongAccels = np.diff(speeds ** 2) / (2 * ds)
+    if BClosed:
+        # Undo the rotation, with the time from the start line
+        lapTime = float(np.sum(stepTimes))
+        speeds = speeds[:-1][np.argsort(order[:-1])]
+        stepTimes = stepTimes[np.argsort(order[:-1])]
+        stepLongAccels = stepLongAccels[np.argsort(order[:-1])]
+        times = np.concat(([0], np.cumsum(stepTimes[:-1])))
+        longAccels = stepLongAccels
+    else:
+        times = np.concat(([0], np.cumsum(stepTimes)))
+        times -= np.interp(0, S, times)
+        lapTime = float(np.interp(trajectory.sTotal, S, times))
+        longAccels = np.concat((stepLongAccels, stepLongAccels[-1:]))
+
+    results = np.empty((len(LAP_SIM_CHANNELS), nPoints))
+    results[LAP_SIM_CHANNEL_INDEXES['S']] = S
+    results[LAP_SIM_CHANNEL_INDEXES['Speed']] = speeds
+    results[LAP_SIM_CHANNEL_INDEXES['ApexSpeed']] = apexSpeeds
+    results[LAP_SIM_CHANNEL_INDEXES['LongAccel']] = longAccels
+    results[LAP_SIM_CHANNEL_INDEXES['LatAccel']] = trajectory.curvature * speeds ** 2
+    results[LAP_SIM_CHANNEL_INDEXES['Time']] = times
+    LOGGER.debug("Lap sim finished - lap time %.3f s over %d points", lapTime, nPoints)
+    return lapTime, results
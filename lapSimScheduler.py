@@ -0,0 +1,254 @@
+"""
+Multi-fidelity scheduling of lap sims over populations of optimiser
+candidates.
+
+Every candidate is screened with a cheap low fidelity lap sim (e.g. the point
+mass lap sim), and only the most promising candidates are promoted to the
+expensive high fidelity lap sim (e.g. the bicycle model): the best fraction
+of the population, plus any candidate predicted to be close to the best high
+fidelity lap time so far (the incumbent). Every promoted candidate gives a
+pair of low and high fidelity results, which are used to fit a correction
+predicting the high fidelity lap time from the low fidelity lap time and
+features of each candidate's low fidelity lap (e.g. how much of the lap is
+at high speed or at the grip limit). The features let the correction reorder
+the candidates, as the difference between the fidelities depends on the
+candidate rather than just its lap time.
+"""
+
+# Import packages
+import math
+import numpy as np
+from typing import Callable
+
+# Import project python files
+from Utils import profiling
+from Utils.typeAliases import *
+from lapSim import PointMass, runLapSim, LAP_SIM_CHANNEL_INDEXES
+from trajectory import Trajectory
+
+# Logger for the lap sim scheduler module
+LOGGER = profiling.getLogger(__name__)
+
+# Lap sim scheduler constants
+SCHEDULER_PROMOTE_FRACTION = 0.2        # Fraction of each population with the best predicted lap times promoted to the high fidelity lap sim
+SCHEDULER_INCUMBENT_MARGIN = 0.005      # Candidates predicted within this fraction of the incumbent lap time are also promoted
+SCHEDULER_CORRECTION_MIN_PAIRS = 3      # Number of low/high fidelity pairs needed to fit the gradient of the correction (fewer only fit an offset)
+SCHEDULER_CORRECTION_MAX_PAIRS = 500    # Number of the most recent low/high fidelity pairs the correction is fitted to
+SCHEDULER_CORRECTION_RIDGE = 1e-2       # Ridge regularisation of the weights of the standardised features in the correction fit
+
+
+def getLapSimFeatures(results: NDArrayFloat2D) -> NDArrayFloat1D:
+    """
+    Calculates features of a lap from the lap sim results, for the correction
+    of the lap sim scheduler. The features are the time-weighted means of the
+    speed squared (aero loads), the absolute longitudinal acceleration and the
+    absolute lateral acceleration (load transfer).
+
+    Args:
+        results: Lap sim results array, see runLapSim().
+
+    Returns:
+        1D array of the features.
+    """
+    stepTimes = np.diff(results[LAP_SIM_CHANNEL_INDEXES['Time']])
+    stepTimes = np.concat((stepTimes, stepTimes[-1:]))
+    weights = np.where(np.isfinite(stepTimes) & (stepTimes > 0), stepTimes, 0)
+    channels = np.stack((results[LAP_SIM_CHANNEL_INDEXES['Speed']] ** 2, np.abs(results[LAP_SIM_CHANNEL_INDEXES['LongAccel']]),
+                         np.abs(results[LAP_SIM_CHANNEL_INDEXES['LatAccel']])))
+    return channels @ weights / max(np.sum(weights), 1e-9)
+
+
+def runLapSimWithFeatures(trajectory: Trajectory,
+                          vehicle: PointMass) -> tuple[float, NDArrayFloat1D]:
+    """
+    Runs the lap sim and calculates the features of the lap, as a low fidelity
+    lap sim of the lap sim scheduler.
+
+    Args:
+        trajectory: Trajectory to run the lap sim on.
+        vehicle: Vehicle envelope, e.g. a PointMass or GGVEnvelope.
+
+    Returns:
+        Tuple of (lapTime, features), see runLapSim() and getLapSimFeatures().
+    """
+    lapTime, results = runLapSim(trajectory, vehicle)
+    return lapTime, getLapSimFeatures(results)
+
+
+class LapSimScheduler:
+    """
+    Scheduler of a low and high fidelity lap sim, to evaluate populations of
+    candidates with far fewer high fidelity lap sims.
+
+    The correction is highLapTime = offset + gradient * lowLapTime +
+    featureWeights . features, a least squares fit to the most recent pairs
+    of results with the standardised feature weights ridge regularised. The
+    feature weights are only fitted once there are more pairs than features,
+    and with too few pairs (or pairs with the same low fidelity lap time) only
+    the offset is fitted. The gradient is kept positive (a fitted gradient of
+    0 or less is replaced by a gradient of 1), as a negative gradient from the
+    narrow range of the promoted candidates' lap times would reverse the
+    ranking and promote the worst candidates.
+    """
+    def __init__(self,
+                 lowFidelity: Callable[[Any], float | tuple[float, NDArrayFloat1D]],
+                 highFidelity: Callable[[Any], float],
+                 promoteFraction: float = SCHEDULER_PROMOTE_FRACTION,
+                 incumbentMargin: float = SCHEDULER_INCUMBENT_MARGIN) -> None:
+        """
+        Args:
+            lowFidelity: Function of a candidate returning its low fidelity lap
+                time, or a tuple of its low fidelity lap time and a 1D array of
+                features of its lap, e.g.
+                lambda trajectory: runLapSimWithFeatures(trajectory, pointMass).
+            highFidelity: Function of a candidate returning its high fidelity
+                lap time.
+            promoteFraction: Fraction of each population with the best
+                predicted lap times promoted to the high fidelity lap sim (at
+                least 1 candidate is always promoted).
+            incumbentMargin: Candidates with a predicted lap time within this
+                fraction of the incumbent lap time are also promoted.
+        """
+        if not 0 < promoteFraction <= 1:
+            raise Exception("Invalid promote fraction " + str(promoteFraction) + " - must be greater than 0 and at most 1")
+        self.lowFidelity = lowFidelity
+        self.highFidelity = highFidelity
+        self.promoteFraction = promoteFraction
+        self.incumbentMargin = incumbentMargin
+        self.lowLapTimes = []
+        self.lowFeatures = []
+        self.highLapTimes = []
+        self.correction = np.array([0, 1], dtype=float)
+        self.featureWeights = np.zeros(0)
+        self.featureMeans = np.zeros(0)
+        self.featureScales = np.ones(0)
+        self.incumbent = None
+        self.incumbentLapTime = np.inf
+
+
+    def getPredictedLapTimes(self,
+                             lowLapTimes: NDArrayFloat1D,
+                             features: NDArrayFloat2D | None = None) -> NDArrayFloat1D:
+        """
+        Predicts the high fidelity lap times from the low fidelity results
+        with the correction.
+
+        Args:
+            lowLapTimes: 1D array of the low fidelity lap times in seconds.
+            features: 2D array of shape (N, nFeatures) of the features of each
+                low fidelity lap, or None if the low fidelity has no features.
+
+        Returns:
+            1D array of the predicted high fidelity lap times in seconds.
+        """
+        lapTimes = self.correction[0] + self.correction[1] * np.asarray(lowLapTimes, dtype=float)
+        if features is not None and np.any(self.featureWeights != 0):
+            lapTimes = lapTimes + ((features - self.featureMeans) / self.featureScales) @ self.featureWeights
+        return lapTimes
+
+
+    def evaluate(self,
+                 candidates: list[Any]) -> tuple[NDArrayFloat1D, NDArrayBool1D]:
+        """
+        Evaluates a population of candidates, running the high fidelity lap
+        sim only on the promoted candidates.
+
+        Non-finite low fidelity lap times (e.g. a candidate which stops) are
+        never promoted.
+
+        Args:
+            candidates: List of the candidates, in the form the lap sim
+                functions take (e.g. Trajectory objects).
+
+        Returns:
+            Tuple of (lapTimes, BPromoted) 1D arrays, where lapTimes is the high
+            fidelity lap time of the promoted candidates and the predicted high
+            fidelity lap time of the others, and BPromoted is whether each
+            candidate was promoted.
+        """
+        nCandidates = len(candidates)
+        with profiling.timer('schedulerLowFidelity'):
+            lowResults = [self.lowFidelity(candidate) for candidate in candidates]
+        profiling.count('schedulerLowFidelityRuns', nCandidates)
+        if all(isinstance(result, tuple) for result in lowResults):
+            lowLapTimes = np.array([result[0] for result in lowResults], dtype=float)
+            features = np.array([result[1] for result in lowResults], dtype=float).reshape(nCandidates, -1)
+        else:
+            lowLapTimes = np.array(lowResults, dtype=float)
+            features = None
+        lapTimes = self.getPredictedLapTimes(lowLapTimes, features)
+
+        # Promote the best fraction of the candidates and any candidates close to the incumbent
+        BFinite = np.isfinite(lapTimes)
+        nPromote = min(math.ceil(self.promoteFraction * nCandidates), np.count_nonzero(BFinite))
+        BPromoted = np.zeros(nCandidates, dtype=bool)
+        BPromoted[np.argsort(np.where(BFinite, lapTimes, np.inf))[:nPromote]] = True
+        if self.incumbent is not None:
+            BPromoted |= BFinite & (lapTimes <= self.incumbentLapTime * (1 + self.incumbentMargin))
+
+        promoted = np.flatnonzero(BPromoted)
+        with profiling.timer('schedulerHighFidelity'):
+            highLapTimes = np.array([self.highFidelity(candidates[i]) for i in promoted], dtype=float)
+        profiling.count('schedulerHighFidelityRuns', np.size(promoted))
+        lapTimes[promoted] = highLapTimes
+
+        # Update the incumbent and the correction from the promoted candidates
+        BHighFinite = np.isfinite(highLapTimes)
+        if np.any(BHighFinite) and np.min(highLapTimes[BHighFinite]) < self.incumbentLapTime:
+            iBest = int(np.argmin(np.where(BHighFinite, highLapTimes, np.inf)))
+            self.incumbent = candidates[promoted[iBest]]
+            self.incumbentLapTime = float(highLapTimes[iBest])
+        pairs = promoted[BHighFinite]
+        self.__updateCorrection(lowLapTimes[pairs], None if features is None else features[pairs], highLapTimes[BHighFinite])
+        LOGGER.debug("Scheduler promoted %d of %d candidates - incumbent lap time %.3f s", np.size(promoted), nCandidates, self.incumbentLapTime)
+        return lapTimes, BPromoted
+
+
+    def __updateCorrection(self,
+                           lowLapTimes: NDArrayFloat1D,
+                           features: NDArrayFloat2D | None,
+                           highLapTimes: NDArrayFloat1D) -> None:
+        """
+        Internal function to add pairs of results and refit the correction to
+        the most recent SCHEDULER_CORRECTION_MAX_PAIRS pairs.
+
+        Args:
+            lowLapTimes: 1D array of the low fidelity lap times of the pairs.
+            features: 2D array of shape (nPairs, nFeatures) of the features of
+                the low fidelity laps of the pairs, or None if the low fidelity
+                has no features.
+            highLapTimes: 1D array of the high fidelity lap times of the pairs.
+        """
+        self.lowLapTimes = (self.lowLapTimes + list(lowLapTimes))[-SCHEDULER_CORRECTION_MAX_PAIRS:]
+        self.lowFeatures = (self.lowFeatures + ([] if features is None else list(features)))[-SCHEDULER_CORRECTION_MAX_PAIRS:]
+        self.highLapTimes = (self.highLapTimes + list(highLapTimes))[-SCHEDULER_CORRECTION_MAX_PAIRS:]
+        nPairs = len(self.lowLapTimes)
+        if nPairs == 0:
+            return
+
+        x = np.array(self.lowLapTimes)
+        y = np.array(self.highLapTimes)
+        if nPairs < SCHEDULER_CORRECTION_MIN_PAIRS or np.ptp(x) == 0:
+            self.correction = np.array([np.mean(y - x), 1])
+            self.featureWeights = np.zeros(0)
+            return
+
+        # Standardise the features, only using them once there are more pairs than the offset, gradient and features
+        F = np.array(self.lowFeatures).reshape(nPairs, -1) if len(self.lowFeatures) == nPairs else np.zeros((nPairs, 0))
+        if nPairs < SCHEDULER_CORRECTION_MIN_PAIRS + np.size(F, 1):
+            F = np.zeros((nPairs, 0))
+        self.featureMeans = np.mean(F, axis=0)
+        self.featureScales = np.where(np.std(F, axis=0) > 0, np.std(F, axis=0), 1)
+        F = (F - self.featureMeans) / self.featureScales
+
+        # Ridge regularised least squares fit, refitted with a gradient of 1 if the fitted gradient isn't positive
+        xCentred = x - np.mean(x)
+        ridge = np.diag(np.concat(([0, 0], np.full(np.size(F, 1), SCHEDULER_CORRECTION_RIDGE * nPairs))))
+        A = np.column_stack((np.ones(nPairs), xCentred, F))
+        coefficients = np.linalg.solve(A.T @ A + ridge, A.T @ y)
+        if coefficients[1] <= 0:
+            A = np.column_stack((np.ones(nPairs), F))
+            coefficients = np.linalg.solve(A.T @ A + ridge[1:, 1:], A.T @ (y - xCentred))
+            coefficients = np.insert(coefficients, 1, 1)
+        self.correction = np.array([coefficients[0] - coefficients[1] * np.mean(x), coefficients[1]])
+        self.featureWeights = coefficients[2:]
@@ -0,0 +1,272 @@
+"""
+Quasistatic ride model of the vehicle and its related functions.
+
+Solves the front and rear ride heights where the suspension balances the
+vertical force and pitch moment on the chassis at every point of a lap at
+once, from the aero loads of an AeroMap (which depend on the ride heights),
+the longitudinal load transfer, and the vertical and pitch accelerations of
+the chassis following the trajectory's slope. The solve is a Newton method
+vectorised over all the points, with the aero derivatives from a batched
+finite difference, and converged points are masked off so each iteration
+only evaluates the points still changing.
+"""
+
+# Import packages
+import numpy as np
+
+# Import project python files
+from Utils import profiling
+from Utils.typeAliases import *
+from aeroMap import AeroMap, AERO_MAP_OUTPUT_INDEXES
+from trajectory import Trajectory
+from lapSim import GRAVITY
+
+# Logger for the ride model module
+LOGGER = profiling.getLogger(__name__)
+
+# Ride solver constants
+RIDE_SOLVER_MAX_ITERATIONS = 20         # Maximum number of Newton iterations of the ride height solve
+RIDE_SOLVER_TOLERANCE = 1e-7            # Points are converged when both ride heights change by less than this in m in an iteration
+RIDE_SOLVER_FD_STEP = 1e-5              # Ride height step in m of the finite difference of the aero loads
+RIDE_SOLVER_MAX_STEP = 0.01             # Maximum change in m of each ride height in a single Newton iteration
+
+
+def getChassisAccels(trajectory: Trajectory,
+                     speeds: NDArrayFloat1D,
+                     longAccels: NDArrayFloat1D) -> tuple[NDArrayFloat1D, NDArrayFloat1D]:
+    """
+    Calculates the vertical and pitch accelerations of the chassis following
+    the slope of the trajectory.
+
+    The vertical acceleration is the change in the load normal to the road
+    from the static load, from the slope and the rate of change of slope
+    (e.g. compressions are positive). The pitch rate is speed * dSlope/ds, so
+    the pitch acceleration is longAccel * dSlope/ds + speed^2 * d2Slope/ds2.
+
+    Args:
+        trajectory: Trajectory the speeds are along.
+        speeds: 1D array of the speed in m/s at each trajectory point.
+        longAccels: 1D array of the longitudinal acceleration in m/s^2 at each
+            trajectory point.
+
+    Returns:
+        Tuple of (vertAccels, pitchAccels) 1D arrays in m/s^2 and rad/s^2.
+    """
+    vertAccels = GRAVITY * (np.cos(trajectory.slope) - 1) + speeds ** 2 * trajectory.dSlope_ds
+    pitchAccels = longAccels * trajectory.dSlope_ds + speeds ** 2 * np.gradient(trajectory.dSlope_ds, trajectory.S)
+    return vertAccels, pitchAccels
+
+
+class RideModel:
+    """
+    Quasistatic heave and pitch model of the chassis on its front and rear
+    suspension, with the aero loads from an aero map.
+
+    The suspension is a linear heave rate at each axle, with the static ride
+    heights at the static weight distribution, so the residuals are the
+    changes in the forces and moments from the static condition. Pitch is
+    positive nose up, and ride heights are in m so the aero map's ride height
+    dimensions must be too.
+
+    The ride heights of the most recent solve are kept, so the next solve
+    (e.g. the next lap of an optimisation) is warm started from them.
+    """
+    def __init__(self,
+                 aeroMap: AeroMap,
+                 mass: float,
+                 wheelbase: float,
+                 frontWeightFraction: float,
+                 cgHeight: float,
+                 pitchInertia: float,
+                 frontHeaveRate: float,
+                 rearHeaveRate: float,
+                 frontStaticRideHeight: float,
+                 rearStaticRideHeight: float,
+                 wingAngles: dict[str, float] | None = None) -> None:
+        """
+        Args:
+            aeroMap: Aero map of the vehicle.
+            mass: Mass of the vehicle in kg.
+            wheelbase: Distance between the front and rear axles in m.
+            frontWeightFraction: Fraction of the static weight on the front
+                axle.
+            cgHeight: Height of the centre of gravity in m.
+            pitchInertia: Pitch moment of inertia of the chassis in kg m^2.
+            frontHeaveRate: Heave rate of the front axle (both wheels) in N/m.
+            rearHeaveRate: Heave rate of the rear axle (both wheels) in N/m.
+            frontStaticRideHeight: Front ride height in m at the static load.
+            rearStaticRideHeight: Rear ride height in m at the static load.
+            wingAngles: Dictionary of each wing angle dimension of the aero
+                map to its value, or None if the aero map has no wing angles.
+        """
+        self.aeroMap = aeroMap
+        self.mass = mass
+        self.frontLength = wheelbase * (1 - frontWeightFraction)
+        self.rearLength = wheelbase * frontWeightFraction
+        self.cgHeight = cgHeight
+        self.pitchInertia = pitchInertia
+        self.heaveRates = np.array([frontHeaveRate, rearHeaveRate], dtype=float)
+        self.staticRideHeights = np.array([frontStaticRideHeight, rearStaticRideHeight], dtype=float)
+        self.wingAngles = {} if wingAngles is None else dict(wingAngles)
+        missingWingAngles = [dimension for dimension in aeroMap.wingAngleDimensions if dimension not in self.wingAngles]
+        if len(missingWingAngles) > 0:
+            raise Exception("Ride model is missing the wing angles " + str(missingWingAngles))
+        self.previousS = None
+        self.previousRideHeights = None
+
+
+    def getDownforces(self,
+                      rideHeights: NDArrayFloat2D,
+                      speeds: NDArrayFloat1D,
+                      rolls: NDArrayFloat1D,
+                      yaws: NDArrayFloat1D) -> NDArrayFloat2D:
+        """
+        Interpolates the front and rear downforce from the aero map.
+
+        Args:
+            rideHeights: 2D array of shape (2, N) of the front and rear ride
+                heights in m.
+            speeds: 1D array of the speeds in m/s.
+            rolls: 1D array of the roll angles.
+            yaws: 1D array of the yaw angles.
+
+        Returns:
+            2D array of shape (2, N) of the front and rear downforce in N.
+        """
+        aeroLoads = self.aeroMap.getAeroLoads({'FrontRideHeight': rideHeights[0], 'RearRideHeight': rideHeights[1], 'Roll': rolls, 'Yaw': yaws,
+                                               'Speed': speeds, **self.wingAngles})
+        return aeroLoads[[AERO_MAP_OUTPUT_INDEXES['FrontDownforce'], AERO_MAP_OUTPUT_INDEXES['RearDownforce']]]
+
+
+    def getResiduals(self,
+                     rideHeights: NDArrayFloat2D,
+                     downforces: NDArrayFloat2D,
+                     longAccels: NDArrayFloat1D,
+                     vertAccels: NDArrayFloat1D,
+                     pitchAccels: NDArrayFloat1D) -> NDArrayFloat2D:
+        """
+        Calculates the vertical force and pitch moment residuals on the
+        chassis, which are 0 at the solution.
+
+        Args:
+            rideHeights: 2D array of shape (2, N) of the front and rear ride
+                heights in m.
+            downforces: 2D array of shape (2, N) of the front and rear
+                downforce in N at the ride heights.
+            longAccels: 1D array of the longitudinal accelerations in m/s^2.
+            vertAccels: 1D array of the vertical accelerations in m/s^2, see
+                getChassisAccels().
+            pitchAccels: 1D array of the pitch accelerations in rad/s^2, see
+                getChassisAccels().
+
+        Returns:
+            2D array of shape (2, N) of the vertical force residuals in N and
+            the pitch moment residuals about the centre of gravity in Nm.
+        """
+        springForces = self.heaveRates[:, np.newaxis] * (self.staticRideHeights[:, np.newaxis] - rideHeights)
+        netForces = springForces - downforces
+        forceResiduals = netForces[0] + netForces[1] - self.mass * vertAccels
+        momentResiduals = (self.frontLength * netForces[0] - self.rearLength * netForces[1] + self.mass * self.cgHeight * longAccels
+                           - self.pitchInertia * pitchAccels)
+        return np.stack((forceResiduals, momentResiduals))
+
+
+    def solveRideHeights(self,
+                         speeds: NDArrayFloat1D,
+                         longAccels: NDArrayFloat1D,
+                         vertAccels: NDArrayFloat1D,
+                         pitchAccels: NDArrayFloat1D,
+                         rolls: float | NDArrayFloat1D = 0,
+                         yaws: float | NDArrayFloat1D = 0,
+                         S: NDArrayFloat1D | None = None,
+                         initialRideHeights: NDArrayFloat2D | None = None) -> tuple[NDArrayFloat2D, NDArrayFloat2D, NDArrayInt1D]:
+        """
+        Solves the front and rear ride heights with zero force and moment
+        residuals at all the points at once.
+
+        Each Newton iteration evaluates the aero map at the ride heights and
+        a finite difference step of each ride height in a single batched
+        lookup, then solves the 2x2 Jacobian of each point analytically. The
+        steps are limited to RIDE_SOLVER_MAX_STEP, and points stop iterating
+        once their step is within RIDE_SOLVER_TOLERANCE.
+
+        Args:
+            speeds: 1D array of the speeds in m/s.
+            longAccels: 1D array of the longitudinal accelerations in m/s^2.
+            vertAccels: 1D array of the vertical accelerations in m/s^2, see
+                getChassisAccels().
+            pitchAccels: 1D array of the pitch accelerations in rad/s^2, see
+                getChassisAccels().
+            rolls: Roll angle, or 1D array of the roll angle of each point.
+            yaws: Yaw angle, or 1D array of the yaw angle of each point.
+            S: 1D array of the distance along the trajectory of each point,
+                used to warm start from the previous solve by interpolating
+                its ride heights. None to not warm start from it.
+            initialRideHeights: 2D array of shape (2, N) of the initial ride
+                heights in m, overriding the warm start. Defaults to the previous
+                solve if S is given, otherwise the static ride heights.
+
+        Returns:
+            Tuple of (rideHeights, downforces, nIterations) where rideHeights
+            and downforces are 2D arrays of shape (2, N) of the front and rear
+            values at each point, and nIterations is a 1D array of the number
+            of Newton iterations of each point (RIDE_SOLVER_MAX_ITERATIONS if
+            it didn't converge).
+        """
+        nPoints = np.size(speeds)
+        speeds, longAccels, vertAccels, pitchAccels, rolls, yaws = (np.broadcast_to(np.asarray(array, dtype=float), (nPoints,))
+                                                                     for array in (speeds, longAccels, vertAccels, pitchAccels, rolls, yaws))
+
+        # Initial ride heights
+        if initialRideHeights is not None:
+            rideHeights = np.array(initialRideHeights, dtype=float).reshape(2, nPoints)
+        elif S is not None and self.previousS is not None:
+            rideHeights = np.stack([np.interp(S, self.previousS, previous) for previous in self.previousRideHeights])
+        else:
+            rideHeights = np.repeat(self.staticRideHeights[:, np.newaxis], nPoints, axis=1)
+
+        downforces = np.empty((2, nPoints))
+        nIterations = np.full(nPoints, RIDE_SOLVER_MAX_ITERATIONS)
+        active = np.arange(nPoints)
+        fdSteps = np.array([[RIDE_SOLVER_FD_STEP, 0], [0, RIDE_SOLVER_FD_STEP]])
+        with profiling.timer('rideSolve'):
+            for iteration in range(RIDE_SOLVER_MAX_ITERATIONS):
+                profiling.count('rideSolvePoints', np.size(active))
+
+                # Aero loads at the ride heights and a step of each ride height in one lookup
+                h = rideHeights[:, active]
+                nActive = np.size(active)
+                hAll = np.concatenate((h, h + fdSteps[:, [0]], h + fdSteps[:, [1]]), axis=1)
+                downforcesAll = self.getDownforces(hAll, np.tile(speeds[active], 3), np.tile(rolls[active], 3), np.tile(yaws[active], 3))
+                downforces[:, active] = downforcesAll[:, :nActive]
+
+                # Residuals and their Jacobian - the spring terms are analytic and the aero terms are from the finite difference
+                residuals = self.getResiduals(h, downforcesAll[:, :nActive], longAccels[active], vertAccels[active], pitchAccels[active])
+                dDownforces = [(downforcesAll[:, (j + 1) * nActive:(j + 2) * nActive] - downforcesAll[:, :nActive]) / RIDE_SOLVER_FD_STEP for j in range(2)]
+                dNetForces = [-self.heaveRates[j] * (np.arange(2) == j)[:, np.newaxis] - dDownforces[j] for j in range(2)]
+                jacobian = np.array([[dNetForces[j][0] + dNetForces[j][1] for j in range(2)],
+                                     [self.frontLength * dNetForces[j][0] - self.rearLength * dNetForces[j][1] for j in range(2)]])
+
+                # Newton step from the 2x2 inverse of each point's Jacobian
+                determinants = jacobian[0, 0] * jacobian[1, 1] - jacobian[0, 1] * jacobian[1, 0]
+                steps = -np.stack((jacobian[1, 1] * residuals[0] - jacobian[0, 1] * residuals[1],
+                                   jacobian[0, 0] * residuals[1] - jacobian[1, 0] * residuals[0])) / determinants
+                steps = np.minimum(np.maximum(steps, -RIDE_SOLVER_MAX_STEP), RIDE_SOLVER_MAX_STEP)
+                rideHeights[:, active] = h + steps
+
+                # Mask off the converged points
+                BConverged = np.all(np.abs(steps) < RIDE_SOLVER_TOLERANCE, axis=0)
+                nIterations[active[BConverged]] = iteration + 1
+                active = active[~BConverged]
+                if np.size(active) == 0:
+                    break
+
+        # Downforces at the final ride heights of the points which didn't converge
+        if np.size(active) > 0:
+            downforces[:, active] = self.getDownforces(rideHeights[:, active], speeds[active], rolls[active], yaws[active])
+            LOGGER.warning("Ride height solve didn't converge at %d of %d points", np.size(active), nPoints)
+
+        if S is not None:
+            self.previousS = np.array(S, dtype=float)
+            self.previousRideHeights = rideHeights.copy()
+        return rideHeights, downforces, nIterations
@@ -0,0 +1,97 @@
+"""
+Finite difference checks of the analytic gradients of Trajectory.getGradients().
+
+Each control point coordinate is perturbed either side and the fourth order
+central difference of every objective (the lap time proxies and the areas
+outside the track limits) is compared with its analytic gradient, on a closed
+and an open track. Run from the repository folder with
+
+    python -m pytest tests
+"""
+
+# Import packages
+import os
+import sys
+import numpy as np
+import pytest
+
+# Import project python files - utils is imported before track as they import each other
+REPO_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [REPO_FOLDER, os.path.join(REPO_FOLDER, "Utils")]
+from Utils import utils
+import benchmark
+import trajectory
+from track import Track
+
+# Test constants
+FD_STEP = 5e-4                          # Perturbation in metres of each control point coordinate for the finite differences
+FD_TOLERANCE = 1e-9                     # Maximum error of each finite difference relative to the largest gradient of its objective
+GRADIENT_KEYS = ['Length', 'LapTime', 'LimitsArea', 'LimitsExtendArea']  # Objectives of Trajectory.getGradients() checked
+TEST_LAYOUT = 'chicanes'                # Benchmark layout of the test tracks
+TEST_OPEN_LIMITS_POINTS = 200           # Number of limits points of the layout used for the open track
+TEST_CP_GATE_STEP = 3                   # Number of gates between the control points
+TEST_CP_OFFSET = 7                      # Amplitude in metres of the lateral offset of the control points, so parts of the trajectory are outside the limits
+TEST_CP_SHIFT = 2.3                     # Distance in metres the control points are moved along the gate direction, so no gate is crossed exactly at a sample
+
+
+def getTestTrajectory(BClosed: bool) -> tuple[str, Track, np.ndarray]:
+    """
+    Creates a track from the test layout and control points of a trajectory
+    weaving either side of its gate midpoints.
+
+    Args:
+        BClosed: If true, the track is closed and the trajectory is a 'Closed
+            Circuit'.
+
+            If false, the track is the start of the layout and the trajectory
+            is 'Point to Point with Run Up', with a control point either side
+            of the track.
+
+    Returns:
+        Tuple of (trajType, track, CP).
+    """
+    left, right = benchmark.getLayoutLimits(TEST_LAYOUT, 2)
+    if BClosed:
+        trajType = 'Closed Circuit'
+        track = Track(left, right, isClosed=True, gateStep=10)
+    else:
+        trajType = 'Point to Point with Run Up'
+        track = Track(left[:TEST_OPEN_LIMITS_POINTS], right[:TEST_OPEN_LIMITS_POINTS], isClosed=False, gateStep=10)
+
+    gatesMidpoint = track.gatesMidpoint[::TEST_CP_GATE_STEP]
+    gatesDirection = track.gatesDirection[::TEST_CP_GATE_STEP]
+    gatesNormal = np.column_stack((-gatesDirection[:, 1], gatesDirection[:, 0]))
+    offsets = TEST_CP_OFFSET * np.sin(1.3 * np.arange(len(gatesMidpoint)))
+    CP = gatesMidpoint + (offsets[:, np.newaxis] * gatesNormal) + (TEST_CP_SHIFT * gatesDirection)
+    if not BClosed:
+        CP = np.vstack((CP[0] - 15 * gatesDirection[0], CP, CP[-1] + 15 * gatesDirection[-1]))
+    return trajType, track, CP
+
+
+@pytest.mark.parametrize('BClosed', [True, False], ids=['closed', 'open'])
+def test_getGradients(BClosed: bool) -> None:
+    """
+    Checks the analytic gradients of every objective against the fourth order
+    central finite differences for each control point coordinate.
+
+    Args:
+        BClosed: Whether to test the closed track (see getTestTrajectory()).
+    """
+    trajType, track, CP = getTestTrajectory(BClosed)
+    gradients = trajectory.Trajectory(trajType, track, CP, 2).getGradients()
+    for key in GRADIENT_KEYS:
+        assert gradients[key][0] > 0, key + " is not positive so its gradient isn't tested"
+
+    stencil = [(2, -1 / 12), (1, 8 / 12), (-1, -8 / 12), (-2, 1 / 12)]
+    fdGradients = {key: np.zeros(np.shape(CP)) for key in GRADIENT_KEYS}
+    for i, j in np.ndindex(*np.shape(CP)):
+        for nSteps, weight in stencil:
+            perturbedCP = CP.copy()
+            perturbedCP[i, j] += nSteps * FD_STEP
+            perturbedGradients = trajectory.Trajectory(trajType, track, perturbedCP, 2).getGradients()
+            for key in GRADIENT_KEYS:
+                fdGradients[key][i, j] += weight * perturbedGradients[key][0] / FD_STEP
+
+    for key in GRADIENT_KEYS:
+        errors = np.abs(fdGradients[key] - gradients[key][1]) / np.max(np.abs(gradients[key][1]))
+        assert np.max(errors) < FD_TOLERANCE, key + " gradient differs from the finite differences by " + str(np.max(errors))
@@ -5,7 +5,12 @@ CoordinateArray, Event and Gate classes used to generate and define the track.
 """
 
 # Import packages
+import os
 import time
+import hashlib
+import itertools
+from collections.abc import Iterator
+import concurrent.futures
 import scipy
 import shapely
 import numpy as np
@@ -13,15 +18,36 @@ import matplotlib.pyplot as plt
 
 # Import project python files
 from Utils import utils
+from Utils import profiling
 from Utils.typeAliases import *
 
+# Logger for the track module
+LOGGER = profiling.getLogger(__name__)
+
 # Filename constants
-TRACK_PKL_FILENAME = "Track.pkl"
+TRACK_CACHE_FILENAME_FORMAT = "Track_{}.npz"    # Formatted with the hash of the track generation inputs
 LIMIT_LEFT_SOFT_FILENAME = "xyzLimitLeftSoft.csv"
 LIMIT_RIGHT_SOFT_FILENAME = "xyzLimitRightSoft.csv"
 LIMIT_LEFT_HARD_FILENAME = "xyzLimitLeftHard.csv"
 LIMIT_RIGHT_HARD_FILENAME = "xyzLimitRightHard.csv"
 
+# Track limits file constants
+LIMIT_CSV_CHUNK_ROWS = 500000           # Number of rows of a track limits CSV file parsed at a time when streaming it
+LIMIT_BINARY_FILENAME_FORMAT = "{}_{}.npy"  # Binary copy of a limits CSV file, formatted with the CSV filename (without extension) and the decimation
+                                        # tolerance ('Raw' if not decimated)
+LIMITS_NAMES = ['Left', 'Right', 'LeftExtend', 'RightExtend']  # Names of the track limits, e.g. for editing the limits with Track.updateLimits()
+
+# Track cache constants
+TRACK_CACHE_VERSION = 4                 # Included in the track cache hash - increment when gate generation changes to invalidate old cache entries
+TRACK_CACHE_MAX_SIZE = 500e6            # Maximum total size in bytes of the track cache entries in the cache folder, oldest entries are evicted first
+TRACK_CACHE_MAX_AGE = 30 * 24 * 3600    # Maximum age in seconds since a track cache entry was last used before it is evicted
+
+# Track z height constants
+Z_RASTER_GRID_SPACING = 1               # Default grid spacing in metres of the z height raster built by Track.buildZRaster()
+Z_WINDOW_GATE_COUNT = 10                # Number of gates in each window of gates with its own local z interpolators
+Z_WINDOW_MARGIN = 20                    # Distance in metres along the limits that the local z interpolator data points extend beyond each end of the window
+                                        #   Must be long enough to cover the wheelbase, but shorter than the gap to any overlapping track segment
+
 # CoordinateArray constants
 LP_FILT_SPATIAL_FREQ = 0.1              # Low-pass cutoff spatial frequency (cycles per metre)
 LP_FILT_ORDER = 1                       # Order of the low-pass filter
@@ -43,7 +69,26 @@ GATE_EXTEND_WIDTH = 10                  # Additional width beyond the respective
                                         #   Higher gives more robustness by allowing the trajectory that exceeds track limits to still be solved
                                         #   Too high can cause gates to be skipped in tight corners due to overlapping
 
+GATE_ADAPTIVE_HEADING_STEP = 0.1       # Target change in the low-pass filtered heading in radians between consecutive gates for adaptive gate spacing
+                                        #   Lower gives denser gates in corners (within the gate step bounds)
+
+GATE_UPDATE_MARGIN_GATES = 3            # Number of gates either side of the gates affected by an edit to the limits that are also re-solved
+                                        # when updating the track, so the re-solved gates rejoin the existing gates where they're unaffected
+
+GATE_SOLVE_MAX_ITERATIONS = 20          # Maximum number of Newton iterations for the gate root finding before falling back to SciPy minimize
+GATE_SOLVE_FD_STEP = 1e-6               # Step in radians for the finite difference Jacobian of the gate root finding
+GATE_SOLVE_MAX_STEP = 0.2               # Maximum change in radians of psi or theta for each Newton iteration of the gate root finding
+GATE_SOLVE_WIDTH_TOLERANCE = 1e-6       # Tolerance in metres on leftWidth - rightWidth for the gate root finding to be converged
+GATE_SOLVE_ANGLE_TOLERANCE = 1e-6       # Tolerance in radians on leftAngle + rightAngle for the gate root finding to be converged
+
 # Track generation constants
+GATE_SECTOR_MIN_GATES = 8               # Minimum number of gates per sector for sectorised gate creation, fewer sectors are used for short tracks
+GATE_SECTOR_ANCHOR_SPACING = 10         # Distance in metres along the left limits between the anchors matching the left and right limits, for predicting
+                                        # where serial gate creation would place the seed gate of each sector
+GATE_SECTOR_CENTRELINE_SPACING = 1      # Distance in metres along the left limits between the centreline points the sector seed gates are predicted along
+GATE_SECTOR_SEAM_TOLERANCE = 0.02       # Maximum distance between the first gate of a sector and the matching gate of the previous sector, as a fraction
+                                        # of the (nominal) gate step, to join the sectors there - otherwise the sector is marched again from the previous sector
+
 CLOSED_TRACK_THRESHOLD_DISTANCE = 10    # Maximum (direct) distance from the start to finish coordinates of the provided soft track limits
                                         # to consider the track closed, when using the automatic logic
 
@@ -67,15 +112,183 @@ def getLimitsDistances(limits: NDArrayFloat2D) -> NDArrayFloat1D:
         1D array representing the cumulative distance along the limits
         coordinates, assuming straight lines between limits coordinates.
     """
-    n = np.size(limits, 0)
-    distances = np.empty(n)
+    distances = np.empty(np.size(limits, 0))
     distances[0] = 0
-    for i in range(1, n):
-        distances[i] = distances[i - 1] + scipy.linalg.norm(limits[i] - limits[i - 1])
+    np.cumsum(np.linalg.norm(np.diff(limits, axis=0), axis=1), out=distances[1:])
 
     return distances
 
 
+def getDistanceIndex(distances: NDArrayFloat1D,
+                     dist: float) -> int:
+    """
+    Binary searches for the index of the limits coordinate from which the
+    segment containing the distance along the limits starts.
+
+    Args:
+        distances: 1D array representing the cumulative distance along the
+            limits coordinates.
+        dist: Distance along the limits.
+
+    Returns:
+        Index of the limits coordinate from which the segment containing dist
+        starts, clipped to the valid segment indexes.
+    """
+    return int(np.clip(np.searchsorted(distances, dist, side='right') - 1, 0, np.size(distances) - 2))
+
+
+def getClosedLimits(limits: NDArrayFloat2D,
+                    isClosed: bool) -> NDArrayFloat2D:
+    """
+    Appends the first coordinate to the end of the limits if the track is
+    closed and the limits aren't already closed.
+
+    Args:
+        limits: 2D array where each index is an [x, y, z] coordinate of the
+            track limit.
+        isClosed: Whether the track is closed.
+
+    Returns:
+        2D array of the limits, closed if isClosed.
+    """
+    if isClosed and not np.array_equal(limits[0], limits[-1]):
+        return np.vstack((limits, limits[0]))
+    return limits
+
+
+def getUpdatedDistances(dists: NDArrayFloat1D,
+                        oldDistances: NDArrayFloat1D,
+                        newDistances: NDArrayFloat1D,
+                        edits: list[tuple[int, int, int]]) -> NDArrayFloat1D:
+    """
+    Maps distances along the limits from before to after editing ranges of
+    the limits coordinates, for points on segments that weren't edited.
+
+    Each point stays at the same offset along its (unedited) segment, whose
+    index is shifted by the change in the number of coordinates of the edits
+    before it.
+
+    Args:
+        dists: 1D array of distances along the limits before the edits.
+        oldDistances: 1D array of the cumulative distance along the limits
+            coordinates before the edits.
+        newDistances: 1D array of the cumulative distance along the limits
+            coordinates after the edits.
+        edits: List of (iStart, iStop, nCoords) of each edit, where the
+            coordinates from index iStart up to (not including) iStop were
+            replaced with nCoords coordinates.
+
+    Returns:
+        1D array of the distances along the limits after the edits (NaN where
+        dists is NaN).
+    """
+    iSegments = np.clip(np.searchsorted(oldDistances, dists, side='right') - 1, 0, np.size(oldDistances) - 2)
+    iStops = np.array([iStop for _, iStop, _ in edits], dtype=int)
+    order = np.argsort(iStops)
+    cumShifts = np.concat(([0], np.cumsum([edits[i][2] - (edits[i][1] - edits[i][0]) for i in order])))
+    iNewSegments = iSegments + cumShifts[np.searchsorted(iStops[order], iSegments, side='right')]
+    return newDistances[iNewSegments] + (dists - oldDistances[iSegments])
+
+
+class CoordinateArray:
+    """
+    Contains information about the coordinate array and its related functions,
+    used during track generation.
+
+    The cumulative distances, headings and low-pass filtered headings are all
+    calculated in one vectorised pass on initialisation, and stored as NumPy
+    arrays corresponding to the coordinates.
+    """
+    def __init__(self,
+                 coordArray: list[list[float]] | NDArrayFloat2D,
+                 BClosedTrack: bool,
+                 BAllowAHeadingNegativeInit: bool = False) -> None:
+        """
+        Makes sure that the coordArray is closed if BClosedTrack is true (i.e.
+        last coordinate == first coordinate), then calculates the sCoords,
+        AHeadings and AHeadingsFilt arrays.
+
+        Args:
+            coordArray: 2D array where each index is an [x, y, z] coordinate,
+                and each subsequent index increases the distance along the
+                track.
+            BClosedTrack: If true, the coordinate array will be treated as
+                being closed.
+
+                If false, the coordinate array will be treated as being open.
+            BAllowAHeadingNegativeInit: If true, will wrap the initial heading
+                angle to the range from -pi to pi.
+
+                If false, the initial heading angle will be in the range 0 to
+                2 pi.
+
+                This is applied according to the low-pass filtered heading
+                angle, then applied to the unfiltered heading angle, so that
+                AHeadings is consistent between CoordinateArray objects even
+                when the initial heading is close to 0.
+        """
+        coordArray = np.asarray(coordArray, dtype=float)
+        if BClosedTrack and not np.array_equal(coordArray[0], coordArray[-1]):
+            coordArray = np.vstack((coordArray, coordArray[0]))
+        self.xyzCoordArray = coordArray
+        self.BClosedTrack = BClosedTrack
+        self.sCoords = getLimitsDistances(coordArray)
+
+        # Unwrapped heading of each segment (0 is north, increasing clockwise), skipping zero length segments
+        segVectors = np.diff(coordArray[:, :2], axis=0)
+        segValid = np.flatnonzero(np.hypot(segVectors[:, 0], segVectors[:, 1]) > 0)
+        segHeadings = np.unwrap(np.arctan2(segVectors[segValid, 0], segVectors[segValid, 1]))
+
+        # Heading at each coordinate is the heading of the next (non-zero length) segment, or the last segment for the last coordinate
+        nextValid = np.minimum(np.searchsorted(segValid, np.arange(np.size(coordArray, 0))), np.size(segValid) - 1)
+        self.AHeadings = segHeadings[nextValid]
+        self.AHeadingsFilt = self.__lowPassFilter(self.AHeadings)
+
+        # Shift the headings by a multiple of 2 pi so the initial filtered heading is in the range specified by BAllowAHeadingNegativeInit
+        AInitLower = -np.pi if BAllowAHeadingNegativeInit else 0
+        AShift = utils.wrap(self.AHeadingsFilt[0], AInitLower, AInitLower + 2 * np.pi) - self.AHeadingsFilt[0]
+        self.AHeadings += AShift
+        self.AHeadingsFilt += AShift
+
+
+    def __lowPassFilter(self,
+                        values: NDArrayFloat1D) -> NDArrayFloat1D:
+        """
+        Internal function to low-pass filter values along the coordinates in
+        the spatial domain, with cutoff frequency LP_FILT_SPATIAL_FREQ and
+        order LP_FILT_ORDER.
+
+        The values are resampled to a uniform distance step for the
+        (zero-phase) filter, then interpolated back onto sCoords. If the
+        coordinate array is closed, the values are filtered periodically after
+        removing the linear trend (i.e. the net turning over the lap).
+
+        Args:
+            values: 1D array of values corresponding to the coordinates.
+
+        Returns:
+            1D array of the low-pass filtered values.
+        """
+        sTotal = self.sCoords[-1]
+        sStep = min(np.median(np.diff(self.sCoords)), 1 / (4 * LP_FILT_SPATIAL_FREQ))
+        nSamples = int(np.ceil(sTotal / sStep)) + 1
+        if sTotal <= 0 or nSamples < 4 * (LP_FILT_ORDER + 1):
+            # Too few samples to filter
+            return values.copy()
+        sSamples = np.linspace(0, sTotal, nSamples)
+        sos = scipy.signal.butter(LP_FILT_ORDER, LP_FILT_SPATIAL_FREQ, fs=(nSamples - 1) / sTotal, output='sos')
+
+        if self.BClosedTrack:
+            trend = (values[-1] - values[0]) * (self.sCoords / sTotal)
+            samples = np.interp(sSamples[:-1], self.sCoords, values - trend)
+            filtSamples = scipy.signal.sosfiltfilt(sos, np.tile(samples, 3))[nSamples - 1:2 * (nSamples - 1) + 1]
+            return np.interp(self.sCoords, sSamples, filtSamples) + trend
+        else:
+            samples = np.interp(sSamples, self.sCoords, values)
+            filtSamples = scipy.signal.sosfiltfilt(sos, samples)
+            return np.interp(self.sCoords, sSamples, filtSamples)
+
+
 def getGateFromCoords(leftCoord: NDArrayFloat1D,
                       rightCoord: NDArrayFloat1D,
                       gateHalfWidth: float) -> tuple[shapely.LineString, NDArrayFloat1D, NDArrayFloat1D]:
@@ -113,6 +326,36 @@ def getGateFromCoords(leftCoord: NDArrayFloat1D,
     return gate, gateMidpoint, gateDirection
 
 
+def getStartFinishLineCoords(startLineCoords: NDArrayFloat2D | None,
+                             finishLineCoords: NDArrayFloat2D | None,
+                             left: NDArrayFloat2D,
+                             right: NDArrayFloat2D,
+                             isClosed: bool) -> tuple[NDArrayFloat2D, NDArrayFloat2D]:
+    """
+    Creates the start/finish line coordinates if they aren't available, based
+    on the left and right limits. If the track is closed, a missing line is
+    the same as the other line, otherwise the start line is the start of the
+    limits and the finish line is the end of the limits.
+
+    Args:
+        startLineCoords: [left, right] [x, y] coordinates of the start line,
+            or None.
+        finishLineCoords: [left, right] [x, y] coordinates of the finish line,
+            or None.
+        left: 2D array of the (closed if isClosed) left track limits.
+        right: 2D array of the (closed if isClosed) right track limits.
+        isClosed: Whether the track is closed.
+
+    Returns:
+        Tuple of (startLineCoords, finishLineCoords).
+    """
+    if startLineCoords is None:
+        startLineCoords = finishLineCoords if isClosed and finishLineCoords is not None else np.array([left[0][:2], right[0][:2]])
+    if finishLineCoords is None:
+        finishLineCoords = startLineCoords if isClosed else np.array([left[-1][:2], right[-1][:2]])
+    return startLineCoords, finishLineCoords
+
+
 def getGateExtendLine(gateMidpoint: NDArrayFloat1D,
                       gateDirection: NDArrayFloat1D,
                       leftExtendWidth: float,
@@ -143,151 +386,486 @@ def getGateExtendLine(gateMidpoint: NDArrayFloat1D,
     return extendLine
 
 
-def getReducedLimitsClosed(limits: NDArrayFloat2D,
-                           indexes: NDArrayInt1D,
-                           nLimits: int,
-                           distances: NDArrayFloat1D,
-                           prevDist: float,
-                           gateStep: float,
-                           reducedWindow: float) -> tuple[NDArrayFloat2D, list[float]]:
+def getGatesFromMidpoints(gatesMidpoint: NDArrayFloat2D,
+                          gatesDirection: NDArrayFloat2D,
+                          gateHalfWidth: float) -> NDArrayObject1D:
+    """
+    Vectorised creation of the Shapely LineStrings for all the gates from their
+    midpoints and directions.
+
+    Args:
+        gatesMidpoint: 2D array where each index is the [x, y] coordinates of
+            the midpoint of the gate.
+        gatesDirection: 2D array where each index is the direction vector of
+            the gate in the direction of forward travel, normalised to a
+            magnitude of 1.
+        gateHalfWidth: Half-width of the gates.
+
+    Returns:
+        1D array of Shapely LineStrings representing the gates.
+    """
+    leftVectors = np.column_stack((-gatesDirection[:, 1], gatesDirection[:, 0])) * gateHalfWidth
+    gatesCoords = np.stack((gatesMidpoint + leftVectors, gatesMidpoint - leftVectors), axis=1)
+    return shapely.linestrings(gatesCoords)
+
+
+def getTrackCacheKey(left: NDArrayFloat2D,
+                     right: NDArrayFloat2D,
+                     leftExtend: NDArrayFloat2D,
+                     rightExtend: NDArrayFloat2D,
+                     startLineCoords: NDArrayFloat2D | None,
+                     finishLineCoords: NDArrayFloat2D | None,
+                     isClosed: bool | None,
+                     gateStep: float,
+                     gateHalfWidth: float,
+                     nGateSectors: int,
+                     gateStepBounds: tuple[float, float] | None = None) -> str:
+    """
+    Calculates the hash of all the inputs and constants affecting track
+    generation, used as the key for the track cache.
+
+    Args:
+        left: 2D array where each index is an [x, y, z] coordinate of the left
+            track limits.
+        right: 2D array where each index is an [x, y, z] coordinate of the
+            right track limits.
+        leftExtend: 2D array where each index is an [x, y, z] coordinate of
+            the left extend limits.
+        rightExtend: 2D array where each index is an [x, y, z] coordinate of
+            the right extend limits.
+        startLineCoords: 2D array of the [x, y] coordinates of the start line,
+            or None if not provided.
+        finishLineCoords: 2D array of the [x, y] coordinates of the finish
+            line, or None if not provided.
+        isClosed: Whether the track is closed, or None if this is determined
+            automatically.
+        gateStep: Distance between consecutive gate midpoints.
+        gateHalfWidth: Half-width of the gate.
+        nGateSectors: Number of sectors for sectorised gate creation.
+        gateStepBounds: Tuple of (gateStepMin, gateStepMax) for adaptive gate
+            spacing, or None for the fixed gateStep.
+
+    Returns:
+        Hexadecimal string of the SHA-256 hash.
+    """
+    trackHash = hashlib.sha256()
+    for coords in [left, right, leftExtend, rightExtend, startLineCoords, finishLineCoords]:
+        if coords is None:
+            trackHash.update(b'None')
+        else:
+            coords = np.ascontiguousarray(coords, dtype=np.float64)
+            trackHash.update(str(coords.shape).encode())
+            trackHash.update(coords)    # Hashes the array buffer directly so memory-mapped limits aren't copied into memory
+    settings = [isClosed, gateStep, gateHalfWidth, nGateSectors, gateStepBounds, TRACK_CACHE_VERSION, GATE_EXTEND_WIDTH, GATE_SOLVE_MAX_ITERATIONS,
+                GATE_SOLVE_FD_STEP, GATE_SOLVE_MAX_STEP, GATE_SOLVE_WIDTH_TOLERANCE, GATE_SOLVE_ANGLE_TOLERANCE, GATE_SECTOR_MIN_GATES,
+                GATE_SECTOR_ANCHOR_SPACING, GATE_SECTOR_CENTRELINE_SPACING, GATE_SECTOR_SEAM_TOLERANCE, LP_FILT_SPATIAL_FREQ, LP_FILT_ORDER]
+    if gateStepBounds is not None:
+        settings.append(GATE_ADAPTIVE_HEADING_STEP)
+    trackHash.update(repr(settings).encode())
+    return trackHash.hexdigest()
+
+
+def evictTrackCache(cacheDir: str | os.PathLike,
+                    maxSize: float = TRACK_CACHE_MAX_SIZE,
+                    maxAge: float = TRACK_CACHE_MAX_AGE) -> None:
+    """
+    Removes track cache entries in the cache folder which have not been used
+    for longer than maxAge, then removes the least recently used entries until
+    the total size of the entries is no larger than maxSize.
+
+    Args:
+        cacheDir: Path to the track cache folder.
+        maxSize: Maximum total size in bytes of the track cache entries.
+        maxAge: Maximum age in seconds since a track cache entry was last used.
+    """
+    prefix, suffix = TRACK_CACHE_FILENAME_FORMAT.split('{}')
+    entries = [entry for entry in os.scandir(cacheDir) if entry.is_file() and entry.name.startswith(prefix) and entry.name.endswith(suffix)]
+
+    # Sort from most recently used to least recently used (loading an entry updates its modified time)
+    entries.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+    now = time.time()
+    totalSize = 0
+    for entry in entries:
+        totalSize += entry.stat().st_size
+        if now - entry.stat().st_mtime > maxAge or totalSize > maxSize:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass    # Entry already removed (e.g. by another process)
+
+
+def readCoordsCsvChunks(csvPath: str | os.PathLike,
+                        chunkRows: int = LIMIT_CSV_CHUNK_ROWS) -> Iterator[NDArrayFloat2D]:
+    """
+    Streams a coordinates CSV file (e.g. the track limits), where each row is
+    a coordinate in the form x,y,z, in chunks of rows so the whole file is
+    never parsed at once. A non-numeric first row is treated as a header and
+    skipped.
+
+    Args:
+        csvPath: Path to the CSV file.
+        chunkRows: Number of rows to parse at a time.
+
+    Yields:
+        2D array where each index is an [x, y, z] coordinate, for each chunk.
+    """
+    with open(csvPath) as f:
+        firstLine = f.readline()
+        try:
+            [float(value) for value in firstLine.split(',')]
+            pendingLines = [firstLine]
+        except ValueError:
+            pendingLines = []   # Header row
+
+        while True:
+            lines = pendingLines + list(itertools.islice(f, chunkRows - len(pendingLines)))
+            pendingLines = []
+            if not lines:
+                return
+            chunk = np.loadtxt(lines, delimiter=',', ndmin=2)
+            if chunk.size == 0:
+                continue
+            if np.size(chunk, 1) != 3:
+                raise Exception("Expected rows of x,y,z in " + str(csvPath) + " but found " + str(np.size(chunk, 1)) + " columns")
+            yield chunk
+
+
+def decimateCoordsChunks(chunks: Iterator[NDArrayFloat2D],
+                         tolerance: float) -> Iterator[NDArrayFloat2D]:
+    """
+    Decimates streamed chunks of coordinates with the Douglas-Peucker
+    algorithm, removing coordinates which are within the tolerance of the
+    simplified line. The tolerance is on the [x, y] distance, the z values of
+    the remaining coordinates are kept.
+
+    Each chunk is simplified together with the last coordinate of the previous
+    chunk, so the chunk boundaries are kept but the simplified line is
+    continuous and still within the tolerance.
+
+    Args:
+        chunks: Iterator of 2D arrays of [x, y, z] coordinates.
+        tolerance: Maximum distance of the removed coordinates from the
+            simplified line.
+
+    Yields:
+        2D array of the remaining [x, y, z] coordinates, for each chunk.
+    """
+    lastCoord = None
+    for chunk in chunks:
+        if lastCoord is not None:
+            chunk = np.vstack((lastCoord, chunk))
+        if np.size(chunk, 0) >= 2:
+            chunk = shapely.get_coordinates(shapely.simplify(shapely.linestrings(chunk), tolerance, preserve_topology=False), include_z=True)
+        yield chunk if lastCoord is None else chunk[1:]
+        lastCoord = chunk[-1]
+
+
+def getCoordsBinaryPath(csvPath: str | os.PathLike,
+                        tolerance: float | None = None) -> str:
+    """
+    Gets the path of the binary copy of a coordinates CSV file, which is saved
+    in the same folder.
+
+    Args:
+        csvPath: Path to the CSV file.
+        tolerance: Decimation tolerance, or None if not decimated.
+
+    Returns:
+        Path of the .npy binary copy.
+    """
+    csvPath = os.fspath(csvPath)
+    return os.path.join(os.path.dirname(csvPath), LIMIT_BINARY_FILENAME_FORMAT.format(os.path.splitext(os.path.basename(csvPath))[0],
+                                                                                      'Raw' if tolerance is None else repr(float(tolerance))))
+
+
+def loadCoordsFile(csvPath: str | os.PathLike,
+                   tolerance: float | None = None,
+                   chunkRows: int = LIMIT_CSV_CHUNK_ROWS) -> NDArrayFloat2D:
+    """
+    Loads a coordinates CSV file (e.g. the track limits) as a read-only
+    memory-mapped array, so millions of coordinates can be used without
+    parsing or copying them into memory.
+
+    On the first load, the CSV file is streamed in chunks (optionally
+    decimated) into a .npy binary copy next to it (see getCoordsBinaryPath()).
+    Later loads memory-map the binary copy directly, unless the CSV file has
+    since been modified. The binary copy is used on its own if the CSV file
+    has been removed.
+
+    Args:
+        csvPath: Path to the CSV file, where each row is a coordinate in the
+            form x,y,z.
+        tolerance: Decimation tolerance (see decimateCoordsChunks()), or None
+            to keep all the coordinates.
+        chunkRows: Number of rows to parse at a time.
+
+    Returns:
+        Read-only memory-mapped 2D array where each index is an [x, y, z]
+        coordinate.
+    """
+    binaryPath = getCoordsBinaryPath(csvPath, tolerance)
+    BCsvExists = os.path.isfile(csvPath)
+    if os.path.isfile(binaryPath) and (not BCsvExists or os.path.getmtime(binaryPath) >= os.path.getmtime(csvPath)):
+        return np.load(binaryPath, mmap_mode='r')
+    if not BCsvExists:
+        raise Exception("Coordinates file " + str(csvPath) + " does not exist")
+
+    LOGGER.info("Converting %s to binary %s", csvPath, binaryPath)
+    with profiling.timer('limitsFileConversion'):
+        chunks = readCoordsCsvChunks(csvPath, chunkRows)
+        if tolerance is not None:
+            chunks = decimateCoordsChunks(chunks, tolerance)
+
+        # Stream the chunks into a raw binary file as the total number of rows (needed for the .npy header) isn't known until the end
+        rawPath = binaryPath + '.raw.tmp'
+        nRows = 0
+        with open(rawPath, 'wb') as f:
+            for chunk in chunks:
+                f.write(np.ascontiguousarray(chunk, dtype=np.float64))
+                nRows += np.size(chunk, 0)
+        if nRows < 2:
+            os.remove(rawPath)
+            raise Exception("Coordinates file " + str(csvPath) + " has fewer than 2 coordinates")
+
+        # Copy the raw binary into a .npy file in chunks, writing to a temporary file then renaming so a partial copy is never loaded
+        tempPath = binaryPath + '.tmp'
+        raw = np.memmap(rawPath, dtype=np.float64, mode='r', shape=(nRows, 3))
+        binary = np.lib.format.open_memmap(tempPath, mode='w+', dtype=np.float64, shape=(nRows, 3))
+        for startRow in range(0, nRows, chunkRows):
+            binary[startRow:startRow + chunkRows] = raw[startRow:startRow + chunkRows]
+        binary.flush()
+        del raw, binary     # Close the memory maps before removing and renaming the files
+        os.remove(rawPath)
+        os.replace(tempPath, binaryPath)
+
+    return np.load(binaryPath, mmap_mode='r')
+
+
+def loadTrackLimits(trackPath: str | os.PathLike,
+                    tolerance: float | None = None) -> tuple[NDArrayFloat2D, NDArrayFloat2D, NDArrayFloat2D | None, NDArrayFloat2D | None]:
+    """
+    Loads the soft and hard track limits files in the track folder as
+    memory-mapped arrays (see loadCoordsFile()).
+
+    Args:
+        trackPath: Path to the folder containing the track limits files.
+        tolerance: Decimation tolerance, or None to keep all the coordinates.
+
+    Returns:
+        Tuple of (left, right, leftExtend, rightExtend) in the form of the
+        Track arguments, where leftExtend and rightExtend are the hard track
+        limits or None if their files are not provided.
+    """
+    limits = []
+    for filename, BRequired in ((LIMIT_LEFT_SOFT_FILENAME, True), (LIMIT_RIGHT_SOFT_FILENAME, True),
+                                (LIMIT_LEFT_HARD_FILENAME, False), (LIMIT_RIGHT_HARD_FILENAME, False)):
+        csvPath = os.path.join(trackPath, filename)
+        if BRequired or os.path.isfile(csvPath) or os.path.isfile(getCoordsBinaryPath(csvPath, tolerance)):
+            limits.append(loadCoordsFile(csvPath, tolerance))
+        else:
+            limits.append(None)
+    return tuple(limits)
+
+
+def interpLimits(limits: NDArrayFloat2D,
+                 distances: NDArrayFloat1D,
+                 dist: float) -> NDArrayFloat1D:
+    """
+    Linearly interpolates the coordinate at the distance along the limits,
+    only looking up the segment containing the distance rather than
+    interpolating over the full distances array.
+
+    Distances before the start or after the end of the limits are linearly
+    extrapolated from the first or last segment respectively.
+
+    Args:
+        limits: 2D array where each index is an [x, y, z] coordinate of the
+            track limit, and each index increases the distance along the
+            track.
+        distances: 1D array representing the cumulative distance along the
+            limits coordinates.
+        dist: Distance along the limits.
+
+    Returns:
+        Interpolated coordinate, in the same form as the limits coordinates.
+    """
+    i = getDistanceIndex(distances, dist)
+    segmentLength = distances[i + 1] - distances[i]
+    fraction = (dist - distances[i]) / segmentLength if segmentLength > 0 else 0
+    return limits[i] + (fraction * (limits[i + 1] - limits[i]))
+
+
+def getReducedLimits(limits: NDArrayFloat2D,
+                     distances: NDArrayFloat1D,
+                     distStart: float,
+                     distStop: float,
+                     isClosed: bool) -> tuple[NDArrayFloat2D, NDArrayFloat1D]:
     """
     Calculates the reduced limits and reduced cumulative distances, for the
-    window specified.
+    window from distStart to distStop along the limits.
 
     The reduced limits are the reduced set of limits coordinates local to the
     point. These are used to reduce the search space when finding the gate
     intersection with the track limits, and give robustness for handling complex
     figure-8 tracks.
 
+    The window is found by binary searching the distances array, then copying
+    one contiguous slice of the limits (or two slices if the window passes
+    the start of a closed track) into a single preallocated array, with only
+    the two coordinates on the boundary of the window interpolated.
+
     Args:
         limits: 2D array where each index is an [x, y, z] coordinate of the
             track limit, and each index increases the distance along the
-            track.
-        indexes: Array of the integer indexes corresponding to the limits array.
-        nLimits: Number of limits coordinates (i.e. size of the limits array in
-            axis 0).
+            track. If isClosed, the last coordinate must be the same as the
+            first coordinate.
         distances: 1D array representing the cumulative distance along the
             limits coordinates.
-        prevDist: Distance along the limits where the previous gate intersected
-            with the limits.
-        gateStep: Distance between consecutive gate midpoints.
-        reducedWindow: Distance ahead and behind the naive estimation of the
-            gate intersection to include for the reduced limits.
+        distStart: Distance along the limits of the start of the window.
+        distStop: Distance along the limits of the end of the window, which
+            must be greater than distStart.
+        isClosed: If true, distances beyond the ends of the limits wrap around
+            the track.
+
+            If false, distances beyond the ends of the limits are linearly
+            extrapolated from the first or last segment of the limits.
 
     Returns:
         Tuple of (reducedLimitsCoords, reducedDist).
 
-        reducedLimitsCoords: 2D array of [x, y, z] coordinates of the limits
-        which were within the reducedWindow of the naive estimation of the gate
-        intersection. This includes the coordinates on the boundary of the
-        reducedWindow, calculated from linear interpolation.
-
-        reducedDist: List representing the cumulative distance along the limits
-        coordinates which were within the reducedWindow of the naive estimation
-        of the gate intersection. This includes the cumulative distances on the
-        boundary of the reducedWindow, calculated from linear interpolation.
-    """
-    # Sets the window to be length (2 * reducedWindow), centred around the point of expected intersection of the gate and limits
-    distStart = utils.wrap(prevDist + gateStep - reducedWindow, 0, distances[-1])
-    reducedDist = [distStart]
-    reducedLimitsCoords = np.array([np.interp(distStart, distances, limits[:, 0]), np.interp(distStart, distances, limits[:, 1])])
-    distStop = utils.wrap(prevDist + gateStep + reducedWindow, 0, distances[-1])
-
-    # Finds index of the limits array to start searching from
-    iStart = int(np.ceil(np.interp(distStart, distances, indexes)))
-    i = utils.wrap(iStart + 1, 0, nLimits) if distances[iStart] == distStart else utils.wrap(iStart, 0, nLimits)
-
-    # Iterate through the points in the limits coordinate array until the window is exceeded
-    prevLeftDist = distStart
-    passed = False
-    while not passed:
-        if prevLeftDist <= distStop <= distances[i] or distances[i] < prevLeftDist <= distStop:
-            # If the window has been exceeded, calculate the point at the end of the window using linear interpolation
-            passed = True
-            reducedDist.append(distStop)
-            reducedLimitsCoords = np.vstack((reducedLimitsCoords, [np.interp(distStop, distances, limits[:, 0]), np.interp(distStop, distances, limits[:, 1])]))
-        else:
-            # If the point is still within the window, append it
-            reducedDist.append(distances[i])
-            reducedLimitsCoords = np.vstack((reducedLimitsCoords, limits[i][0:2]))
-            prevLeftDist = distances[i]
-            i = utils.wrap(i + 1, 0, nLimits)
-
-        # Terminate the while loop if it went the whole way around the track
-        if i == iStart:
-            print("getReducedLimits went around the track without passing the window, terminating loop")
-            break
+        reducedLimitsCoords: 2D array of coordinates of the limits within the
+        window (in the same form as the limits coordinates). This includes the
+        coordinates on the boundary of the window, calculated from linear
+        interpolation.
+
+        reducedDist: 1D array of the cumulative distance along the limits
+        corresponding to reducedLimitsCoords. This is always increasing - if
+        isClosed and the window passes the start of the track, the distances
+        after the start of the track continue from the total track distance
+        (i.e. they are not wrapped).
+    """
+    nLimits = np.size(distances)
+    totalDist = distances[-1]
+
+    if isClosed:
+        # Shift the window so it starts within the first lap, and limit it to at most 1 lap
+        offset = np.floor(distStart / totalDist) * totalDist
+        distStart -= offset
+        distStop = min(distStop - offset, distStart + totalDist)
+
+    # Indexes of the limits coordinates strictly within the window (the second slice is only used if the window passes the start of the track)
+    iStart = int(np.searchsorted(distances, distStart, side='right'))
+    if isClosed and distStop > totalDist:
+        iStop = nLimits
+        iStopWrapped = max(int(np.searchsorted(distances, distStop - totalDist, side='left')), 1)
+    else:
+        iStop = int(np.searchsorted(distances, distStop, side='left'))
+        iStopWrapped = 1
+    nFirst = iStop - iStart
+    nWrapped = iStopWrapped - 1
+
+    # Fill the preallocated arrays (index 0 of the limits is skipped in the second slice since it duplicates the last coordinate)
+    reducedLimitsCoords = np.empty((nFirst + nWrapped + 2, np.size(limits, 1)))
+    reducedDist = np.empty(nFirst + nWrapped + 2)
+    reducedLimitsCoords[0] = interpLimits(limits, distances, distStart)
+    reducedDist[0] = distStart
+    reducedLimitsCoords[1:nFirst + 1] = limits[iStart:iStop]
+    reducedDist[1:nFirst + 1] = distances[iStart:iStop]
+    reducedLimitsCoords[nFirst + 1:-1] = limits[1:iStopWrapped]
+    reducedDist[nFirst + 1:-1] = distances[1:iStopWrapped] + totalDist
+    reducedLimitsCoords[-1] = interpLimits(limits, distances, distStop - totalDist if distStop > totalDist and isClosed else distStop)
+    reducedDist[-1] = distStop
 
     return reducedLimitsCoords, reducedDist
 
 
-def getLimitsExtendWidthClosed(gate: shapely.LineString,
-                               gateMidpoint: NDArrayFloat1D,
-                               limitsExtend: NDArrayFloat2D,
-                               nLimitsExtend: float,
-                               prevIndex: int,
-                               gateHalfWidth: float) -> tuple[float, int]:
+class LimitsSegmentTree:
     """
-    Calculates the distance to the extend limits from the gate midpoint, and the
-    index from which the intersecting segment of the extend limits started.
+    Spatial index over the segments of a limits coordinate array, used to find
+    the intersections of gates with the limits in close to O(log n) time
+    rather than iterating over the segments.
 
-    Args:
-        gate: Shapely LineString representing the gate.
-        gateMidpoint: Coordinates of the midpoint of the gate, in the form
-            [x, y].
-        limitsExtend: 2D array where each index is an [x, y, z] coordinate of
-            the extend limit, and each index increases the distance along the
-            track.
-        nLimitsExtend: Number of extend limits coordinates (i.e. size of the
-            limits array in axis 0).
-        prevIndex: Index from which the segment of the extend limit which
-            intersected with the previous gate started.
-        gateHalfWidth: Half-width of the gate.
+    A single LimitsSegmentTree is created for each of the left/right track
+    limits and extend limits, and is shared by all the gates during gate
+    creation (including the start, finish and last gates).
+    """
+    def __init__(self,
+                 limits: NDArrayFloat2D,
+                 isClosed: bool) -> None:
+        """
+        Creates the Shapely STRtree over the segments between consecutive
+        limits coordinates.
 
-    Returns:
-        Tuple of (extendWidth, prevIndex)
+        Args:
+            limits: 2D array where each index is an [x, y, z] coordinate of the
+                limit, and each index increases the distance along the track.
+            isClosed: Whether the limits coordinate array is closed (i.e. the
+                last coordinate is the same as the first coordinate).
+        """
+        self.isClosed = isClosed
+        self.nSegments = np.size(limits, 0) - 1
+        self.distances = getLimitsDistances(limits)
+        self.segments = shapely.linestrings(np.stack((limits[:-1, :2], limits[1:, :2]), axis=1))
+        self.tree = shapely.STRtree(self.segments)
+
+
+    def getWidth(self,
+                 gate: shapely.LineString,
+                 gateMidpoint: NDArrayFloat1D,
+                 prevIndex: int,
+                 gateHalfWidth: float) -> tuple[float, int, float]:
+        """
+        Calculates the distance to the limits from the gate midpoint, the index
+        from which the intersecting segment of the limits started, and the
+        cumulative distance along the limits of the intersection.
 
-        extendWidth: Distance to the extend limits from the gate midpoint, along
-        the width of the gate.
+        If the gate intersects multiple segments, the segment that is the
+        fewest segments forwards from prevIndex is used. For the first gate
+        (prevIndex < 0), the segment closest to the start of the limits is
+        used.
 
-        prevIndex: Index of the coordinates from which the segment of the extend
-        limits which intersected with the gate started.
-    """
-    gateMidpointPoint = shapely.Point(gateMidpoint)
-    gateCoords = gate.xy
-
-    if prevIndex < 0:
-        # The first gate
-        if utils.sideOfLine(limitsExtend[0][0], limitsExtend[0][1], gateCoords[0][0], gateCoords[1][0], gateCoords[0][1], gateCoords[1][0]) >= 0:
-            # First extend point is after the gate, so iterate backwards from the last extend point since this is a closed circuit
-            i = nLimitsExtend - 1
-            iStep = -1
+        Args:
+            gate: Shapely LineString representing the gate.
+            gateMidpoint: Coordinates of the midpoint of the gate, in the form
+                [x, y].
+            prevIndex: Index from which the segment of the limits which
+                intersected with the previous gate started, or -1 if this is
+                the first gate.
+            gateHalfWidth: Half-width of the gate.
+
+        Returns:
+            Tuple of (width, prevIndex, dist).
+
+            width: Distance to the limits from the gate midpoint, along the
+            width of the gate. gateHalfWidth if no intersection was found.
+
+            prevIndex: Index of the coordinates from which the segment of the
+            limits which intersected with the gate started. Unchanged if no
+            intersection was found.
+
+            dist: Cumulative distance along the limits of the intersection.
+            NaN if no intersection was found.
+        """
+        candidates = self.tree.query(gate, predicate='intersects')
+        if np.size(candidates) == 0:
+            LOGGER.warning("Didn't find an intersection with the limits for gate at midpoint %s", gateMidpoint)
+            return gateHalfWidth, prevIndex, np.nan
+
+        # Choose the candidate segment closest to (and preferably forwards from) prevIndex
+        if prevIndex < 0:
+            offsets = np.minimum(candidates, self.nSegments - candidates) if self.isClosed else candidates
+        elif self.isClosed:
+            offsets = (candidates - prevIndex) % self.nSegments
         else:
-            # First extend point is before the gate, so iterate forwards from the first extend point
-            i = 0
-            iStep = 1
-    else:
-        # Normal procedure
-        i = prevIndex
-        iStep = 1
-
-    # Iterate until an intersection is found (or if it went the whole way around the track)
-    # Whether iteration is forwards or backwards is determined by iStep (1 is forwards, -1 is backwards)
-    inLoop = False
-    while not (inLoop and i == prevIndex):
-        inLoop = True
-        iNext = utils.wrap(i + iStep, 0, nLimitsExtend)
-        extendSegment = shapely.LineString([limitsExtend[i][0:2], limitsExtend[iNext][0:2]])
-        if extendSegment.intersects(gate):
-            # If there is an intersection, update prevIndex and get the distance to the intersection
-            prevIndex = i
-            extendWidth = gateMidpointPoint.distance(extendSegment.intersection(gate))
-            return extendWidth, prevIndex
-        i = iNext
-
-    # If the iterations went the whole way around the track without finding an intersection, return extendWidth=gateHalfWidth, prevIndex=prevIndex
-    print("Didn't find an intersection with limitsExtend for gate at midpoint", gateMidpoint)
-    return gateHalfWidth, prevIndex
+            offsets = np.where(candidates >= prevIndex, candidates - prevIndex, self.nSegments + prevIndex - candidates)
+        index = int(candidates[np.argmin(offsets)])
+
+        segment = self.segments[index]
+        intersection = segment.intersection(gate)
+        width = shapely.Point(gateMidpoint).distance(intersection)
+        fraction = segment.project(intersection.centroid) / segment.length if segment.length > 0 else 0
+        dist = self.distances[index] + (fraction * (self.distances[index + 1] - self.distances[index]))
+        return width, index, dist
 
 
 def getLimitsWidths(gate: shapely.LineString,
@@ -412,13 +990,8 @@ def gateObjFunc(params: list[float],
     of the track (i.e. equal distance to the left and right track limits), and
     with the smallest width to the left and right track limits.
 
-    TODO: Explore using SciPy optimize root, with the objective function being
-        a vector of [leftWidth - rightWidth, leftAngle - rightAngle],
-        where leftAngle is the interior angle between the gate and the left
-        track limits, and similarly for rightAngle. The angles must be on the
-        same side of the gate.
-        Root finding approach should be faster than minimise, but if root
-        finding fails, fallback to SciPy minimise with this objective function.
+    This is only used as the fallback for solveGate(), if the root finding of
+    the gate balance condition fails to converge.
 
     Args:
         params: List of [psi, theta], in this format for compatibility with the
@@ -457,64 +1030,1202 @@ def gateObjFunc(params: list[float],
         return leftWidth + rightWidth + abs(leftWidth - rightWidth)
 
 
-def getGateLimitsIntersectionDistance(gate: shapely.LineString,
+def getPolylineIntersections(origins: NDArrayFloat2D,
+                             rays: NDArrayFloat2D,
+                             polylineCoords: NDArrayFloat2D,
+                             maxLength: float) -> tuple[NDArrayFloat1D, NDArrayInt1D, NDArrayFloat1D]:
+    """
+    Calculates the nearest intersection of each ray with the polyline, for a
+    batch of rays at once. Only the x and y coordinates are used.
+
+    Args:
+        origins: 2D array where each index is the [x, y] coordinate of the
+            start of the ray.
+        rays: 2D array where each index is the [x, y] direction vector of the
+            ray, normalised to a magnitude of 1.
+        polylineCoords: 2D array where each index is an [x, y] or [x, y, z]
+            coordinate of the polyline, with at least 2 coordinates.
+        maxLength: Maximum length of the rays.
+
+    Returns:
+        Tuple of (lengths, segmentIndexes, segmentFractions).
+
+        lengths: 1D array of the distance from each ray origin to its nearest
+        intersection with the polyline. NaN if the ray does not intersect the
+        polyline within maxLength.
+
+        segmentIndexes: 1D array of the index of the polyline coordinate which
+        the intersected segment starts from. -1 if the ray does not intersect
+        the polyline within maxLength.
+
+        segmentFractions: 1D array of the fraction along the intersected
+        segment where the intersection is, from 0 at the start of the segment
+        to 1 at the end of the segment. NaN if the ray does not intersect the
+        polyline within maxLength.
+    """
+    segStarts = polylineCoords[:-1, :2]
+    segVectors = polylineCoords[1:, :2] - segStarts
+
+    # Solve origin + t * ray = segStart + u * segVector for every ray (axis 0) and segment (axis 1) pair
+    originToSeg = segStarts[np.newaxis, :, :] - origins[:, np.newaxis, :]
+    denom = (rays[:, np.newaxis, 0] * segVectors[np.newaxis, :, 1]) - (rays[:, np.newaxis, 1] * segVectors[np.newaxis, :, 0])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = ((originToSeg[..., 0] * segVectors[np.newaxis, :, 1]) - (originToSeg[..., 1] * segVectors[np.newaxis, :, 0])) / denom
+        u = ((originToSeg[..., 0] * rays[:, np.newaxis, 1]) - (originToSeg[..., 1] * rays[:, np.newaxis, 0])) / denom
+
+    # Keep the nearest valid intersection for each ray (parallel segments give NaN or inf so are never valid)
+    t = np.where((t >= 0) & (t <= maxLength) & (u >= 0) & (u <= 1), t, np.inf)
+    rayIndexes = np.arange(np.size(t, 0))
+    segmentIndexes = np.argmin(t, axis=1)
+    lengths = t[rayIndexes, segmentIndexes]
+    segmentFractions = u[rayIndexes, segmentIndexes]
+
+    noIntersection = np.isinf(lengths)
+    lengths[noIntersection] = np.nan
+    segmentFractions[noIntersection] = np.nan
+    segmentIndexes[noIntersection] = -1
+
+    return lengths, segmentIndexes, segmentFractions
+
+
+def getPolylineTangents(polylineCoords: NDArrayFloat2D,
+                        segmentIndexes: NDArrayInt1D,
+                        segmentFractions: NDArrayFloat1D) -> NDArrayFloat2D:
+    """
+    Calculates the tangent direction of the polyline at points along its
+    segments. The tangents are linearly interpolated between the tangents at the
+    polyline coordinates (the average of the directions of the segments on
+    either side), so that the tangent is continuous along the polyline.
+
+    Args:
+        polylineCoords: 2D array where each index is an [x, y] or [x, y, z]
+            coordinate of the polyline, with at least 2 coordinates.
+        segmentIndexes: 1D array of the index of the polyline coordinate which
+            each segment starts from, as returned by getPolylineIntersections().
+        segmentFractions: 1D array of the fraction along each segment, as
+            returned by getPolylineIntersections().
+
+    Returns:
+        2D array where each index is the [x, y] tangent direction of the
+        polyline (not normalised) at the corresponding point.
+    """
+    segVectors = np.diff(polylineCoords[:, :2], axis=0)
+    segNorms = np.hypot(segVectors[:, 0], segVectors[:, 1])[:, np.newaxis]
+    segDirections = np.divide(segVectors, segNorms, out=np.zeros_like(segVectors), where=segNorms > 0)
+
+    # Tangents at each polyline coordinate - the ends use the direction of the single segment connected to them
+    coordTangents = np.vstack((segDirections[0], segDirections[:-1] + segDirections[1:], segDirections[-1]))
+
+    fractions = segmentFractions[:, np.newaxis]
+    return ((1 - fractions) * coordTangents[segmentIndexes]) + (fractions * coordTangents[segmentIndexes + 1])
+
+
+def calcGatesBatch(params: NDArrayFloat2D,
+                   prevGateMidpoint: NDArrayFloat1D,
+                   prevGateDirection: NDArrayFloat1D,
+                   gateHalfWidth: float,
+                   gateStep: float,
+                   reducedLeftCoords: NDArrayFloat2D,
+                   reducedRightCoords: NDArrayFloat2D) -> tuple[NDArrayFloat2D, NDArrayFloat2D, NDArrayFloat1D, NDArrayFloat1D, NDArrayFloat1D, NDArrayFloat1D]:
+    """
+    Vectorised equivalent of calcGate() for a batch of candidate gates, which
+    also calculates the angles of the left and right limits relative to each
+    gate. No Shapely geometry is created.
+
+    Args:
+        params: 2D array where each index is the [psi, theta] of a candidate
+            gate, as defined in calcGate().
+        prevGateMidpoint: Coordinates of the midpoint of the previous gate, in
+            the form [x, y]. Can also be a 2D array with a previous gate
+            midpoint for each candidate gate.
+        prevGateDirection: Direction vector of the previous gate in the
+            direction of forward travel, normalised to a magnitude of 1. Can
+            also be a 2D array with a previous gate direction for each
+            candidate gate.
+        gateHalfWidth: Half-width of the gate.
+        gateStep: Distance between consecutive gate midpoints.
+        reducedLeftCoords: 2D array of [x, y] or [x, y, z] coordinates of the
+            reduced left limits, which is the reduced set of limits
+            coordinates local to the point.
+        reducedRightCoords: 2D array of [x, y] or [x, y, z] coordinates of the
+            reduced right limits, which is the reduced set of limits
+            coordinates local to the point.
+
+    Returns:
+        Tuple of (gateMidpoints, gateDirections, leftWidths, rightWidths,
+        leftAngles, rightAngles).
+
+        gateMidpoints: 2D array of the [x, y] midpoint of each candidate gate.
+
+        gateDirections: 2D array of the direction vector of each candidate gate
+        in the direction of forward travel, normalised to a magnitude of 1.
+
+        leftWidths: 1D array of the distance to the left limits from each gate
+        midpoint, along the width of the gate. NaN if there is no intersection.
+
+        rightWidths: 1D array of the distance to the right limits from each
+        gate midpoint, along the width of the gate. NaN if there is no
+        intersection.
+
+        leftAngles: 1D array of the anti-clockwise angle from each gate
+        direction to the direction of the left limits where they intersect.
+
+        rightAngles: 1D array of the anti-clockwise angle from each gate
+        direction to the direction of the right limits where they intersect.
+    """
+    psi = params[:, 0]
+    theta = params[:, 1]
+
+    # Generate candidate midpoints and gate directions
+    gateMidpoints = prevGateMidpoint + (utils.rotateVector2D(prevGateDirection, psi) * gateStep)
+    gateDirections = utils.rotateVector2D(prevGateDirection, psi + theta)
+    leftRays = np.column_stack((-gateDirections[:, 1], gateDirections[:, 0]))
+
+    # Calculate the widths, then the angles of the limits relative to the gate direction at the intersections
+    leftWidths, leftSegIndexes, leftSegFractions = getPolylineIntersections(gateMidpoints, leftRays, reducedLeftCoords, gateHalfWidth)
+    rightWidths, rightSegIndexes, rightSegFractions = getPolylineIntersections(gateMidpoints, -leftRays, reducedRightCoords, gateHalfWidth)
+    leftTangents = getPolylineTangents(reducedLeftCoords, leftSegIndexes, leftSegFractions)
+    rightTangents = getPolylineTangents(reducedRightCoords, rightSegIndexes, rightSegFractions)
+    leftAngles = np.arctan2((gateDirections[:, 0] * leftTangents[:, 1]) - (gateDirections[:, 1] * leftTangents[:, 0]), np.sum(gateDirections * leftTangents, axis=1))
+    rightAngles = np.arctan2((gateDirections[:, 0] * rightTangents[:, 1]) - (gateDirections[:, 1] * rightTangents[:, 0]), np.sum(gateDirections * rightTangents, axis=1))
+
+    return gateMidpoints, gateDirections, leftWidths, rightWidths, leftAngles, rightAngles
+
+
+def solveGate(prevGateMidpoint: NDArrayFloat1D,
+              prevGateDirection: NDArrayFloat1D,
+              gateHalfWidth: float,
+              gateStep: float,
+              reducedLeftCoords: NDArrayFloat2D,
+              reducedRightCoords: NDArrayFloat2D) -> tuple[shapely.LineString, NDArrayFloat1D, NDArrayFloat1D, float, float]:
+    """
+    Finds the gate placement in the middle of the track, with the gate
+    perpendicular to the track limits.
+
+    Root finds the gate balance condition [leftWidth - rightWidth, leftAngle +
+    rightAngle] = 0 with Newton iterations, where leftAngle and rightAngle are
+    the angles of the left and right limits relative to the gate direction (so
+    the interior angles on the same side of the gate are equal). Each iteration
+    evaluates the candidate gate and its finite difference perturbations as a
+    single batch with calcGatesBatch(). If the root finding fails to converge,
+    falls back to the SciPy minimize of gateObjFunc().
+
+    Args:
+        prevGateMidpoint: Coordinates of the midpoint of the previous gate, in
+            the form [x, y].
+        prevGateDirection: Direction vector of the previous gate in the
+            direction of forward travel, normalised to a magnitude of 1.
+        gateHalfWidth: Half-width of the gate.
+        gateStep: Distance between consecutive gate midpoints.
+        reducedLeftCoords: 2D array of [x, y] or [x, y, z] coordinates of the
+            reduced left limits, which is the reduced set of limits
+            coordinates local to the point.
+        reducedRightCoords: 2D array of [x, y] or [x, y, z] coordinates of the
+            reduced right limits, which is the reduced set of limits
+            coordinates local to the point.
+
+    Returns:
+        Tuple of (gate, gateMidpoint, gateDirection, leftWidth, rightWidth), as
+        defined in calcGate().
+    """
+    params = np.zeros(2)
+    stencil = np.array([[0, 0], [GATE_SOLVE_FD_STEP, 0], [0, GATE_SOLVE_FD_STEP]])
+    for _ in range(GATE_SOLVE_MAX_ITERATIONS):
+        profiling.count('gateSolveIterations')
+        profiling.count('gateSolveEvaluations', np.size(stencil, 0))
+
+        # Evaluate the candidate gate and the finite difference perturbations of psi and theta in one batch
+        gateMidpoints, gateDirections, leftWidths, rightWidths, leftAngles, rightAngles = calcGatesBatch(params + stencil, prevGateMidpoint, prevGateDirection,
+                                                                                                         gateHalfWidth, gateStep, reducedLeftCoords, reducedRightCoords)
+        residuals = np.column_stack((leftWidths - rightWidths, leftAngles + rightAngles))
+        if np.isnan(residuals).any():
+            # The gate (or its perturbations) doesn't intersect with the limits
+            break
+
+        if abs(residuals[0, 0]) < GATE_SOLVE_WIDTH_TOLERANCE and abs(residuals[0, 1]) < GATE_SOLVE_ANGLE_TOLERANCE:
+            # Converged, so create the gate from the solution
+            gate = getGateExtendLine(gateMidpoints[0], gateDirections[0], gateHalfWidth, gateHalfWidth)
+            return gate, gateMidpoints[0], gateDirections[0], float(leftWidths[0]), float(rightWidths[0])
+
+        # Newton step (limited in size for robustness when the initial guess is far from the solution)
+        jacobian = ((residuals[1:] - residuals[0]) / GATE_SOLVE_FD_STEP).T
+        try:
+            step = np.linalg.solve(jacobian, -residuals[0])
+        except np.linalg.LinAlgError:
+            break
+        stepMax = np.max(np.abs(step))
+        if stepMax > GATE_SOLVE_MAX_STEP:
+            step *= GATE_SOLVE_MAX_STEP / stepMax
+        params = params + step
+
+    # Root finding failed, so fallback to SciPy minimize
+    reducedLeft = shapely.LineString(reducedLeftCoords)
+    reducedRight = shapely.LineString(reducedRightCoords)
+    result = scipy.optimize.minimize(gateObjFunc, [0, 0],
+                                     (prevGateMidpoint, prevGateDirection, gateHalfWidth, gateStep, reducedLeft, reducedRight),
+                                     method='Powell')
+    params = result.x
+    profiling.count('gateSolveFallbacks')
+    profiling.count('gateSolveFallbackEvaluations', result.nfev)
+    # Experiment with different scipy minimize methods to see which is faster and also accuracy - ones that solved successfully:
+    #   'Nelder-Mead'   20.256154368287984
+    #   'Powell'        20.254838726180974
+    #   'L-BFGS-B'      20.25543032184799
+    #   'TNC'           20.261686355342427
+    #   'COBYLA'        FAILED
+    #   'COBYQA'        20.27994131907119
+    #   'SLSQP'         20.252698788205983
+    #   'trust-constr'  20.258087401969213
+
+    return calcGate(params, prevGateMidpoint, prevGateDirection, gateHalfWidth, gateStep, reducedLeft, reducedRight)
+
+
+def getGateLimitsIntersectionDistance(gateMidpoint: NDArrayFloat1D,
+                                      gateDirection: NDArrayFloat1D,
+                                      gateHalfWidth: float,
                                       reducedLimitsCoords: NDArrayFloat2D,
-                                      reducedDist: list[float],
+                                      reducedDist: NDArrayFloat1D,
                                       distances: NDArrayFloat1D,
+                                      isClosed: bool,
                                       isLeft: bool) -> float:
     """
     Calculates the distance along the track limits of the intersection with the
     gate.
 
     Args:
-        gate: Shapely LineString representing the gate.
-        reducedLimitsCoords: 2D array of [x, y, z] coordinates of the limits
-            which were within the reducedWindow of the naive estimation of the
-            gate intersection. This includes the coordinates on the boundary of
-            the reducedWindow, calculated from linear interpolation.
-        reducedDist: List representing the cumulative distance along the limits
-            coordinates which were within the reducedWindow of the naive
-            estimation of the gate intersection. This includes the cumulative
-            distances on the boundary of the reducedWindow, calculated from
-            linear interpolation.
+        gateMidpoint: Coordinates of the midpoint of the gate, in the form
+            [x, y].
+        gateDirection: Direction vector of the gate in the direction of forward
+            travel, normalised to a magnitude of 1.
+        gateHalfWidth: Half-width of the gate.
+        reducedLimitsCoords: 2D array of [x, y] or [x, y, z] coordinates of the
+            limits within the window, as returned by getReducedLimits().
+        reducedDist: 1D array of the cumulative distance along the limits
+            corresponding to reducedLimitsCoords, as returned by
+            getReducedLimits().
         distances: 1D array representing the cumulative distance along the
             limits coordinates.
+        isClosed: If true, the returned distance is wrapped to be within the
+            total distance of the limits.
         isLeft: Boolean specifying whether the limits passed in is on the left
             or right.
 
     Returns:
         Distance along the coordinate array of the intersection with the gate.
     """
-    # Iterates through each segment in the reduced limits coordinate array
-    for i in range(len(reducedDist) - 1):
-        # Creates a segment from adjacent points in the reduced limits coordinate array and checks if the segment intersects the gate
-        segment = shapely.LineString([reducedLimitsCoords[i], reducedLimitsCoords[i + 1]])
-        if segment.intersects(gate):
-            # If there is an intersection, get the intersection point (note this can technically return a LineString but that's super unlikely)
-            intersection = segment.intersection(gate)
-
-            # Unwrap distances so the interpolation works properly (only applies near the start line if the track is closed)
-            d1 = reducedDist[i]
-            d2 = reducedDist[i + 1]
-            if d1 > d2:
-                d1 -= distances[-1]
-
-            # Chooses axis with larger difference to do the linear interpolation on to find the distance along the limits coordinate array of intersection
-            if np.diff(segment.xy[0]) > np.diff(segment.xy[1]):
-                dist = np.interp(intersection.x, segment.xy[0], [d1, d2])
+    # Find the intersection with the limits on the corresponding side of the gate
+    sideRay = np.array([[-gateDirection[1], gateDirection[0]]]) if isLeft else np.array([[gateDirection[1], -gateDirection[0]]])
+    _, segmentIndexes, segmentFractions = getPolylineIntersections(gateMidpoint[np.newaxis, :], sideRay, reducedLimitsCoords, gateHalfWidth)
+    i = segmentIndexes[0]
+
+    if i < 0:
+        # If the gate never intersected with reducedLimitsCoords, return the first distance in the reduced distances array
+        LOGGER.warning("%s == gateHalfWidth for gate at midpoint %s", "leftWidth" if isLeft else "rightWidth", gateMidpoint)
+        dist = reducedDist[0]
+    else:
+        # Linearly interpolate the distance along the limits from the fraction along the intersected segment
+        dist = reducedDist[i] + (segmentFractions[0] * (reducedDist[i + 1] - reducedDist[i]))
+
+    return float(utils.wrap(dist, 0, distances[-1])) if isClosed else float(dist)
+
+
+class GateStepProfile:
+    """
+    Gate step along the track for adaptive gate spacing, with sparse gates on
+    straights and dense gates in corners.
+
+    The local step is GATE_ADAPTIVE_HEADING_STEP divided by the heading rate
+    of the low-pass filtered headings (the larger of the left and right
+    limits), within the step bounds. The step from each distance is then
+    limited so the next gate doesn't go further into an upcoming corner than
+    the local step of the corner, i.e. step(s) = min(local(u) + u - s) for
+    u >= s, computed for all s at once as a reverse cumulative minimum.
+
+    The profile is sampled along the left limits distance, at half the
+    minimum step.
+    """
+    __slots__ = ('sLeft', 'steps', 'gateStepMin', 'isClosed')
+
+    def __init__(self,
+                 leftCoordArray: CoordinateArray,
+                 rightCoordArray: CoordinateArray,
+                 gateStepMin: float,
+                 gateStepMax: float) -> None:
+        """
+        Calculates the gate steps along the left limits distance.
+
+        Args:
+            leftCoordArray: CoordinateArray of the left track limits.
+            rightCoordArray: CoordinateArray of the right track limits.
+            gateStepMin: Minimum distance between consecutive gate midpoints.
+            gateStepMax: Maximum distance between consecutive gate midpoints.
+        """
+        if not 0 < gateStepMin <= gateStepMax:
+            raise Exception("Invalid gate step bounds (" + str(gateStepMin) + ", " + str(gateStepMax) + ") - must be 0 < gateStepMin <= gateStepMax")
+        self.gateStepMin = gateStepMin
+        self.isClosed = leftCoordArray.BClosedTrack
+        sLeftTotal = leftCoordArray.sCoords[-1]
+        sRightTotal = rightCoordArray.sCoords[-1]
+        self.sLeft = np.linspace(0, sLeftTotal, int(np.ceil(2 * sLeftTotal / gateStepMin)) + 1)
+
+        # Heading rate of each limits, with the right limits sampled at the same proportion of its distance
+        sRight = self.sLeft * (sRightTotal / sLeftTotal)
+        ARateLeft = np.abs(np.gradient(np.interp(self.sLeft, leftCoordArray.sCoords, leftCoordArray.AHeadingsFilt), self.sLeft))
+        ARateRight = np.abs(np.gradient(np.interp(sRight, rightCoordArray.sCoords, rightCoordArray.AHeadingsFilt), sRight))
+        ARate = np.maximum(ARateLeft, ARateRight)
+        localSteps = np.clip(GATE_ADAPTIVE_HEADING_STEP / np.maximum(ARate, GATE_ADAPTIVE_HEADING_STEP / gateStepMax), gateStepMin, gateStepMax)
+
+        # Limit each step by the local steps ahead - for closed tracks, continue the local steps from the start for another maximum step
+        sAhead = self.sLeft
+        if self.isClosed:
+            nWrap = int(np.searchsorted(self.sLeft, gateStepMax, side='right'))
+            sAhead = np.concat((self.sLeft, self.sLeft[1:nWrap + 1] + sLeftTotal))
+            localSteps = np.concat((localSteps, localSteps[1:nWrap + 1]))
+        self.steps = np.minimum.accumulate((sAhead + localSteps)[::-1])[::-1][:np.size(self.sLeft)] - self.sLeft
+
+
+    def getStep(self,
+                leftDist: float) -> float:
+        """
+        Gets the gate step from the gate at the distance along the left
+        limits.
+
+        Args:
+            leftDist: Distance along the left limits of the gate.
+
+        Returns:
+            Distance to the next gate midpoint.
+        """
+        if self.isClosed:
+            leftDist = utils.wrap(leftDist, 0, self.sLeft[-1])
+        return float(np.interp(leftDist, self.sLeft, self.steps))
+
+
+def marchGates(left: NDArrayFloat2D,
+               right: NDArrayFloat2D,
+               leftDistances: NDArrayFloat1D,
+               rightDistances: NDArrayFloat1D,
+               isClosed: bool,
+               bounds: tuple[float, float, float, float],
+               gateMidpoint: NDArrayFloat1D,
+               gateDirection: NDArrayFloat1D,
+               prevLeftDist: float,
+               prevRightDist: float,
+               gateStep: float,
+               gateHalfWidth: float,
+               reducedWindow: float,
+               gateStepProfile: GateStepProfile | None = None):
+    """
+    Generator which marches gates along the track, each gate solved from the
+    previous one (see solveGate()), starting from the seed gate passed in.
+    The gates are yielded indefinitely, it's up to the caller to stop.
+
+    Args:
+        left: 2D array where each index is an [x, y, z] coordinate of the left
+            track limits.
+        right: 2D array where each index is an [x, y, z] coordinate of the
+            right track limits.
+        leftDistances: 1D array of the cumulative distance along left.
+        rightDistances: 1D array of the cumulative distance along right.
+        isClosed: Whether the track is closed.
+        bounds: Tuple of (xMin, xMax, yMin, yMax) of the track, used to detect
+            if gate creation explodes.
+        gateMidpoint: Midpoint of the seed gate, in the form [x, y].
+        gateDirection: Direction vector of the seed gate in the direction of
+            forward travel, normalised to a magnitude of 1.
+        prevLeftDist: Distance along the left limits of the seed gate.
+        prevRightDist: Distance along the right limits of the seed gate.
+        gateStep: Distance between consecutive gate midpoints, or the
+            nominal distance if gateStepProfile is provided.
+        gateHalfWidth: Half-width of the gate.
+        reducedWindow: Distance either side of the expected intersection of
+            the gate and limits for the reduced limits arrays, for gateStep
+            (scaled with the gate step for adaptive gate spacing).
+        gateStepProfile: Gate steps along the track for adaptive gate
+            spacing, or None for the fixed gateStep.
+
+    Yields:
+        Tuple of (gateMidpoint, gateDirection, leftWidth, rightWidth,
+        leftDist, rightDist) for each gate, where leftDist and rightDist are
+        the distances along the limits of the intersections with the gate.
+    """
+    xMin, xMax, yMin, yMax = bounds
+    step = gateStep
+    stepWindow = reducedWindow
+    while True:
+        # Step to this gate from the previous gate (the reduced window scales with the step)
+        if gateStepProfile is not None:
+            step = gateStepProfile.getStep(prevLeftDist)
+            stepWindow = reducedWindow * step / gateStep
+
+        # Create reducedLeftCoords and reducedRightCoords coordinate arrays, centred around the expected intersection of the gate and limits
+        with profiling.timer('reducedWindowExtraction'):
+            reducedLeftCoords, reducedLeftDist = getReducedLimits(left, leftDistances, prevLeftDist + step - stepWindow, prevLeftDist + step + stepWindow, isClosed)
+            reducedRightCoords, reducedRightDist = getReducedLimits(right, rightDistances, prevRightDist + step - stepWindow, prevRightDist + step + stepWindow, isClosed)
+
+        # Find gate heading and direction
+        with profiling.timer('gateSolve'):
+            _, gateMidpoint, gateDirection, leftWidth, rightWidth = solveGate(gateMidpoint, gateDirection, gateHalfWidth, step, reducedLeftCoords, reducedRightCoords)
+        profiling.count('gatesMarched')
+
+        # Raise an exception if gate creation explodes (gateMidpoint goes beyond the bounds of xMin, xMax, yMin, yMax)
+        # If the track is not closed, the gate after the last gate can be up to the step beyond the bounds (using the extrapolated limits)
+        boundsMargin = 0 if isClosed else step
+        if (gateMidpoint[0] < xMin - boundsMargin or gateMidpoint[0] > xMax + boundsMargin or gateMidpoint[1] < yMin - boundsMargin
+                or gateMidpoint[1] > yMax + boundsMargin or leftWidth + rightWidth == 2 * gateHalfWidth):
+            raise Exception("Gate creation exploded - Gate with gateMidpoint " + str(gateMidpoint.tolist()) + " went beyond the bounds of [(xMin, xMax), (yMin, yMax)] of " + str([(float(xMin), float(xMax)), (float(yMin), float(yMax))]))
+
+        # Find the gate intersections with the left and right coordinate arrays
+        with profiling.timer('limitsIntersectionDistance'):
+            prevLeftDist = getGateLimitsIntersectionDistance(gateMidpoint, gateDirection, gateHalfWidth, reducedLeftCoords, reducedLeftDist, leftDistances, isClosed, True)
+            prevRightDist = getGateLimitsIntersectionDistance(gateMidpoint, gateDirection, gateHalfWidth, reducedRightCoords, reducedRightDist, rightDistances, isClosed, False)
+
+        yield gateMidpoint, gateDirection, leftWidth, rightWidth, prevLeftDist, prevRightDist
+
+
+def getSectorAnchor(left: NDArrayFloat2D,
+                    right: NDArrayFloat2D,
+                    leftDistances: NDArrayFloat1D,
+                    rightDistances: NDArrayFloat1D,
+                    isClosed: bool,
+                    leftDist: float,
+                    rightDistGuess: float,
+                    searchWindow: float) -> tuple[NDArrayFloat1D, NDArrayFloat1D, float]:
+    """
+    Creates the gate from the point at leftDist along the left limits to the
+    closest point on the right limits within searchWindow of rightDistGuess,
+    used to match the left and right limits for the sector seed gates of
+    sectorised gate creation (see getSectorSeeds()).
+
+    Args:
+        left: 2D array where each index is an [x, y, z] coordinate of the left
+            track limits.
+        right: 2D array where each index is an [x, y, z] coordinate of the
+            right track limits.
+        leftDistances: 1D array of the cumulative distance along left.
+        rightDistances: 1D array of the cumulative distance along right.
+        isClosed: Whether the track is closed.
+        leftDist: Distance along the left limits of the anchor.
+        rightDistGuess: Estimated distance along the right limits of the
+            anchor, e.g. the same fraction of the total distance as leftDist.
+        searchWindow: Distance either side of rightDistGuess to search.
+
+    Returns:
+        Tuple of (gateMidpoint, gateDirection, rightDist) of the seed gate.
+    """
+    leftCoord = interpLimits(left, leftDistances, leftDist)[:2]
+
+    # Project the left anchor point onto the nearby right limits and convert the projected length along them back to a distance
+    # If the closest point is at the end of the search window, the left and right distances have drifted apart by more than the window (e.g. after
+    # corners turning the same way), so move the window along to the closest point and search again
+    rightDist = rightDistGuess
+    for _ in range(int(np.ceil(rightDistances[-1] / searchWindow))):
+        reducedRightCoords, reducedRightDist = getReducedLimits(right, rightDistances, rightDist - searchWindow, rightDist + searchWindow, isClosed)
+        reducedLength2D = np.concat(([0], np.cumsum(scipy.linalg.norm(np.diff(reducedRightCoords[:, :2], axis=0), axis=1))))
+        projectedLength = shapely.LineString(reducedRightCoords[:, :2]).project(shapely.Point(leftCoord))
+        rightDist = float(np.interp(projectedLength, reducedLength2D, reducedRightDist))
+        if 0 < projectedLength < reducedLength2D[-1] or (not isClosed and (rightDist <= 0 or rightDist >= rightDistances[-1])):
+            break
+    if isClosed:
+        rightDist = float(utils.wrap(rightDist, 0, rightDistances[-1]))
+    rightCoord = interpLimits(right, rightDistances, rightDist)[:2]
+
+    _, gateMidpoint, gateDirection = getGateFromCoords(leftCoord, rightCoord, 1)
+    return gateMidpoint, gateDirection, rightDist
+
+
+def getSectorSeeds(left: NDArrayFloat2D,
+                   right: NDArrayFloat2D,
+                   leftDistances: NDArrayFloat1D,
+                   rightDistances: NDArrayFloat1D,
+                   isClosed: bool,
+                   firstGateMidpoint: NDArrayFloat1D,
+                   sectorLeftDists: NDArrayFloat1D,
+                   gateStep: float,
+                   searchWindow: float,
+                   gateStepProfile: GateStepProfile | None = None) -> list[tuple[NDArrayFloat1D, NDArrayFloat1D, float, float]]:
+    """
+    Predicts the seed gates of the sectors of sectorised gate creation, placed
+    where serial gate creation from the first gate would place a gate, so the
+    gates of each sector line up with the gates of the previous sector.
+
+    Each marched gate midpoint is a gate step (in a straight line) from the
+    previous one and in the middle of the track, so the gate midpoints are
+    walked along an approximate centreline from the first gate. The centreline
+    is the midpoints of the left and right limits, matched with anchors (see
+    getSectorAnchor()) every GATE_SECTOR_ANCHOR_SPACING along the left limits.
+
+    Args:
+        left: 2D array where each index is an [x, y, z] coordinate of the left
+            track limits.
+        right: 2D array where each index is an [x, y, z] coordinate of the
+            right track limits.
+        leftDistances: 1D array of the cumulative distance along left.
+        rightDistances: 1D array of the cumulative distance along right.
+        isClosed: Whether the track is closed.
+        firstGateMidpoint: Midpoint of the first gate, in the form [x, y].
+        sectorLeftDists: 1D array of the distance along the left limits of the
+            start of each sector, where the first sector starts at 0.
+        gateStep: Distance between consecutive gate midpoints, or the
+            nominal distance if gateStepProfile is provided.
+        searchWindow: Distance either side of the estimated distance along the
+            right limits to search for each anchor.
+        gateStepProfile: Gate steps along the track for adaptive gate
+            spacing, or None for the fixed gateStep.
+
+    Returns:
+        List of tuples of (gateMidpoint, gateDirection, leftDist, rightDist)
+        of the seed gate of each sector after the first.
+    """
+    # Match the left and right limits with anchors, then interpolate between the anchors for the centreline
+    anchorLeftDists = np.append(np.arange(0, leftDistances[-1], GATE_SECTOR_ANCHOR_SPACING), leftDistances[-1])
+    anchorRightDists = np.zeros_like(anchorLeftDists)
+    rightDist = 0
+    for i, anchorLeftDist in enumerate(anchorLeftDists):
+        _, _, rightDist = getSectorAnchor(left, right, leftDistances, rightDistances, isClosed, anchorLeftDist, rightDist, searchWindow)
+        anchorRightDists[i] = rightDist
+    if isClosed:
+        anchorRightDists = np.unwrap(anchorRightDists, period=rightDistances[-1])
+    centreLeftDists = np.append(np.arange(0, leftDistances[-1], GATE_SECTOR_CENTRELINE_SPACING), leftDistances[-1])
+    centreRightDists = np.interp(centreLeftDists, anchorLeftDists, anchorRightDists)
+    wrappedRightDists = utils.wrap(centreRightDists, 0, rightDistances[-1]) if isClosed else centreRightDists
+    leftPoints = np.column_stack([np.interp(centreLeftDists, leftDistances, left[:, i]) for i in range(2)])
+    rightPoints = np.column_stack([np.interp(wrappedRightDists, rightDistances, right[:, i]) for i in range(2)])
+    centreline = (leftPoints + rightPoints) / 2
+
+    # Unit tangents, for the distances along the limits where the gate through a point on the centreline (normal to it) crosses the limits
+    centreTangents, leftTangents, rightTangents = (tangents / scipy.linalg.norm(tangents, axis=1)[:, None]
+                                                   for tangents in (np.gradient(points, axis=0) for points in (centreline, leftPoints, rightPoints)))
+
+    # Walk the gate midpoints along the centreline, each where the circle of radius step around the previous midpoint crosses the centreline
+    sectorSeeds = []
+    gateMidpoint = firstGateMidpoint
+    gateLeftDist, gateRightDist = 0, 0
+    iSegment = 0
+    for sectorLeftDist in sectorLeftDists[1:]:
+        while True:
+            step = gateStep if gateStepProfile is None else gateStepProfile.getStep(gateLeftDist)
+            while iSegment < np.size(centreline, 0) - 2 and scipy.linalg.norm(centreline[iSegment + 1] - gateMidpoint) < step:
+                iSegment += 1
+            segment = centreline[iSegment + 1] - centreline[iSegment]
+            offset = centreline[iSegment] - gateMidpoint
+            a, b, c = segment @ segment, 2 * (offset @ segment), offset @ offset - step ** 2
+            t = min((-b + np.sqrt(max(b ** 2 - 4 * a * c, 0))) / (2 * a), 1)
+            nextMidpoint = centreline[iSegment] + t * segment
+            iPoint = iSegment + round(t)
+            centreTangent = centreTangents[iPoint]
+            nextLeftDist = centreLeftDists[iPoint] + ((nextMidpoint - leftPoints[iPoint]) @ centreTangent) / (leftTangents[iPoint] @ centreTangent)
+            nextRightDist = centreRightDists[iPoint] + ((nextMidpoint - rightPoints[iPoint]) @ centreTangent) / (rightTangents[iPoint] @ centreTangent)
+            if nextLeftDist > sectorLeftDist:
+                break
+            gateMidpoint, gateLeftDist, gateRightDist = nextMidpoint, nextLeftDist, nextRightDist
+
+        # Seed the sector with the predicted gate closest to the start of the sector
+        if nextLeftDist - sectorLeftDist < sectorLeftDist - gateLeftDist:
+            seedLeftDist, seedRightDist = nextLeftDist, nextRightDist
+        else:
+            seedLeftDist, seedRightDist = gateLeftDist, gateRightDist
+        if isClosed:
+            seedRightDist = utils.wrap(seedRightDist, 0, rightDistances[-1])
+        leftCoord = interpLimits(left, leftDistances, seedLeftDist)[:2]
+        rightCoord = interpLimits(right, rightDistances, seedRightDist)[:2]
+        _, seedMidpoint, seedDirection = getGateFromCoords(leftCoord, rightCoord, 1)
+        sectorSeeds.append((seedMidpoint, seedDirection, float(seedLeftDist), float(seedRightDist)))
+    return sectorSeeds
+
+
+def getSectorGates(left: NDArrayFloat2D,
+                   right: NDArrayFloat2D,
+                   leftDistances: NDArrayFloat1D,
+                   rightDistances: NDArrayFloat1D,
+                   isClosed: bool,
+                   bounds: tuple[float, float, float, float],
+                   seedGateMidpoint: NDArrayFloat1D,
+                   seedGateDirection: NDArrayFloat1D,
+                   seedLeftDist: float,
+                   seedRightDist: float,
+                   stopLeftDist: float,
+                   gateStep: float,
+                   gateHalfWidth: float,
+                   reducedWindow: float,
+                   gateStepProfile: GateStepProfile | None = None) -> NDArrayFloat2D:
+    """
+    Marches the gates of one sector of sectorised gate creation, from the seed
+    gate until the distance along the left limits reaches stopLeftDist. Runs
+    in a worker process, so only arrays are passed in and returned.
+
+    Args:
+        left: 2D array where each index is an [x, y, z] coordinate of the left
+            track limits.
+        right: 2D array where each index is an [x, y, z] coordinate of the
+            right track limits.
+        leftDistances: 1D array of the cumulative distance along left.
+        rightDistances: 1D array of the cumulative distance along right.
+        isClosed: Whether the track is closed.
+        bounds: Tuple of (xMin, xMax, yMin, yMax) of the track.
+        seedGateMidpoint: Midpoint of the seed gate, in the form [x, y].
+        seedGateDirection: Direction vector of the seed gate.
+        seedLeftDist: Distance along the left limits of the seed gate.
+        seedRightDist: Distance along the right limits of the seed gate.
+        stopLeftDist: Distance along the left limits (not wrapped if closed)
+            at which to stop - the first gate at or beyond it is not included.
+        gateStep: Distance between consecutive gate midpoints, or the
+            nominal distance if gateStepProfile is provided.
+        gateHalfWidth: Half-width of the gate.
+        reducedWindow: Distance either side of the expected intersection of
+            the gate and limits for the reduced limits arrays, for gateStep.
+        gateStepProfile: Gate steps along the track for adaptive gate
+            spacing, or None for the fixed gateStep.
+
+    Returns:
+        2D array where each row is [xMidpoint, yMidpoint, xDirection,
+        yDirection, leftWidth, rightWidth, leftDist, rightDist] of a gate.
+    """
+    maxGates = int(4 * (stopLeftDist - seedLeftDist) / (gateStep if gateStepProfile is None else gateStepProfile.gateStepMin)) + 10
+    leftProgress = seedLeftDist
+    prevLeftDist = seedLeftDist
+    sectorGates = []
+    for gateData in marchGates(left, right, leftDistances, rightDistances, isClosed, bounds, seedGateMidpoint, seedGateDirection, seedLeftDist,
+                               seedRightDist, gateStep, gateHalfWidth, reducedWindow, gateStepProfile):
+        # Unwrap the distance along the left limits to track the progress through the sector
+        leftStep = gateData[4] - prevLeftDist
+        if isClosed:
+            leftStep = utils.wrap(leftStep, -leftDistances[-1] / 2, leftDistances[-1] / 2)
+        leftProgress += leftStep
+        prevLeftDist = gateData[4]
+        if leftProgress >= stopLeftDist:
+            break
+        if len(sectorGates) >= maxGates:
+            raise Exception("Gate creation in the sector starting at gateMidpoint " + str(seedGateMidpoint.tolist()) + " didn't reach the end of the sector")
+        sectorGates.append(np.hstack(gateData))
+    return np.array(sectorGates).reshape(-1, 8)
+
+
+class GateTable:
+    """
+    Struct-of-arrays storage for the gates and their related data, used during
+    gate creation and by the Track object.
+
+    Each gate property is a float64 column of a preallocated 2D array (one row
+    per column) which grows geometrically as gates are appended, so appending
+    a gate doesn't reallocate and the columns are always available as NumPy
+    views. Shapely geometry for the gates is only created on request.
+    """
+    __slots__ = ('gateHalfWidth', 'nGates', 'data', 'gatesCache')
+
+    # Rows of the data array for each column
+    MIDPOINT = slice(0, 2)              # Gate midpoint [x, y]
+    DIRECTION = slice(2, 4)             # Gate direction [x, y] in the direction of forward travel, normalised to a magnitude of 1
+    LEFT_WIDTH = 4                      # Distance from the gate midpoint to the left limits
+    RIGHT_WIDTH = 5                     # Distance from the gate midpoint to the right limits
+    LEFT_EXTEND_WIDTH = 6               # Distance from the gate midpoint to the left extend limits
+    RIGHT_EXTEND_WIDTH = 7              # Distance from the gate midpoint to the right extend limits
+    LEFT_DIST = 8                       # Cumulative distance along the left limits of the intersection with the gate
+    RIGHT_DIST = 9                      # Cumulative distance along the right limits of the intersection with the gate
+    LEFT_EXTEND_DIST = 10               # Cumulative distance along the left extend limits of the intersection with the gate
+    RIGHT_EXTEND_DIST = 11              # Cumulative distance along the right extend limits of the intersection with the gate
+    N_COLUMNS = 12
+
+    def __init__(self,
+                 gateHalfWidth: float,
+                 capacity: int = 64) -> None:
+        """
+        Creates an empty gate table.
+
+        Args:
+            gateHalfWidth: Half-width of the gates, used when creating the
+                Shapely LineStrings of the gates.
+            capacity: Number of gates to preallocate the columns for.
+        """
+        self.gateHalfWidth = gateHalfWidth
+        self.nGates = 0
+        self.data = np.empty((GateTable.N_COLUMNS, max(capacity, 1)))
+        self.gatesCache = None
+
+    @classmethod
+    def fromArrays(cls,
+                   gateHalfWidth: float,
+                   gatesMidpoint: NDArrayFloat2D,
+                   gatesDirection: NDArrayFloat2D,
+                   leftWidths: NDArrayFloat1D,
+                   rightWidths: NDArrayFloat1D,
+                   leftExtendWidths: NDArrayFloat1D,
+                   rightExtendWidths: NDArrayFloat1D,
+                   leftDists: NDArrayFloat1D,
+                   rightDists: NDArrayFloat1D,
+                   leftExtendDists: NDArrayFloat1D,
+                   rightExtendDists: NDArrayFloat1D) -> 'GateTable':
+        """
+        Creates a gate table from existing arrays of the gate data, e.g. when
+        loading from the track cache.
+
+        Args:
+            gateHalfWidth: Half-width of the gates.
+            gatesMidpoint: 2D array of the [x, y] midpoint of each gate.
+            gatesDirection: 2D array of the direction vector of each gate.
+            leftWidths: 1D array of the distances to the left limits.
+            rightWidths: 1D array of the distances to the right limits.
+            leftExtendWidths: 1D array of the distances to the left extend
+                limits.
+            rightExtendWidths: 1D array of the distances to the right extend
+                limits.
+            leftDists: 1D array of the cumulative distances along the left
+                limits of the intersections with the gates.
+            rightDists: 1D array of the cumulative distances along the right
+                limits of the intersections with the gates.
+            leftExtendDists: 1D array of the cumulative distances along the
+                left extend limits of the intersections with the gates.
+            rightExtendDists: 1D array of the cumulative distances along the
+                right extend limits of the intersections with the gates.
+
+        Returns:
+            GateTable object containing the gates, with no spare capacity.
+        """
+        table = cls(gateHalfWidth, np.size(leftWidths))
+        table.nGates = np.size(leftWidths)
+        table.data[GateTable.MIDPOINT] = np.transpose(gatesMidpoint)
+        table.data[GateTable.DIRECTION] = np.transpose(gatesDirection)
+        table.data[GateTable.LEFT_WIDTH] = leftWidths
+        table.data[GateTable.RIGHT_WIDTH] = rightWidths
+        table.data[GateTable.LEFT_EXTEND_WIDTH] = leftExtendWidths
+        table.data[GateTable.RIGHT_EXTEND_WIDTH] = rightExtendWidths
+        table.data[GateTable.LEFT_DIST] = leftDists
+        table.data[GateTable.RIGHT_DIST] = rightDists
+        table.data[GateTable.LEFT_EXTEND_DIST] = leftExtendDists
+        table.data[GateTable.RIGHT_EXTEND_DIST] = rightExtendDists
+        return table
+
+    @classmethod
+    def fromData(cls,
+                 gateHalfWidth: float,
+                 data: NDArrayFloat2D) -> 'GateTable':
+        """
+        Creates a gate table from a data array with the same rows as the
+        table, e.g. when joining the data of several gate tables.
+
+        Args:
+            gateHalfWidth: Half-width of the gates.
+            data: 2D array of shape (N_COLUMNS, number of gates).
+
+        Returns:
+            GateTable object containing the gates, with no spare capacity.
+        """
+        table = cls(gateHalfWidth, np.size(data, 1))
+        table.nGates = np.size(data, 1)
+        table.data[:, :table.nGates] = data
+        return table
+
+
+    def __len__(self) -> int:
+        return self.nGates
+
+
+    def append(self,
+               gateMidpoint: NDArrayFloat1D,
+               gateDirection: NDArrayFloat1D,
+               leftWidth: float,
+               rightWidth: float,
+               leftExtendWidth: float,
+               rightExtendWidth: float,
+               leftDist: float,
+               rightDist: float,
+               leftExtendDist: float,
+               rightExtendDist: float) -> int:
+        """
+        Appends a gate to the end of the table, doubling the capacity of the
+        columns if they are full.
+
+        Args:
+            gateMidpoint: Coordinates of the midpoint of the gate, in the form
+                [x, y].
+            gateDirection: Direction vector of the gate in the direction of
+                forward travel, normalised to a magnitude of 1.
+            leftWidth: Distance to the left limits from the gate midpoint.
+            rightWidth: Distance to the right limits from the gate midpoint.
+            leftExtendWidth: Distance to the left extend limits from the gate
+                midpoint.
+            rightExtendWidth: Distance to the right extend limits from the gate
+                midpoint.
+            leftDist: Cumulative distance along the left limits of the
+                intersection with the gate.
+            rightDist: Cumulative distance along the right limits of the
+                intersection with the gate.
+            leftExtendDist: Cumulative distance along the left extend limits of
+                the intersection with the gate.
+            rightExtendDist: Cumulative distance along the right extend limits
+                of the intersection with the gate.
+
+        Returns:
+            Index of the appended gate.
+        """
+        if self.nGates == np.size(self.data, 1):
+            grown = np.empty((GateTable.N_COLUMNS, 2 * self.nGates))
+            grown[:, :self.nGates] = self.data[:, :self.nGates]
+            self.data = grown
+        i = self.nGates
+        self.data[GateTable.MIDPOINT, i] = gateMidpoint
+        self.data[GateTable.DIRECTION, i] = gateDirection
+        self.data[GateTable.LEFT_WIDTH:, i] = (leftWidth, rightWidth, leftExtendWidth, rightExtendWidth, leftDist, rightDist,
+                                                  leftExtendDist, rightExtendDist)
+        self.nGates += 1
+        self.gatesCache = None
+        return i
+
+
+    def removeWhere(self,
+                    mask: NDArrayBool1D) -> None:
+        """
+        Removes all the gates where mask is true, keeping the order of the
+        remaining gates.
+
+        Args:
+            mask: 1D array of booleans for each gate in the table.
+        """
+        keep = np.flatnonzero(~mask)
+        self.data[:, :np.size(keep)] = self.data[:, keep]
+        self.nGates = np.size(keep)
+        self.gatesCache = None
+
+
+    def getExtendLines(self,
+                       indexes: NDArrayInt1D | slice = slice(None)) -> NDArrayObject1D:
+        """
+        Creates the Shapely LineStrings of the gates, extended up to the extend
+        limits on each side (see getGateExtendLine()).
+
+        Args:
+            indexes: Indexes of the gates to create the extend lines for.
+                Defaults to all gates.
+
+        Returns:
+            1D array of Shapely LineStrings of the extend lines of the gates.
+        """
+        gatesMidpoint = self.gatesMidpoint[indexes]
+        leftVectors = np.column_stack((-self.gatesDirection[indexes, 1], self.gatesDirection[indexes, 0]))
+        gatesCoords = np.stack((gatesMidpoint + (leftVectors * self.leftExtendWidths[indexes, np.newaxis]),
+                                gatesMidpoint - (leftVectors * self.rightExtendWidths[indexes, np.newaxis])), axis=1)
+        return shapely.linestrings(gatesCoords)
+
+
+    def insertRemovingOverlaps(self,
+                               gateName: str,
+                               gateMidpoint: NDArrayFloat1D,
+                               gateDirection: NDArrayFloat1D,
+                               leftWidth: float,
+                               rightWidth: float,
+                               leftExtendWidth: float,
+                               rightExtendWidth: float,
+                               leftDist: float,
+                               rightDist: float,
+                               leftExtendDist: float,
+                               rightExtendDist: float) -> int:
+        """
+        Appends a gate that must be kept (e.g. the start, finish or last gate),
+        first removing the run of gates at the end of the table whose extend
+        lines intersect with the extend line of the new gate. The intersection
+        checks are done as a single vectorised Shapely operation.
+
+        Args:
+            gateName: Name of the gate for printing which gates were removed.
+            gateMidpoint: Coordinates of the midpoint of the gate, in the form
+                [x, y].
+            gateDirection: Direction vector of the gate in the direction of
+                forward travel, normalised to a magnitude of 1.
+            leftWidth: Distance to the left limits from the gate midpoint.
+            rightWidth: Distance to the right limits from the gate midpoint.
+            leftExtendWidth: Distance to the left extend limits from the gate
+                midpoint.
+            rightExtendWidth: Distance to the right extend limits from the gate
+                midpoint.
+            leftDist: Cumulative distance along the left limits of the
+                intersection with the gate.
+            rightDist: Cumulative distance along the right limits of the
+                intersection with the gate.
+            leftExtendDist: Cumulative distance along the left extend limits of
+                the intersection with the gate.
+            rightExtendDist: Cumulative distance along the right extend limits
+                of the intersection with the gate.
+
+        Returns:
+            Index of the inserted gate.
+        """
+        with profiling.timer('gateOverlapRemoval'):
+            extendLine = getGateExtendLine(gateMidpoint, gateDirection, leftExtendWidth, rightExtendWidth)
+            intersects = shapely.intersects(self.getExtendLines(), extendLine)
+
+            # Only remove the trailing run of intersecting gates (stopping at the last gate that doesn't intersect)
+            trailing = np.flip(np.logical_and.accumulate(np.flip(intersects)))
+            for gateMidpointRemoved in self.gatesMidpoint[trailing]:
+                LOGGER.debug("Gate at midpoint %s and %s both have gateExtendLines that intersect - removing this gate", gateMidpointRemoved, gateName)
+            profiling.count('gatesRemovedOverlap', int(np.count_nonzero(trailing)))
+            self.removeWhere(trailing)
+
+        return self.append(gateMidpoint, gateDirection, leftWidth, rightWidth, leftExtendWidth, rightExtendWidth, leftDist, rightDist, leftExtendDist,
+                           rightExtendDist)
+
+
+    def getGate(self,
+                i: int) -> shapely.LineString:
+        """
+        Creates the Shapely LineString of a single gate, at its full width.
+
+        Args:
+            i: Index of the gate.
+
+        Returns:
+            Shapely LineString representing the gate.
+        """
+        return getGateExtendLine(self.gatesMidpoint[i], self.gatesDirection[i], self.gateHalfWidth, self.gateHalfWidth)
+
+
+    def trim(self) -> None:
+        """
+        Reallocates the columns to exactly fit the gates, to free the spare
+        capacity once gate creation is finished.
+        """
+        self.data = self.data[:, :self.nGates].copy()
+
+    @property
+    def gates(self) -> NDArrayObject1D:
+        """1D array of Shapely LineStrings of the gates, created on first request."""
+        if self.gatesCache is None:
+            self.gatesCache = getGatesFromMidpoints(self.gatesMidpoint, self.gatesDirection, self.gateHalfWidth)
+        return self.gatesCache
+
+    @property
+    def gatesMidpoint(self) -> NDArrayFloat2D:
+        return self.data[GateTable.MIDPOINT, :self.nGates].T
+
+    @property
+    def gatesDirection(self) -> NDArrayFloat2D:
+        return self.data[GateTable.DIRECTION, :self.nGates].T
+
+    @property
+    def leftWidths(self) -> NDArrayFloat1D:
+        return self.data[GateTable.LEFT_WIDTH, :self.nGates]
+
+    @property
+    def rightWidths(self) -> NDArrayFloat1D:
+        return self.data[GateTable.RIGHT_WIDTH, :self.nGates]
+
+    @property
+    def leftExtendWidths(self) -> NDArrayFloat1D:
+        return self.data[GateTable.LEFT_EXTEND_WIDTH, :self.nGates]
+
+    @property
+    def rightExtendWidths(self) -> NDArrayFloat1D:
+        return self.data[GateTable.RIGHT_EXTEND_WIDTH, :self.nGates]
+
+    @property
+    def leftDists(self) -> NDArrayFloat1D:
+        return self.data[GateTable.LEFT_DIST, :self.nGates]
+
+    @property
+    def rightDists(self) -> NDArrayFloat1D:
+        return self.data[GateTable.RIGHT_DIST, :self.nGates]
+
+    @property
+    def leftExtendDists(self) -> NDArrayFloat1D:
+        return self.data[GateTable.LEFT_EXTEND_DIST, :self.nGates]
+
+    @property
+    def rightExtendDists(self) -> NDArrayFloat1D:
+        return self.data[GateTable.RIGHT_EXTEND_DIST, :self.nGates]
+
+
+def appendMarchedGates(gateTable: GateTable,
+                       marchedGates: Iterator[tuple[NDArrayFloat1D, NDArrayFloat1D, float, float, float, float]],
+                       limitsTrees: tuple[LimitsSegmentTree, LimitsSegmentTree, LimitsSegmentTree, LimitsSegmentTree],
+                       stopGate: shapely.LineString,
+                       nMinGates: int,
+                       lastGateCoords: NDArrayFloat2D | None,
+                       startLineCoords: NDArrayFloat2D | None,
+                       finishLineCoords: NDArrayFloat2D | None,
+                       prevLeftExtendIndex: int,
+                       prevRightExtendIndex: int) -> tuple[int, int]:
+    """
+    Appends the marched gates to the gate table until the midline crosses the
+    stop gate, skipping gates that overlap the previous gate and inserting the
+    start and finish gates where the midline crosses the start and finish
+    lines.
+
+    Used for gate creation from the first gate, and for re-solving the gates
+    around an edit to the limits (see Track.updateLimits()).
+
+    Args:
+        gateTable: Gate table to append to, containing at least the gate the
+            gates were marched from.
+        marchedGates: Iterator of the marched gates (see marchGates()).
+        limitsTrees: Tuple of the (left, right, leftExtend, rightExtend)
+            LimitsSegmentTree objects.
+        stopGate: Shapely LineString of the gate at which to stop.
+        nMinGates: Minimum number of gates in the table before stopping, so
+            a closed track doesn't stop at its first gate.
+        lastGateCoords: [left, right] [x, y] coordinates of the last gate to
+            insert when stopping (the end of a track that isn't closed), or
+            None to stop without inserting a gate.
+        startLineCoords: [left, right] [x, y] coordinates of the start line,
+            or None to not insert the start gate.
+        finishLineCoords: [left, right] [x, y] coordinates of the finish line,
+            or None to not insert the finish gate.
+        prevLeftExtendIndex: Index of the left extend limits segment that
+            intersected the last gate in the table, or -1 if unknown.
+        prevRightExtendIndex: Index of the right extend limits segment that
+            intersected the last gate in the table, or -1 if unknown.
+
+    Returns:
+        Tuple of (startGateIndex, finishGateIndex) in the gate table, each -1
+        if its line wasn't crossed (or wasn't provided).
+    """
+    leftTree, rightTree, leftExtendTree, rightExtendTree = limitsTrees
+    gateHalfWidth = gateTable.gateHalfWidth
+    startLine = shapely.LineString(startLineCoords) if startLineCoords is not None else None
+    finishLine = shapely.LineString(finishLineCoords) if finishLineCoords is not None else None
+    startGateIndex = -1
+    finishGateIndex = -1
+    for gateMidpoint, gateDirection, leftWidth, rightWidth, prevLeftDist, prevRightDist in marchedGates:
+        gate = getGateExtendLine(gateMidpoint, gateDirection, gateHalfWidth, gateHalfWidth)
+
+        # Create a segment from the previous gateMidpoint to the current gateMidpoint - to check intersections with startLine, finishLine and last gate
+        midlineSegment = shapely.LineString([gateTable.gatesMidpoint[-1], gateMidpoint])
+
+        # Check intersection with startLine
+        if startLine is not None and midlineSegment.intersects(startLine) and startGateIndex < 0:
+            # Check that startGate isn't the previous gate or the current gate (should only happen if startCoords were automatically computed)
+            startGate, startGateMidpoint, startGateDirection = getGateFromCoords(startLineCoords[0], startLineCoords[1], gateHalfWidth)
+            if shapely.equals_exact(startGate, gateTable.getGate(-1)):
+                # startGate is the previous gate
+                startGateIndex = len(gateTable) - 1
+            elif shapely.equals_exact(startGate, gate):
+                # startGate is the current gate
+                startGateIndex = len(gateTable)
+            else:
+                # Create start gate from coordinates then calculate all the gate information and insert it into the gate table
+                startLeftWidth, _, startLeftDist = leftTree.getWidth(startGate, startGateMidpoint, getDistanceIndex(leftTree.distances, prevLeftDist), gateHalfWidth)
+                startRightWidth, _, startRightDist = rightTree.getWidth(startGate, startGateMidpoint, getDistanceIndex(rightTree.distances, prevRightDist), gateHalfWidth)
+                startLeftExtendWidth, prevLeftExtendIndex, startLeftExtendDist = leftExtendTree.getWidth(startGate, startGateMidpoint, prevLeftExtendIndex, gateHalfWidth)
+                startRightExtendWidth, prevRightExtendIndex, startRightExtendDist = rightExtendTree.getWidth(startGate, startGateMidpoint, prevRightExtendIndex, gateHalfWidth)
+                startGateIndex = gateTable.insertRemovingOverlaps("startGate", startGateMidpoint, startGateDirection, startLeftWidth, startRightWidth,
+                                                                  max(startLeftExtendWidth, startLeftWidth), max(startRightExtendWidth, startRightWidth),
+                                                                  startLeftDist, startRightDist, startLeftExtendDist, startRightExtendDist)
+
+        # Check intersection with finishLine - Note if finishLine is unique but very close to startLine then finishGateIndex = startGateIndex + 1
+        if finishLine is not None and midlineSegment.intersects(finishLine) and finishGateIndex < 0:
+            # Check that finishGate isn't the previous gate or the current gate (should only happen if startCoords were automatically computed)
+            finishGate, finishGateMidpoint, finishGateDirection = getGateFromCoords(finishLineCoords[0], finishLineCoords[1], gateHalfWidth)
+            if shapely.equals_exact(finishGate, gateTable.getGate(-1)):
+                # finishGate is the previous gate
+                finishGateIndex = len(gateTable) - 1
+            elif shapely.equals_exact(finishGate, gate):
+                # finishGate is the current gate, Check that finishLine isn't also startLine (very rare possibility if the track is closed)
+                if startLine is not None and shapely.equals_exact(startLine, finishLine):
+                    # finishLine is also startLine, which means we've already got it in the gate table from the startLine intersection check
+                    finishGateIndex = startGateIndex
+                else:
+                    finishGateIndex = len(gateTable)
             else:
-                dist = np.interp(intersection.y, segment.xy[1], [d1, d2])
+                # Create finish gate from coordinates then calculate all the gate information and insert it into the gate table
+                finishLeftWidth, _, finishLeftDist = leftTree.getWidth(finishGate, finishGateMidpoint, getDistanceIndex(leftTree.distances, prevLeftDist), gateHalfWidth)
+                finishRightWidth, _, finishRightDist = rightTree.getWidth(finishGate, finishGateMidpoint, getDistanceIndex(rightTree.distances, prevRightDist), gateHalfWidth)
+                finishLeftExtendWidth, prevLeftExtendIndex, finishLeftExtendDist = leftExtendTree.getWidth(finishGate, finishGateMidpoint, prevLeftExtendIndex, gateHalfWidth)
+                finishRightExtendWidth, prevRightExtendIndex, finishRightExtendDist = rightExtendTree.getWidth(finishGate, finishGateMidpoint, prevRightExtendIndex, gateHalfWidth)
+                finishGateIndex = gateTable.insertRemovingOverlaps("finishGate", finishGateMidpoint, finishGateDirection, finishLeftWidth, finishRightWidth,
+                                                                   max(finishLeftExtendWidth, finishLeftWidth), max(finishRightExtendWidth, finishRightWidth),
+                                                                   finishLeftDist, finishRightDist, finishLeftExtendDist, finishRightExtendDist)
+
+        # Check intersection with stopGate - must also be nMinGates or more gates in the table to break out of the gate creation loop
+        if midlineSegment.intersects(stopGate) and len(gateTable) >= nMinGates:
+            # If the track is closed then the stop gate is the first gate so it's unnecessary to add the last gate
+            # If track is not closed, re-make the last gate from coordinates and calculate all the gate information and insert it into the gate table
+            if lastGateCoords is not None:
+                lastGate, lastGateMidpoint, lastGateDirection = getGateFromCoords(lastGateCoords[0], lastGateCoords[1], gateHalfWidth)
+                lastLeftWidth = scipy.linalg.norm(lastGateMidpoint - lastGateCoords[0])
+                lastRightWidth = scipy.linalg.norm(lastGateMidpoint - lastGateCoords[1])
+                lastLeftExtendWidth, prevLeftExtendIndex, lastLeftExtendDist = leftExtendTree.getWidth(lastGate, lastGateMidpoint, prevLeftExtendIndex, gateHalfWidth)
+                lastRightExtendWidth, prevRightExtendIndex, lastRightExtendDist = rightExtendTree.getWidth(lastGate, lastGateMidpoint, prevRightExtendIndex, gateHalfWidth)
+                gateTable.insertRemovingOverlaps("lastGate", lastGateMidpoint, lastGateDirection, lastLeftWidth, lastRightWidth,
+                                                 max(lastLeftExtendWidth, lastLeftWidth), max(lastRightExtendWidth, lastRightWidth),
+                                                 leftTree.distances[-1], rightTree.distances[-1], lastLeftExtendDist, lastRightExtendDist)
+            # Exit the gate creation loop
+            break
 
-            return dist
+        # Find leftExtendWidth and rightExtendWidth after the stop check, as the gate past the stop gate is discarded and may be beyond the end of the
+        # extend limits - using candidates for the indexes to make sure the indexes only update if the gate was appended to the lists
+        with profiling.timer('extendWidthSearch'):
+            leftExtendWidth, prevLeftExtendIndexCandidate, leftExtendDist = leftExtendTree.getWidth(gate, gateMidpoint, prevLeftExtendIndex, gateHalfWidth)
+            rightExtendWidth, prevRightExtendIndexCandidate, rightExtendDist = rightExtendTree.getWidth(gate, gateMidpoint, prevRightExtendIndex, gateHalfWidth)
+
+        # Check if this gate intersects with the previous gate within the extend limits
+        with profiling.timer('gateOverlapRemoval'):
+            BOverlapsPrevGate = getGateExtendLine(gateMidpoint, gateDirection, leftExtendWidth, rightExtendWidth).intersects(gateTable.getExtendLines([-1])[0])
+        if BOverlapsPrevGate:
+            LOGGER.debug("Gate at midpoint %s and previous gate both have gateExtendLines that intersect - not appending this gate to the gate table", gateMidpoint)
+            profiling.count('gatesSkippedOverlap')
+        else:
+            # If this gate doesn't intersect then append the gate and its information
+            gateTable.append(gateMidpoint, gateDirection, leftWidth, rightWidth, max(leftExtendWidth, leftWidth), max(rightExtendWidth, rightWidth),
+                             prevLeftDist, prevRightDist, leftExtendDist, rightExtendDist)
+            profiling.count('gatesAppended')
+            prevLeftExtendIndex = prevLeftExtendIndexCandidate
+            prevRightExtendIndex = prevRightExtendIndexCandidate
+    return startGateIndex, finishGateIndex
+
+
+def getFirstGate(left: NDArrayFloat2D,
+                 right: NDArrayFloat2D,
+                 leftExtendTree: LimitsSegmentTree,
+                 rightExtendTree: LimitsSegmentTree,
+                 gateHalfWidth: float) -> tuple[tuple, int, int]:
+    """
+    Creates the first gate from the first coordinates of the limits, and its
+    related data.
 
-    # If the gate never intersected with reducedLimitsCoords, return the first distance in the distances array,
-    # and the gate's x and y coordinates on the side corresponding to isLeft
-    if isLeft:
-        print("leftWidth == gateHalfWidth for gate", gate)
-        return reducedDist[0]
-    else:
-        print("rightWidth == gateHalfWidth for gate", gate)
-        return reducedDist[0]
+    Args:
+        left: 2D array of the left track limits.
+        right: 2D array of the right track limits.
+        leftExtendTree: LimitsSegmentTree of the left extend limits.
+        rightExtendTree: LimitsSegmentTree of the right extend limits.
+        gateHalfWidth: Half-width of the gate.
+
+    Returns:
+        Tuple of (gateData, prevLeftExtendIndex, prevRightExtendIndex), where
+        gateData is the tuple of arguments to append the gate to a GateTable.
+    """
+    gate, gateMidpoint, gateDirection = getGateFromCoords(left[0][:2], right[0][:2], gateHalfWidth)
+    leftWidth = scipy.linalg.norm(gateMidpoint - left[0][0:2])
+    rightWidth = scipy.linalg.norm(gateMidpoint - right[0][0:2])
+    leftExtendWidth, prevLeftExtendIndex, leftExtendDist = leftExtendTree.getWidth(gate, gateMidpoint, -1, gateHalfWidth)
+    rightExtendWidth, prevRightExtendIndex, rightExtendDist = rightExtendTree.getWidth(gate, gateMidpoint, -1, gateHalfWidth)
+    gateData = (gateMidpoint, gateDirection, leftWidth, rightWidth, max(leftExtendWidth, leftWidth), max(rightExtendWidth, rightWidth), 0, 0,
+                leftExtendDist, rightExtendDist)
+    return gateData, prevLeftExtendIndex, prevRightExtendIndex
+
+
+def getZData(zLimits: list[tuple[NDArrayFloat2D, LimitsSegmentTree, int]],
+             isClosed: bool) -> tuple[NDArrayFloat2D, NDArrayFloat1D, NDArrayFloat1D, NDArrayInt1D, NDArrayFloat1D]:
+    """
+    Collects the track z height data points from all the provided limits
+    (without the closing point), along with the distance of each point along
+    its own limits and which limits it's from, for selecting the points of the
+    local z interpolators.
+
+    Args:
+        zLimits: List of (limits, tree, column) for each of the limits, where
+            tree is the LimitsSegmentTree of the limits and column is the
+            GateTable column of the distances along the limits.
+        isClosed: Whether the track is closed.
+
+    Returns:
+        Tuple of (zCoords, zValues, zDists, zLimitColumns, zLimitLengths), see
+        Track.__initZInterpolators().
+    """
+    nZPoints = [np.size(limits, 0) - 1 if isClosed else np.size(limits, 0) for limits, _, _ in zLimits]
+    zCoords = np.vstack([limits[:n, :2] for (limits, _, _), n in zip(zLimits, nZPoints)])
+    zValues = np.hstack([limits[:n, 2] for (limits, _, _), n in zip(zLimits, nZPoints)])
+    zDists = np.hstack([tree.distances[:n] for (_, tree, _), n in zip(zLimits, nZPoints)])
+    zLimitColumns = np.repeat([column for _, _, column in zLimits], nZPoints)
+    zLimitLengths = np.repeat([tree.distances[-1] for _, tree, _ in zLimits], nZPoints)
+    return zCoords, zValues, zDists, zLimitColumns, zLimitLengths
 
 
 class Track:
@@ -526,8 +2237,11 @@ class Track:
                  startLineCoords: list[list[float]] | NDArrayFloat2D | None = None,
                  finishLineCoords: list[list[float]] | NDArrayFloat2D | None = None,
                  isClosed: bool = None,
-                 gateStep: float = 10) -> None:
-        print("Initialising track")
+                 gateStep: float = 10,
+                 cacheDir: str | os.PathLike | None = None,
+                 nGateSectors: int = 1,
+                 gateStepBounds: tuple[float, float] | None = None) -> None:
+        LOGGER.info("Initialising track")
 
         # Constants (subject to change though) TODO: Consider moving all settings to a separate Python file, grouping them by module
         isClosedTrackThreshold = 10     # Threshold gap size in metres for if the left/right track limits coordinate arrays provided are closed or not
@@ -539,13 +2253,39 @@ class Track:
         rightExtendProvided = rightExtend is not None
 
         # Convert relevant inputs to NumPy arrays and set leftExtend and rightExtend to left and right respectively if they're None
-        left = np.array(left)
-        right = np.array(right)
-        leftExtend = np.array(leftExtend) if leftExtendProvided else left
-        rightExtend = np.array(rightExtend) if rightExtendProvided else right
+        # (asarray so arrays such as memory-mapped limits aren't copied)
+        left = np.asarray(left, dtype=float)
+        right = np.asarray(right, dtype=float)
+        leftExtend = np.asarray(leftExtend, dtype=float) if leftExtendProvided else left
+        rightExtend = np.asarray(rightExtend, dtype=float) if rightExtendProvided else right
         startLineCoords = np.array(startLineCoords) if startLineCoords else None
         finishLineCoords = np.array(finishLineCoords) if finishLineCoords else None
 
+        # Keep the inputs the gates are generated from, so the track can be updated after editing the limits (see updateLimits())
+        self.trackGenSettings = {
+            'Left': left,
+            'Right': right,
+            'LeftExtend': leftExtend if leftExtendProvided else None,
+            'RightExtend': rightExtend if rightExtendProvided else None,
+            'StartLineCoords': startLineCoords,
+            'FinishLineCoords': finishLineCoords,
+            'GateStep': gateStep,
+            'ReducedWindow': reducedWindow,
+            'GateStepBounds': gateStepBounds,
+        }
+
+        # Load the track from the cache if it has already been generated with identical inputs
+        cachePath = None
+        if cacheDir is not None:
+            cacheKey = getTrackCacheKey(left, right, leftExtend, rightExtend, startLineCoords, finishLineCoords, isClosed, gateStep, gateHalfWidth,
+                                        nGateSectors, gateStepBounds)
+            cachePath = os.path.join(cacheDir, TRACK_CACHE_FILENAME_FORMAT.format(cacheKey))
+            with profiling.timer('cacheLoad'):
+                BLoadedFromCache = self.__initFromCache(cachePath)
+            if BLoadedFromCache:
+                LOGGER.info("Track initialised from cache %s", cachePath)
+                return
+
         # Get min/max x and y coordinates
         xCoords = np.concat((left[:, 0], right[:, 0], leftExtend[:, 0], rightExtend[:, 0]))
         yCoords = np.concat((left[:, 1], right[:, 1], leftExtend[:, 1], rightExtend[:, 1]))
@@ -554,23 +2294,6 @@ class Track:
         self.yMin = np.min(yCoords)
         self.yMax = np.max(yCoords)
 
-        # Creates track z height interpolators from all provided [x, y, z] coordinates - left, right, leftExtend and rightExtend arrays
-        # Create data point coordinate array ([x, y] coordinates)
-        coords = np.vstack((left[:, :2].copy(), right[:, :2].copy()))
-        if leftExtendProvided:
-            coords = np.vstack((coords, leftExtend[:, :2].copy()))
-        if rightExtendProvided:
-            coords = np.vstack((coords, rightExtend[:, :2].copy()))
-        # Create data value array (z values)
-        zValues = np.hstack((left[:, 2].copy(), right[:, 2].copy()))
-        if leftExtendProvided:
-            zValues = np.hstack((zValues, leftExtend[:, 2].copy()))
-        if rightExtendProvided:
-            zValues = np.hstack((zValues, rightExtend[:, 2].copy()))
-        # Create interpolators
-        self.zLinInterp = scipy.interpolate.LinearNDInterpolator(coords, zValues)
-        self.zNNInterp = scipy.interpolate.NearestNDInterpolator(coords, zValues)
-
         # Determine whether the track provided is closed based on left and right arrays if not available
         if isClosed is None:
             gapLeft = scipy.linalg.norm(left[0] - left[-1])
@@ -583,294 +2306,745 @@ class Track:
             self.isClosed = isClosed
 
         # Make sure left, right, leftExtend and rightExtend arrays are closed if the track is closed
-        if self.isClosed:
-            if not np.array_equal(left[0], left[-1]):
-                left = np.vstack((left, left[0]))
-            if not np.array_equal(right[0], right[-1]):
-                right = np.vstack((right, right[0]))
-            if not np.array_equal(leftExtend[0], leftExtend[-1]):
-                leftExtend = np.vstack((leftExtend, leftExtend[0]))
-            if not np.array_equal(rightExtend[0], rightExtend[-1]):
-                rightExtend = np.vstack((rightExtend, rightExtend[0]))
+        left, right, leftExtend, rightExtend = (getClosedLimits(limits, self.isClosed) for limits in (left, right, leftExtend, rightExtend))
 
         # Create start/finish gate coordinates if they aren't available, based on the left and right arrays
-        if startLineCoords is None:
-            startLineCoords = finishLineCoords if self.isClosed and finishLineCoords else np.array([left[0][:2], right[0][:2]])
-        if finishLineCoords is None:
-            finishLineCoords = startLineCoords if self.isClosed else np.array([left[-1][:2], right[-1][:2]])
-
-        # Create startLine/finishLine lines from their coordinates - to determine when to insert the actual startGate and finishGate into the gates
-        startLine = shapely.LineString(startLineCoords)
-        finishLine = shapely.LineString(finishLineCoords)
-
-        # Lists for gates and their related data - these will be turned into NumPy arrays at the end
-        self.gates = []
-        self.gatesMidpoint = []
-        self.gatesDirection = []
-        self.leftWidths = []
-        self.rightWidths = []
-        self.leftExtendWidths = []
-        self.rightExtendWidths = []
+        startLineCoords, finishLineCoords = getStartFinishLineCoords(startLineCoords, finishLineCoords, left, right, self.isClosed)
+
+        # Create CoordinateArray objects storing the distances and headings along the left/right track limits
+        with profiling.timer('limitsPreprocessing'):
+            leftCoordArray = CoordinateArray(left, self.isClosed)
+            rightCoordArray = CoordinateArray(right, self.isClosed)
+        leftDistances = leftCoordArray.sCoords
+        rightDistances = rightCoordArray.sCoords
+
+        # Gate steps along the track for adaptive gate spacing - gateStep is then only the nominal step (e.g. for sizing the gate table)
+        gateStepProfile = None
+        if gateStepBounds is not None:
+            with profiling.timer('limitsPreprocessing'):
+                gateStepProfile = GateStepProfile(leftCoordArray, rightCoordArray, *gateStepBounds)
+
+        # Table for gates and their related data - preallocated for the expected number of gates
+        self.gateTable = GateTable(gateHalfWidth, int(max(leftDistances[-1], rightDistances[-1]) / gateStep) + 16)
 
         # Indexes of the start and finish gates in the gates arrays
         self.startGateIndex = -1
         self.finishGateIndex = -1
 
-        # Create arrays storing the distances along the left/right track limits
-        nLeft, leftDistances = getLimitsDistances(left)
-        nRight, rightDistances = getLimitsDistances(right)
-        nLeft = np.size(leftDistances)
-        nRight = np.size(leftDistances)
-
-        # For the extendWidth calculations
-        nLeftExtend = np.size(leftExtend, 0)
-        nRightExtend = np.size(rightExtend, 0)
-        prevLeftExtendIndex = -1
-        prevRightExtendIndex = -1
-
-        # Create the first gate and its related data, then append it to the relevant lists
-        gate, gateMidpoint, gateDirection = getGateFromCoords(left[0][:2], right[0][:2], gateHalfWidth)
-        leftWidth = scipy.linalg.norm(gateMidpoint - left[0][0:2])
-        rightWidth = scipy.linalg.norm(gateMidpoint - right[0][0:2])
-        leftExtendWidth, prevLeftExtendIndex = getLimitsExtendWidthClosed(gate, gateMidpoint, leftExtend, nLeftExtend, prevLeftExtendIndex, gateHalfWidth)
-        rightExtendWidth, prevRightExtendIndex = getLimitsExtendWidthClosed(gate, gateMidpoint, rightExtend, nRightExtend, prevRightExtendIndex, gateHalfWidth)
-        self.gates.append(gate)
-        self.gatesMidpoint.append(gateMidpoint)
-        self.gatesDirection.append(gateDirection)
-        self.leftWidths.append(leftWidth)
-        self.rightWidths.append(rightWidth)
-        self.leftExtendWidths.append(max(leftExtendWidth, leftWidth))
-        self.rightExtendWidths.append(max(rightExtendWidth, rightWidth))
+        # Spatial indexes of the limits for the width calculations (extend limits share the index if they weren't provided)
+        with profiling.timer('limitsPreprocessing'):
+            leftTree = LimitsSegmentTree(left, self.isClosed)
+            rightTree = LimitsSegmentTree(right, self.isClosed)
+            leftExtendTree = LimitsSegmentTree(leftExtend, self.isClosed) if leftExtendProvided else leftTree
+            rightExtendTree = LimitsSegmentTree(rightExtend, self.isClosed) if rightExtendProvided else rightTree
+
+        # Track z height data from all provided [x, y, z] coordinates - left, right, leftExtend and rightExtend arrays
+        zLimits = [(left, leftTree, GateTable.LEFT_DIST), (right, rightTree, GateTable.RIGHT_DIST)]
+        if leftExtendProvided:
+            zLimits.append((leftExtend, leftExtendTree, GateTable.LEFT_EXTEND_DIST))
+        if rightExtendProvided:
+            zLimits.append((rightExtend, rightExtendTree, GateTable.RIGHT_EXTEND_DIST))
+        self.__initZInterpolators(*getZData(zLimits, self.isClosed))
+
+        # Create the first gate and its related data, then append it to the gate table
+        firstGateData, prevLeftExtendIndex, prevRightExtendIndex = getFirstGate(left, right, leftExtendTree, rightExtendTree, gateHalfWidth)
+        self.gateTable.append(*firstGateData)
+        gateMidpoint, gateDirection = firstGateData[:2]
 
         # Create the last gate - for detecting when to stop gate creation so this doesn't have the related data and is only within track limits
         lastGate = shapely.LineString([left[-1][:2], right[-1][:2]])
 
-        # Calculate subsequent gates - loop stops once we've gone around the whole track (also stops/throws an error if gate creation breaks)
-        print("Creating track gates")
-        leftIndexes = np.arange(nLeft)
-        rightIndexes = np.arange(nRight)
-        prevLeftDist = 0
-        prevRightDist = 0
-        while True:
-            # Create reducedLeftCoords and reducedRightCoords coordinate lists
-            if self.isClosed:
-                reducedLeftCoords, reducedLeftDist = getReducedLimitsClosed(left, leftIndexes, nLeft, leftDistances, prevLeftDist, gateStep, reducedWindow)
-                reducedRightCoords, reducedRightDist = getReducedLimitsClosed(right, rightIndexes, nRight, rightDistances, prevRightDist, gateStep, reducedWindow)
+        # March the subsequent gates, each solved from the previous gate - either serially from the first gate, or in parallel sectors seeded where
+        # serial gate creation is predicted to place a gate (the sectors are then joined where each one meets the first gate of the next)
+        bounds = (self.xMin, self.xMax, self.yMin, self.yMax)
+        nGateSectors = min(nGateSectors, int(leftDistances[-1] / (GATE_SECTOR_MIN_GATES * gateStep)))
+        if nGateSectors > 1:
+            LOGGER.info("Marching track gates in %d parallel sectors", nGateSectors)
+            sectorLeftDists = np.arange(nGateSectors) * leftDistances[-1] / nGateSectors
+            with profiling.timer('sectorSeeding'):
+                sectorSeeds = [(gateMidpoint, gateDirection, 0, 0)] + getSectorSeeds(left, right, leftDistances, rightDistances, self.isClosed, gateMidpoint,
+                                                                                     sectorLeftDists, gateStep,
+                                                                                     max(reducedWindow, abs(leftDistances[-1] - rightDistances[-1])),
+                                                                                     gateStepProfile)
+            # Each sector overlaps the next sector by 2 gate steps along the left limits, so it includes the gate matching the first gate of the next sector
+            # The final sector stops short of the end and gates are marched serially from there, so the end is handled the same as serial mode
+            seedLeftDists = np.array([sectorSeed[2] for sectorSeed in sectorSeeds])
+            if gateStepProfile is None:
+                sectorSteps = np.full(nGateSectors + 1, gateStep)
             else:
-                raise Exception("No logic for if track is not closed - pls fix")
-                # Should be similar to if isClosed but instead of wrapping it clips to the min and max
-
-            # Create reducedLeft and reducedRight LineStrings
-            reducedLeft = shapely.LineString(reducedLeftCoords)
-            reducedRight = shapely.LineString(reducedRightCoords)
-
-            # Find gate heading and direction
-            params = scipy.optimize.minimize(gateObjFunc, [0, 0],
-                                             (gateMidpoint, gateDirection, gateHalfWidth, gateStep, reducedLeft, reducedRight),
-                                             method='Powell').x
-            # Experiment with different scipy minimize methods to see which is faster and also accuracy - ones that solved successfully:
-            #   'Nelder-Mead'   20.256154368287984
-            #   'Powell'        20.254838726180974
-            #   'L-BFGS-B'      20.25543032184799
-            #   'TNC'           20.261686355342427
-            #   'COBYLA'        FAILED
-            #   'COBYQA'        20.27994131907119
-            #   'SLSQP'         20.252698788205983
-            #   'trust-constr'  20.258087401969213
-
-            gate, gateMidpoint, gateDirection, leftWidth, rightWidth = calcGate(params, gateMidpoint, gateDirection, gateHalfWidth, gateStep, reducedLeft, reducedRight)
-
-            # Raise an exception if gate creation explodes (gateMidpoint goes beyond the bounds of xMin, xMax, yMin, yMax)
-            if gateMidpoint[0] < self.xMin or gateMidpoint[0] > self.xMax or gateMidpoint[1] < self.yMin or gateMidpoint[1] > self.yMax or leftWidth + rightWidth == 2 * gateHalfWidth:
-                raise Exception("Gate creation exploded - Gate with gateMidpoint " + str(gateMidpoint.tolist()) + " went beyond the bounds of [(xMin, xMax), (yMin, yMax)] of " + str([(float(self.xMin), float(self.xMax)), (float(self.yMin), float(self.yMax))]))
-
-            # Find the gate intersections with the left and right coordinate arrays
-            prevLeftDist = getGateLimitsIntersectionDistance(gate, reducedLeftCoords, reducedLeftDist, leftDistances, True)
-            prevRightDist = getGateLimitsIntersectionDistance(gate, reducedRightCoords, reducedRightDist, rightDistances, False)
-
-            # Find leftExtendWidth and rightExtendWidth - using candidates for the indexes to make sure the indexes only update if the gate was appended to the lists
-            leftExtendWidth, prevLeftExtendIndexCandidate = getLimitsExtendWidthClosed(gate, gateMidpoint, leftExtend, nLeftExtend, prevLeftExtendIndex, gateHalfWidth)
-            rightExtendWidth, prevRightExtendIndexCandidate = getLimitsExtendWidthClosed(gate, gateMidpoint, rightExtend, nRightExtend, prevRightExtendIndex, gateHalfWidth)
-
-            # Create a segment from the previous gateMidpoint to the current gateMidpoint - to check intersections with startLine, finishLine and last gate
-            midlineSegment = shapely.LineString([self.gatesMidpoint[-1], gateMidpoint])
-
-            # Check intersection with startLine
-            if midlineSegment.intersects(startLine) and self.startGateIndex < 0:
-                # Check that startGate isn't the previous gate or the current gate (should only happen if startCoords were automatically computed)
-                startGate, startGateMidpoint, startGateDirection = getGateFromCoords(startLineCoords[0], startLineCoords[1], gateHalfWidth)
-                if shapely.equals_exact(startGate, self.gates[-1]):
-                    # startGate is the previous gate
-                    self.startGateIndex = len(self.gates) - 1
-                elif shapely.equals_exact(startGate, gate):
-                    # startGate is the current gate
-                    self.startGateIndex = len(self.gates)
-                else:
-                    # Create start gate from coordinates then calculate all the gate information and append to the lists
-                    startGate, startGateMidpoint, startGateDirection = getGateFromCoords(startLineCoords[0], startLineCoords[1], gateHalfWidth)
-                    startLeftWidth, startRightWidth = getLimitsWidths(startGate, startGateMidpoint, reducedLeft, reducedRight)
-                    startLeftExtendWidth, prevLeftExtendIndex = getLimitsExtendWidthClosed(startGate, startGateMidpoint, leftExtend, nLeftExtend, prevLeftExtendIndex, gateHalfWidth)
-                    startRightExtendWidth, prevRightExtendIndex = getLimitsExtendWidthClosed(startGate, startGateMidpoint, rightExtend, nRightExtend, prevRightExtendIndex, gateHalfWidth)
-                    # Iterate backwards and pop previous gates that intersect with the startGate within the extend limits
-                    startGateExtendLine = getGateExtendLine(startGateMidpoint, startGateDirection, startLeftExtendWidth, startRightExtendWidth)
-                    while len(self.gates) >= 1:
-                        if startGateExtendLine.intersects(getGateExtendLine(self.gatesMidpoint[-1], self.gatesDirection[-1], self.leftExtendWidths[-1], self.rightExtendWidths[-1])):
-                            print("Gate at midpoint", self.gatesMidpoint[-1].tolist(), "and startGate both have gateExtendLines that intersect - removing this gate from the lists")
-                            self.gates.pop()
-                            self.gatesMidpoint.pop()
-                            self.gatesDirection.pop()
-                            self.leftWidths.pop()
-                            self.rightWidths.pop()
-                            self.leftExtendWidths.pop()
-                            self.rightExtendWidths.pop()
-                        else:
-                            break
-                    self.startGateIndex = len(self.gates)
-                    self.gates.append(startGate)
-                    self.gatesMidpoint.append(startGateMidpoint)
-                    self.gatesDirection.append(startGateDirection)
-                    self.leftWidths.append(startLeftWidth)
-                    self.rightWidths.append(startRightWidth)
-                    self.leftExtendWidths.append(max(startLeftExtendWidth, startLeftWidth))
-                    self.rightExtendWidths.append(max(startRightExtendWidth, startRightWidth))
-                print("Start gate index:", self.startGateIndex)
-
-            # Check intersection with finishLine - Note if finishLine is unique but very close to startLine then finishGateIndex = startGateIndex + 1
-            if midlineSegment.intersects(finishLine) and self.finishGateIndex < 0:
-                # Check that finishGate isn't the previous gate or the current gate (should only happen if startCoords were automatically computed)
-                finishGate, finishGateMidpoint, finishGateDirection = getGateFromCoords(finishLineCoords[0], finishLineCoords[1], gateHalfWidth)
-                if shapely.equals_exact(finishGate, self.gates[-1]):
-                    # finishGate is the previous gate
-                    self.finishGateIndex = len(self.gates) - 1
-                elif shapely.equals_exact(finishGate, gate):
-                    # finishGate is the current gate, Check that finishLine isn't also startLine (very rare possibility if self.isClosed)
-                    if shapely.equals_exact(startLine, finishLine):
-                        # finishLine is also startLine, which means we've already got it in the gates lists from the startLine intersection check
-                        self.finishGateIndex = self.startGateIndex
-                    else:
-                        self.finishGateIndex = len(self.gates)
+                sectorSteps = np.array([gateStepProfile.getStep(seedLeftDist) for seedLeftDist in np.append(seedLeftDists, leftDistances[-1])])
+            sectorStopLeftDists = np.append(seedLeftDists[1:] + (2 * sectorSteps[1:-1]), leftDistances[-1] - sectorSteps[-1])
+            with profiling.timer('sectorMarching'), concurrent.futures.ProcessPoolExecutor(max_workers=min(nGateSectors, os.cpu_count())) as executor:
+                futures = [executor.submit(getSectorGates, left, right, leftDistances, rightDistances, self.isClosed, bounds, *sectorSeed, stopLeftDist, gateStep,
+                                           gateHalfWidth, reducedWindow, gateStepProfile) for sectorSeed, stopLeftDist in zip(sectorSeeds, sectorStopLeftDists)]
+                sectorGates = [future.result() for future in futures]
+
+            # Cut each sector at its gate matching the first gate of the next sector (only searching near it along the left limits, e.g. not the other
+            # side of a figure 8 crossing), so the gates continue at the gate step across the join
+            # If no gate matches within the tolerance (the seed prediction was off), the next sector is marched again from the end of this sector instead
+            for i in range(1, nGateSectors):
+                prevSectorGates, firstGate = sectorGates[i - 1], sectorGates[i][0]
+                seamDistances = scipy.linalg.norm(prevSectorGates[:, 0:2] - firstGate[0:2], axis=1)
+                seamLeftDists = prevSectorGates[:, 6] - firstGate[6]
+                if self.isClosed:
+                    seamLeftDists = utils.wrap(seamLeftDists, -leftDistances[-1] / 2, leftDistances[-1] / 2)
+                seamDistances[np.abs(seamLeftDists) > 2 * sectorSteps[i]] = np.inf
+                iSeam = int(np.argmin(seamDistances))
+                if seamDistances[iSeam] <= GATE_SECTOR_SEAM_TOLERANCE * gateStep:
+                    sectorGates[i - 1] = prevSectorGates[:iSeam]
                 else:
-                    # Create finish gate from coordinates then calculate all the gate information and append to the lists
-                    finishGate, finishGateMidpoint, finishGateDirection = getGateFromCoords(finishLineCoords[0], finishLineCoords[1], gateHalfWidth)
-                    finishLeftWidth, finishRightWidth = getLimitsWidths(finishGate, finishGateMidpoint, reducedLeft, reducedRight)
-                    finishLeftExtendWidth, prevLeftExtendIndex = getLimitsExtendWidthClosed(finishGate, finishGateMidpoint, leftExtend, nLeftExtend, prevLeftExtendIndex, gateHalfWidth)
-                    finishRightExtendWidth, prevRightExtendIndex = getLimitsExtendWidthClosed(finishGate, finishGateMidpoint, rightExtend, nRightExtend, prevRightExtendIndex, gateHalfWidth)
-                    # Iterate backwards and pop previous gates that intersect with the finishGate within the extend limits
-                    finishGateExtendLine = getGateExtendLine(finishGateMidpoint, finishGateDirection, finishLeftExtendWidth, finishRightExtendWidth)
-                    while len(self.gates) >= 1:
-                        if finishGateExtendLine.intersects(getGateExtendLine(self.gatesMidpoint[-1], self.gatesDirection[-1], self.leftExtendWidths[-1], self.rightExtendWidths[-1])):
-                            print("Gate at midpoint", self.gatesMidpoint[-1].tolist(), "and finishGate both have gateExtendLines that intersect - removing this gate from the lists")
-                            self.gates.pop()
-                            self.gatesMidpoint.pop()
-                            self.gatesDirection.pop()
-                            self.leftWidths.pop()
-                            self.rightWidths.pop()
-                            self.leftExtendWidths.pop()
-                            self.rightExtendWidths.pop()
-                        else:
-                            break
-                    self.finishGateIndex = len(self.gates)
-                    self.gates.append(finishGate)
-                    self.gatesMidpoint.append(finishGateMidpoint)
-                    self.gatesDirection.append(finishGateDirection)
-                    self.leftWidths.append(finishLeftWidth)
-                    self.rightWidths.append(finishRightWidth)
-                    self.leftExtendWidths.append(max(finishLeftExtendWidth, finishLeftWidth))
-                    self.rightExtendWidths.append(max(finishRightExtendWidth, finishRightWidth))
-                print("Finish gate index:", self.finishGateIndex)
-
-            # Check intersection with lastGate - must also be 4 or more gates in the list to break out of the gate creation loop
-            if midlineSegment.intersects(lastGate) and len(self.gates) >= 4:
-                # If self.isClosed then this gate will be the same as the first gate so it's unnecessary to add the last gate
-                # If track is not closed, re-make the last gate from coordinates and calculate all the gate information and append to lists
-                if not self.isClosed:
-                    lastGate, lastGateMidpoint, lastGateDirection = getGateFromCoords(left[-1][:2], right[-1][:2], gateHalfWidth)
-                    lastLeftWidth = scipy.linalg.norm(lastGateMidpoint - left[-1][0:2])
-                    lastRightWidth = scipy.linalg.norm(lastGateMidpoint - right[-1][0:2])
-                    lastLeftExtendWidth, prevLeftExtendIndex = getLimitsExtendWidthClosed(lastGate, lastGateMidpoint, leftExtend, nLeftExtend, prevLeftExtendIndex, gateHalfWidth)
-                    lastRightExtendWidth, prevRightExtendIndex = getLimitsExtendWidthClosed(lastGate, lastGateMidpoint, rightExtend, nRightExtend, prevRightExtendIndex, gateHalfWidth)
-                    # Iterate backwards and pop previous gates that intersect with the lastGate within the extend limits
-                    lastGateExtendLine = getGateExtendLine(lastGateMidpoint, lastGateDirection, lastLeftExtendWidth, lastRightExtendWidth)
-                    while len(self.gates) >= 1:
-                        if lastGateExtendLine.intersects(getGateExtendLine(self.gatesMidpoint[-1], self.gatesDirection[-1], self.leftExtendWidths[-1], self.rightExtendWidths[-1])):
-                            print("Gate at midpoint", self.gatesMidpoint[-1].tolist(), "and lastGate both have gateExtendLines that intersect - removing this gate from the lists")
-                            self.gates.pop()
-                            self.gatesMidpoint.pop()
-                            self.gatesDirection.pop()
-                            self.leftWidths.pop()
-                            self.rightWidths.pop()
-                            self.leftExtendWidths.pop()
-                            self.rightExtendWidths.pop()
-                        else:
-                            break
-                    self.gates.append(lastGate)
-                    self.gatesMidpoint.append(lastGateMidpoint)
-                    self.gatesDirection.append(lastGateDirection)
-                    self.leftWidths.append(lastLeftWidth)
-                    self.rightWidths.append(lastRightWidth)
-                    self.leftExtendWidths.append(max(lastLeftExtendWidth, lastLeftWidth))
-                    self.rightExtendWidths.append(max(lastRightExtendWidth, lastRightWidth))
-                # Exit the gate creation loop
-                print("Finished gate creation - Total number of gates:", len(self.gates))
-                break
+                    LOGGER.warning("Gates of sector %d didn't line up with the previous sector (closest gate %.3g m away) - marching the sector again from "
+                                   "the previous sector", i, seamDistances[iSeam])
+                    seamGate = prevSectorGates[-1]
+                    with profiling.timer('sectorMarching'):
+                        sectorGates[i] = getSectorGates(left, right, leftDistances, rightDistances, self.isClosed, bounds, seamGate[0:2], seamGate[2:4],
+                                                        seamGate[6], seamGate[7], sectorStopLeftDists[i], gateStep, gateHalfWidth, reducedWindow, gateStepProfile)
+            sectorGates = np.vstack(sectorGates)
+            lastSectorGate = sectorGates[-1]
+            marchedGates = itertools.chain(((row[0:2], row[2:4], row[4], row[5], row[6], row[7]) for row in sectorGates),
+                                           marchGates(left, right, leftDistances, rightDistances, self.isClosed, bounds, lastSectorGate[0:2], lastSectorGate[2:4],
+                                                      lastSectorGate[6], lastSectorGate[7], gateStep, gateHalfWidth, reducedWindow, gateStepProfile))
+        else:
+            marchedGates = marchGates(left, right, leftDistances, rightDistances, self.isClosed, bounds, gateMidpoint, gateDirection, 0, 0, gateStep,
+                                      gateHalfWidth, reducedWindow, gateStepProfile)
 
-            # Check if this gate intersects with the previous gate within the extend limits
-            if getGateExtendLine(gateMidpoint, gateDirection, leftExtendWidth, rightExtendWidth).intersects(getGateExtendLine(self.gatesMidpoint[-1], self.gatesDirection[-1], self.leftExtendWidths[-1], self.rightExtendWidths[-1])):
-                print("Gate at midpoint", gateMidpoint.tolist(), "and previous gate both have gateExtendLines that intersect - not appending this gate to the lists")
-            else:
-                # If this gate doesn't intersect then append the gate and its information
-                self.gates.append(gate)
-                self.gatesMidpoint.append(gateMidpoint)
-                self.gatesDirection.append(gateDirection)
-                self.leftWidths.append(leftWidth)
-                self.rightWidths.append(rightWidth)
-                self.leftExtendWidths.append(max(leftExtendWidth, leftWidth))
-                self.rightExtendWidths.append(max(rightExtendWidth, rightWidth))
-                prevLeftExtendIndex = prevLeftExtendIndexCandidate
-                prevRightExtendIndex = prevRightExtendIndexCandidate
+        # Add the marched gates to the gate table - stops once we've gone around the whole track
+        LOGGER.info("Creating track gates")
+        self.startGateIndex, self.finishGateIndex = appendMarchedGates(self.gateTable, marchedGates, (leftTree, rightTree, leftExtendTree, rightExtendTree),
+                                                                       lastGate, 4, None if self.isClosed else np.array([left[-1][:2], right[-1][:2]]),
+                                                                       startLineCoords, finishLineCoords, prevLeftExtendIndex, prevRightExtendIndex)
 
         # Raise an exception if startLine or finishLine wasn't crossed when creating the gates
         if self.startGateIndex < 0:
             raise Exception("Start line was not crossed during gate creation")
         if self.finishGateIndex < 0:
             raise Exception("Finish line was not crossed during gate creation")
+        LOGGER.info("Start gate index: %d, finish gate index: %d", self.startGateIndex, self.finishGateIndex)
+        LOGGER.info("Finished gate creation - Total number of gates: %d", len(self.gateTable))
+
+        # Free the spare capacity of the gate table
+        self.gateTable.trim()
 
-        self.gates = np.array(self.gates)
-        self.gatesMidpoint = np.array(self.gatesMidpoint)
-        self.gatesDirection = np.array(self.gatesDirection)
-        self.leftWidths = np.array(self.leftWidths)
-        self.rightWidths = np.array(self.rightWidths)
-        self.leftExtendWidths = np.array(self.leftExtendWidths)
-        self.rightExtendWidths = np.array(self.rightExtendWidths)
+        # Save the generated track to the cache, then evict old cache entries
+        if cachePath is not None:
+            with profiling.timer('cacheSave'):
+                self.__saveToCache(cachePath)
+                evictTrackCache(cacheDir)
 
         # Track initialised :)
-        print("Track initialised")
+        LOGGER.info("Track initialised")
+
+
+    @classmethod
+    def fromFolder(cls,
+                   trackPath: str | os.PathLike,
+                   tolerance: float | None = None,
+                   **kwargs) -> 'Track':
+        """
+        Creates the track from the track limits files in the track folder,
+        which are memory-mapped from their binary copies after the first load
+        (see loadTrackLimits()).
+
+        Args:
+            trackPath: Path to the folder containing the track limits files.
+            tolerance: Decimation tolerance of the track limits, or None to
+                keep all the coordinates.
+            **kwargs: Other arguments of Track, e.g. gateStep.
+
+        Returns:
+            Track object.
+        """
+        left, right, leftExtend, rightExtend = loadTrackLimits(trackPath, tolerance)
+        return cls(left, right, leftExtend, rightExtend, **kwargs)
+
+
+    def updateLimits(self,
+                     limitsEdits: list[tuple[str, int, int, list[list[float]] | NDArrayFloat2D]] | None = None,
+                     startLineCoords: list[list[float]] | NDArrayFloat2D | None = None,
+                     finishLineCoords: list[list[float]] | NDArrayFloat2D | None = None) -> None:
+        """
+        Updates the track after editing ranges of the limits coordinates (e.g.
+        a new kerb extent) or moving the start/finish line, only re-solving
+        the gates around the edits rather than generating the whole track.
+
+        The gates affected by each edit are found from the distances along the
+        limits of their intersections (the distance columns of the gate table).
+        The span from GATE_UPDATE_MARGIN_GATES gates before to
+        GATE_UPDATE_MARGIN_GATES gates after the affected gates is marched
+        again from the gate before it, stopping at the gate after it, where the
+        re-solved gates rejoin the existing gates. The other gates are kept,
+        with their distances along the limits shifted by the edits before them.
+        The start and finish gates are only re-inserted if they were within a
+        re-solved span or their lines moved.
+
+        The gates are always marched serially, and the updated track isn't
+        saved to the track cache.
+
+        Args:
+            limitsEdits: List of the edits to the limits, each a tuple of
+                (limitsName, iStart, iStop, coords) replacing the coordinates
+                of the limits from index iStart up to (not including) iStop
+                with coords, which can have a different number of coordinates.
+                limitsName is one of LIMITS_NAMES (the extend limits only if
+                they were provided). The indexes are of the limits before the
+                update, so edits to the same limits must not overlap.
+            startLineCoords: New coordinates of the start line, or None to
+                keep the start line.
+            finishLineCoords: New coordinates of the finish line, or None to
+                keep the finish line.
+        """
+        settings = dict(self.trackGenSettings)
+        oldSettings = self.trackGenSettings
+        gateHalfWidth = self.gateTable.gateHalfWidth
+        nGates = len(self.gateTable)
+
+        # Apply the edits to the limits - from the last edit backwards so the indexes of the earlier edits are unaffected
+        edits = {limitsName: [] for limitsName in LIMITS_NAMES}
+        for limitsName, iStart, iStop, coords in sorted(limitsEdits or [], key=lambda edit: edit[1], reverse=True):
+            if limitsName not in edits or settings[limitsName] is None:
+                raise Exception("Invalid limits name " + str(limitsName) + " - must be one of " + str(LIMITS_NAMES) + " (extend limits only if provided)")
+            limits = settings[limitsName]
+            if not 0 <= iStart <= iStop <= np.size(limits, 0) or (edits[limitsName] and iStop > edits[limitsName][-1][0]):
+                raise Exception("Invalid edit range " + str([iStart, iStop]) + " of the " + limitsName + " limits - must be within the limits and not overlap")
+            coords = np.asarray(coords, dtype=float).reshape(-1, np.size(limits, 1))
+            settings[limitsName] = np.concat((limits[:iStart], coords, limits[iStop:]))
+            edits[limitsName].append((iStart, iStop, np.size(coords, 0)))
+        if startLineCoords is not None:
+            settings['StartLineCoords'] = np.array(startLineCoords)
+        if finishLineCoords is not None:
+            settings['FinishLineCoords'] = np.array(finishLineCoords)
+
+        # Extend limits that weren't provided are the left/right limits, so share their edits
+        extendSources = {'Left': 'Left', 'Right': 'Right',
+                         'LeftExtend': 'LeftExtend' if settings['LeftExtend'] is not None else 'Left',
+                         'RightExtend': 'RightExtend' if settings['RightExtend'] is not None else 'Right'}
+        oldLimits = {limitsName: getClosedLimits(oldSettings[source], self.isClosed) for limitsName, source in extendSources.items()}
+        newLimits = {limitsName: getClosedLimits(settings[source], self.isClosed) for limitsName, source in extendSources.items()}
+        editsByLimits = {limitsName: edits[source] for limitsName, source in extendSources.items()}
+        left, right, leftExtend, rightExtend = (newLimits[limitsName] for limitsName in LIMITS_NAMES)
+        distColumns = {'Left': GateTable.LEFT_DIST, 'Right': GateTable.RIGHT_DIST, 'LeftExtend': GateTable.LEFT_EXTEND_DIST,
+                       'RightExtend': GateTable.RIGHT_EXTEND_DIST}
+
+        # The first gate is created from the first coordinates of the limits, so is re-created if they were edited
+        BFirstGateEdited = any(iStart == 0 for limitsName in LIMITS_NAMES for iStart, _, _ in editsByLimits[limitsName])
+
+        # Find the spans of gates to re-solve, as (seed, rejoin) gate indexes - rejoin is nGates if the span reaches the end of the track
+        def getSpan(iFirst: int, iLast: int) -> tuple[int, int]:
+            return max(iFirst - GATE_UPDATE_MARGIN_GATES, 0), min(iLast + GATE_UPDATE_MARGIN_GATES, nGates)
+
+        spans = []
+        for limitsName in LIMITS_NAMES:
+            if not editsByLimits[limitsName]:
+                continue
+            oldDistances = getLimitsDistances(oldLimits[limitsName])
+            gateDists = self.gateTable.data[distColumns[limitsName], :nGates]
+            BValid = ~np.isnan(gateDists)
+            for iStart, iStop, _ in editsByLimits[limitsName]:
+                # Distances along the limits of the edited segments - editing the first coordinate of a closed track also edits the closing segment
+                distRanges = [(oldDistances[max(iStart - 1, 0)], oldDistances[min(iStop, np.size(oldDistances) - 1)])]
+                if iStart == 0 and self.isClosed:
+                    distRanges.append((oldDistances[-2], oldDistances[-1]))
+                for distStart, distStop in distRanges:
+                    before = np.flatnonzero(BValid & (gateDists < distStart))
+                    after = np.flatnonzero(BValid & (gateDists > distStop))
+                    spans.append(getSpan(before[-1] if np.size(before) > 0 else 0, after[0] if np.size(after) > 0 else nGates))
+
+        # Find where the start/finish lines need to be inserted again, as (firstIndex, lastIndex) of the old gates - None if the gate is kept
+        oldLineCoords = getStartFinishLineCoords(oldSettings['StartLineCoords'], oldSettings['FinishLineCoords'], oldLimits['Left'], oldLimits['Right'],
+                                                 self.isClosed)
+        newLineCoords = getStartFinishLineCoords(settings['StartLineCoords'], settings['FinishLineCoords'], newLimits['Left'], newLimits['Right'],
+                                                 self.isClosed)
+        oldLineIndexes = (self.startGateIndex, self.finishGateIndex)
+        lineRanges = []
+        midlines = None
+        for oldCoords, newCoords, oldIndex in zip(oldLineCoords, newLineCoords, oldLineIndexes):
+            lineRange = None
+            if np.array_equal(oldCoords, newCoords):
+                pass
+            elif np.array_equal(newCoords, [left[0][:2], right[0][:2]]):
+                # Line moved to the first gate
+                lineRange = (0, 0)
+            elif not self.isClosed and np.array_equal(newCoords, [left[-1][:2], right[-1][:2]]):
+                # Line moved to the last gate
+                lineRange = (nGates, nGates)
+            else:
+                # Line moved - re-solve around the old gate (unless it's the first gate), and around where the new line crosses the gate midlines
+                if midlines is None:
+                    midpoints = np.vstack((self.gateTable.gatesMidpoint, self.gateTable.gatesMidpoint[:1])) if self.isClosed else self.gateTable.gatesMidpoint
+                    midlines = shapely.linestrings(np.stack((midpoints[:-1], midpoints[1:]), axis=1))
+                crossed = np.flatnonzero(shapely.intersects(midlines, shapely.LineString(newCoords)))
+                if np.size(crossed) == 0:
+                    raise Exception("New line " + str(np.asarray(newCoords).tolist()) + " isn't crossed by the track gates")
+                lineRange = (int(crossed[0]), min(int(crossed[0]) + 1, nGates))
+            if lineRange is not None:
+                if oldIndex > 0:
+                    spans.append(getSpan(oldIndex, oldIndex))
+                spans.append(getSpan(*lineRange))
+            lineRanges.append(lineRange)
+        if not spans:
+            self.trackGenSettings = settings
+            return
+
+        # Merge the overlapping spans
+        mergedSpans = []
+        for seedIndex, rejoinIndex in sorted(spans):
+            if mergedSpans and seedIndex <= mergedSpans[-1][1]:
+                mergedSpans[-1] = (mergedSpans[-1][0], max(mergedSpans[-1][1], rejoinIndex))
+            else:
+                mergedSpans.append((seedIndex, rejoinIndex))
+        LOGGER.info("Updating track gates - re-solving %d of %d gates in %d spans", sum(rejoin - seed for seed, rejoin in mergedSpans), nGates,
+                    len(mergedSpans))
+
+        # Preprocess the edited limits
+        with profiling.timer('limitsPreprocessing'):
+            leftTree = LimitsSegmentTree(left, self.isClosed)
+            rightTree = LimitsSegmentTree(right, self.isClosed)
+            leftExtendTree = LimitsSegmentTree(leftExtend, self.isClosed) if settings['LeftExtend'] is not None else leftTree
+            rightExtendTree = LimitsSegmentTree(rightExtend, self.isClosed) if settings['RightExtend'] is not None else rightTree
+            gateStepProfile = None
+            if settings['GateStepBounds'] is not None:
+                gateStepProfile = GateStepProfile(CoordinateArray(left, self.isClosed), CoordinateArray(right, self.isClosed), *settings['GateStepBounds'])
+        limitsTrees = (leftTree, rightTree, leftExtendTree, rightExtendTree)
+        xyCoords = np.vstack([limits[:, :2] for limits in newLimits.values()])
+        self.xMin, self.yMin = np.min(xyCoords, axis=0)
+        self.xMax, self.yMax = np.max(xyCoords, axis=0)
+        bounds = (self.xMin, self.xMax, self.yMin, self.yMax)
+
+        # Shift the distances along the limits of the existing gates by the edits before them
+        oldData = self.gateTable.data[:, :nGates].copy()
+        for limitsName in LIMITS_NAMES:
+            if editsByLimits[limitsName]:
+                oldData[distColumns[limitsName]] = getUpdatedDistances(oldData[distColumns[limitsName]], getLimitsDistances(oldLimits[limitsName]),
+                                                                       limitsTrees[LIMITS_NAMES.index(limitsName)].distances, editsByLimits[limitsName])
+
+        # Join the kept gates and the re-solved spans, recording the new index of each kept gate
+        blocks = []
+        newIndexes = np.full(nGates, -1)
+        newLineIndexes = [-1, -1]
+        nNewGates = 0
+        keptIndex = 0
+        for seedIndex, rejoinIndex in mergedSpans:
+            blocks.append(oldData[:, keptIndex:seedIndex])
+            newIndexes[keptIndex:seedIndex] = np.arange(nNewGates, nNewGates + seedIndex - keptIndex)
+            nNewGates += seedIndex - keptIndex
+
+            # Seed the span from its first gate
+            spanTable = GateTable(gateHalfWidth, rejoinIndex - seedIndex + 16)
+            if seedIndex == 0 and BFirstGateEdited:
+                firstGateData, prevLeftExtendIndex, prevRightExtendIndex = getFirstGate(left, right, leftExtendTree, rightExtendTree, gateHalfWidth)
+                spanTable.append(*firstGateData)
+            else:
+                spanTable.data[:, 0] = oldData[:, seedIndex]
+                spanTable.nGates = 1
+                newIndexes[seedIndex] = nNewGates
+                seedExtendDists = oldData[[GateTable.LEFT_EXTEND_DIST, GateTable.RIGHT_EXTEND_DIST], seedIndex]
+                prevLeftExtendIndex, prevRightExtendIndex = (-1 if np.isnan(dist) else getDistanceIndex(tree.distances, dist)
+                                                             for dist, tree in zip(seedExtendDists, (leftExtendTree, rightExtendTree)))
+
+            # Stop at the gate the span rejoins (within the track limits, like the last gate), or the end of the track
+            if rejoinIndex < nGates:
+                stopGate = getGateExtendLine(oldData[GateTable.MIDPOINT, rejoinIndex], oldData[GateTable.DIRECTION, rejoinIndex],
+                                             oldData[GateTable.LEFT_WIDTH, rejoinIndex], oldData[GateTable.RIGHT_WIDTH, rejoinIndex])
+            else:
+                stopGate = shapely.LineString([left[-1][:2], right[-1][:2]])
+            lastGateCoords = np.array([left[-1][:2], right[-1][:2]]) if rejoinIndex == nGates and not self.isClosed else None
+
+            # Only look for the start/finish lines in the span if they moved into it, or their gate was within it
+            spanLineCoords = [None, None]
+            for i, (lineRange, oldIndex) in enumerate(zip(lineRanges, oldLineIndexes)):
+                if lineRange is not None:
+                    BInSpan = seedIndex <= lineRange[0] and lineRange[1] <= rejoinIndex
+                else:
+                    BInSpan = seedIndex < oldIndex < rejoinIndex or (oldIndex == 0 and seedIndex == 0 and BFirstGateEdited)
+                if BInSpan:
+                    spanLineCoords[i] = newLineCoords[i]
+
+            # March the gates of the span, then rejoin the existing gates
+            marchedGates = marchGates(left, right, leftTree.distances, rightTree.distances, self.isClosed, bounds, spanTable.gatesMidpoint[0],
+                                      spanTable.gatesDirection[0], spanTable.leftDists[0], spanTable.rightDists[0], settings['GateStep'], gateHalfWidth,
+                                      settings['ReducedWindow'], gateStepProfile)
+            spanLineIndexes = appendMarchedGates(spanTable, marchedGates, limitsTrees, stopGate, 4 if seedIndex == 0 and rejoinIndex == nGates else 1,
+                                                 lastGateCoords, *spanLineCoords, prevLeftExtendIndex, prevRightExtendIndex)
+            if rejoinIndex < nGates:
+                # Remove the last re-solved gate if it's within half a gate step of the gate the span rejoins, so there isn't a very short gap
+                rejoinStep = settings['GateStep'] if gateStepProfile is None else gateStepProfile.getStep(spanTable.leftDists[-1])
+                if (spanTable.nGates > 1 and spanTable.nGates - 1 not in spanLineIndexes
+                        and scipy.linalg.norm(spanTable.gatesMidpoint[-1] - oldData[GateTable.MIDPOINT, rejoinIndex]) < rejoinStep / 2):
+                    spanTable.nGates -= 1
+                newIndexes[rejoinIndex] = nNewGates + spanTable.insertRemovingOverlaps("rejoinGate", oldData[GateTable.MIDPOINT, rejoinIndex],
+                                                                                       oldData[GateTable.DIRECTION, rejoinIndex],
+                                                                                       *oldData[GateTable.LEFT_WIDTH:, rejoinIndex])
+            for i, spanLineIndex in enumerate(spanLineIndexes):
+                if spanLineCoords[i] is not None:
+                    if spanLineIndex < 0:
+                        raise Exception(("Start" if i == 0 else "Finish") + " line was not crossed when updating the track gates")
+                    newLineIndexes[i] = nNewGates + spanLineIndex
+            blocks.append(spanTable.data[:, :spanTable.nGates])
+            nNewGates += spanTable.nGates
+            keptIndex = rejoinIndex + 1
+        blocks.append(oldData[:, keptIndex:])
+        newIndexes[keptIndex:] = np.arange(nNewGates, nNewGates + nGates - keptIndex)
+
+        # Kept start/finish gates are at the new index of their old gate
+        for i, oldIndex in enumerate(oldLineIndexes):
+            if newLineIndexes[i] < 0:
+                newLineIndexes[i] = newIndexes[oldIndex]
+                if newLineIndexes[i] < 0:
+                    raise Exception(("Start" if i == 0 else "Finish") + " gate was removed when updating the track gates")
+
+        self.gateTable = GateTable.fromData(gateHalfWidth, np.hstack(blocks))
+        self.startGateIndex, self.finishGateIndex = (int(i) for i in newLineIndexes)
+        self.trackGenSettings = settings
+
+        # Track z height data from the edited limits
+        zLimits = [(left, leftTree, GateTable.LEFT_DIST), (right, rightTree, GateTable.RIGHT_DIST)]
+        if settings['LeftExtend'] is not None:
+            zLimits.append((leftExtend, leftExtendTree, GateTable.LEFT_EXTEND_DIST))
+        if settings['RightExtend'] is not None:
+            zLimits.append((rightExtend, rightExtendTree, GateTable.RIGHT_EXTEND_DIST))
+        self.__initZInterpolators(*getZData(zLimits, self.isClosed))
+        LOGGER.info("Track updated - Total number of gates: %d", len(self.gateTable))
+
+
+    def __initFromCache(self,
+                        cachePath: str | os.PathLike) -> bool:
+        """
+        Internal function to initialise the Track object by loading the track
+        cache file at cachePath.
+
+        Args:
+            cachePath: Path to the track cache file.
+
+        Returns:
+            True if the Track object was initialised from the track cache file.
+
+            False if the track cache file does not exist or failed to load, in
+            which case the track needs to be generated.
+        """
+        cache = utils.loadCacheFile(cachePath, ['isClosed', 'bounds', 'gateHalfWidth', 'gatesMidpoint', 'gatesDirection', 'leftWidths', 'rightWidths',
+                                                'leftExtendWidths', 'rightExtendWidths', 'leftDists', 'rightDists', 'leftExtendDists', 'rightExtendDists',
+                                                'startGateIndex', 'finishGateIndex', 'zCoords', 'zValues', 'zDists', 'zLimitColumns', 'zLimitLengths'],
+                                    TRACK_CACHE_VERSION, 'track')
+        if cache is None:
+            return False
+
+        self.isClosed = bool(cache['isClosed'])
+        self.xMin, self.xMax, self.yMin, self.yMax = cache['bounds']
+        self.gateTable = GateTable.fromArrays(float(cache['gateHalfWidth']), cache['gatesMidpoint'], cache['gatesDirection'], cache['leftWidths'],
+                                              cache['rightWidths'], cache['leftExtendWidths'], cache['rightExtendWidths'], cache['leftDists'],
+                                              cache['rightDists'], cache['leftExtendDists'], cache['rightExtendDists'])
+        self.startGateIndex = int(cache['startGateIndex'])
+        self.finishGateIndex = int(cache['finishGateIndex'])
+        self.__initZInterpolators(cache['zCoords'], cache['zValues'], cache['zDists'], cache['zLimitColumns'], cache['zLimitLengths'])
+        return True
+
+
+    def __saveToCache(self,
+                      cachePath: str | os.PathLike) -> None:
+        """
+        Internal function to save the generated track to the track cache file
+        at cachePath. The gates are saved as arrays rather than Shapely objects
+        and are recreated from their midpoints and directions when loading.
+
+        Args:
+            cachePath: Path to the track cache file.
+        """
+        utils.saveCacheFile(cachePath, TRACK_CACHE_VERSION,
+                            isClosed=self.isClosed,
+                            bounds=np.array([self.xMin, self.xMax, self.yMin, self.yMax]),
+                            gatesMidpoint=self.gateTable.gatesMidpoint,
+                            gatesDirection=self.gateTable.gatesDirection,
+                            leftWidths=self.gateTable.leftWidths,
+                            rightWidths=self.gateTable.rightWidths,
+                            leftExtendWidths=self.gateTable.leftExtendWidths,
+                            rightExtendWidths=self.gateTable.rightExtendWidths,
+                            leftDists=self.gateTable.leftDists,
+                            rightDists=self.gateTable.rightDists,
+                            leftExtendDists=self.gateTable.leftExtendDists,
+                            rightExtendDists=self.gateTable.rightExtendDists,
+                            startGateIndex=self.startGateIndex,
+                            finishGateIndex=self.finishGateIndex,
+                            gateHalfWidth=self.gateTable.gateHalfWidth,
+                            zCoords=self.zCoords,
+                            zValues=self.zValues,
+                            zDists=self.zDists,
+                            zLimitColumns=self.zLimitColumns,
+                            zLimitLengths=self.zLimitLengths)
+
+
+    def __initZInterpolators(self,
+                             zCoords: NDArrayFloat2D,
+                             zValues: NDArrayFloat1D,
+                             zDists: NDArrayFloat1D,
+                             zLimitColumns: NDArrayInt1D,
+                             zLimitLengths: NDArrayFloat1D) -> None:
+        """
+        Internal function to store the track z height data points and reset
+        the interpolators and the z height raster. The global and local interpolators are created on first use.
+
+        Args:
+            zCoords: 2D array of the [x, y] coordinates of the data points.
+            zValues: 1D array of the z values of the data points.
+            zDists: 1D array of the cumulative distance of each data point
+                along the limits it's from.
+            zLimitColumns: 1D array of the GateTable column of the distances
+                along the limits each data point is from (e.g. LEFT_DIST).
+            zLimitLengths: 1D array of the total length of the limits each
+                data point is from.
+        """
+        self.zCoords = zCoords
+        self.zValues = zValues
+        self.zDists = zDists
+        self.zLimitColumns = zLimitColumns
+        self.zLimitLengths = zLimitLengths
+        self.zLinInterp = None
+        self.zNNInterp = None
+        self.zWindowInterps = {}
+        self.zRaster = None
+        self.zRasterOrigin = None
+        self.zRasterGridSpacing = None
+
+
+    def __getZWindowInterps(self,
+                            windowIndex: int) -> tuple[scipy.interpolate.LinearNDInterpolator, scipy.interpolate.NearestNDInterpolator] | None:
+        """
+        Internal function to get the local z interpolators for a window of
+        gates, creating them on first use.
+
+        The window covers the gates from windowIndex * Z_WINDOW_GATE_COUNT up
+        to and including the first gate of the next window. Its data points
+        are selected by their distance along their own limits, rather than by
+        position, so that track segments which cross over each other (e.g. a
+        figure-8 bridge) or pass over each other (e.g. an upwards spiral) are
+        never mixed into the same interpolator.
+
+        Args:
+            windowIndex: Index of the window of gates.
+
+        Returns:
+            Tuple of (zLinInterp, zNNInterp) for the window, or None if the
+            window doesn't have enough data points (the global interpolators
+            are used instead).
+        """
+        if windowIndex in self.zWindowInterps:
+            return self.zWindowInterps[windowIndex]
+
+        # Gate indexes at the start and end of the window - the end wraps around to the first gate if the track is closed
+        nGates = len(self.gateTable)
+        startGateIndex = windowIndex * Z_WINDOW_GATE_COUNT
+        endGateIndex = (windowIndex + 1) * Z_WINDOW_GATE_COUNT
+        if endGateIndex >= nGates:
+            endGateIndex = 0 if self.isClosed else nGates - 1
+
+        # Select the data points within the distances along their limits of the start and end gates, plus a margin either side
+        windowStart = self.gateTable.data[self.zLimitColumns, startGateIndex] - Z_WINDOW_MARGIN
+        windowLength = self.gateTable.data[self.zLimitColumns, endGateIndex] + Z_WINDOW_MARGIN - windowStart
+        offsets = self.zDists - windowStart
+        if self.isClosed:
+            offsets = np.mod(offsets, self.zLimitLengths)
+            windowLength = np.mod(windowLength - 2 * Z_WINDOW_MARGIN, self.zLimitLengths) + 2 * Z_WINDOW_MARGIN
+        selected = (offsets >= 0) & (offsets <= windowLength)
+
+        # Create the interpolators - if there aren't enough (non-collinear) points then fall back to the global interpolators
+        windowInterps = None
+        if np.count_nonzero(selected) >= 3:
+            try:
+                with profiling.timer('zInterpolatorBuild'):
+                    windowInterps = (scipy.interpolate.LinearNDInterpolator(self.zCoords[selected], self.zValues[selected]),
+                                     scipy.interpolate.NearestNDInterpolator(self.zCoords[selected], self.zValues[selected]))
+            except scipy.spatial.QhullError:
+                LOGGER.warning("Failed to create the local z interpolators for gate window %d - using the global z interpolators", windowIndex)
+        self.zWindowInterps[windowIndex] = windowInterps
+        return windowInterps
+
+
+    @property
+    def gates(self) -> NDArrayObject1D:
+        return self.gateTable.gates
+
+    @property
+    def gatesMidpoint(self) -> NDArrayFloat2D:
+        return self.gateTable.gatesMidpoint
+
+    @property
+    def gatesDirection(self) -> NDArrayFloat2D:
+        return self.gateTable.gatesDirection
+
+    @property
+    def leftWidths(self) -> NDArrayFloat1D:
+        return self.gateTable.leftWidths
+
+    @property
+    def rightWidths(self) -> NDArrayFloat1D:
+        return self.gateTable.rightWidths
+
+    @property
+    def leftExtendWidths(self) -> NDArrayFloat1D:
+        return self.gateTable.leftExtendWidths
+
+    @property
+    def rightExtendWidths(self) -> NDArrayFloat1D:
+        return self.gateTable.rightExtendWidths
 
 
     def getZ(self,
-             x: float,
-             y: float) -> float:
+             x: float | NDArrayFloat1D,
+             y: float | NDArrayFloat1D,
+             gateIndex: int | NDArrayInt1D | None = None) -> float | NDArrayFloat1D:
         """
         Calculates the z coordinate (height) of the track at the input x and y coordinates.
 
-        Currently this is a very simple implementation using the linear interpolation maps.
-        TODO: Robust approach for compatibility with figure-8 tracks like Suzuka. Possible handling for complex tracks is using multiple interpolators
-            for each track segment in the local region around each gate (will need logic to define a sufficiently large local region to accommodate
-            arbitrarily long wheelbases but not include "overlapping" track segments if the track is an upwards spiral). Adding an additional argument
-            to determine the most recently passed gate (i.e. which interpolator to use).
+        Wrapper around getZArray() for separate x and y inputs, which can be scalars or 1D arrays.
+
+        Args:
+            x: x coordinate of the point(s).
+            y: y coordinate of the point(s).
+            gateIndex: Index of the most recently passed gate for the point(s),
+                see getZArray(). None to use the global interpolators.
+
+        Returns:
+            z coordinate of the track for the point(s) (x, y). Float if x and y
+            are scalars, otherwise 1D array.
+        """
+        z = self.getZArray(np.column_stack((np.ravel(x), np.ravel(y))), gateIndex)
+        return float(z[0]) if np.ndim(x) == 0 else z
+
+
+    def getZArray(self,
+                  xyCoords: NDArrayFloat2D,
+                  gateIndexes: int | NDArrayInt1D | None = None) -> NDArrayFloat1D:
+        """
+        Calculates the z coordinates (heights) of the track at an array of
+        [x, y] coordinates.
+
+        If the most recently passed gate is provided for the points, the local
+        z interpolators of the window of gates containing that gate are used
+        (see __getZWindowInterps()), which gives the correct height where the
+        track crosses over itself. Selecting the window is constant time and
+        each window's interpolators are only created the first time they're
+        needed.
+
+        Otherwise, if the z height raster has been built (see buildZRaster()) it is used
+        for constant time bilinear lookups. Otherwise linear interpolation is
+        done for all the points at once, and nearest neighbour interpolation
+        only for the points outside the convex hull of the data points.
 
         Args:
-            x: x coordinate of the point.
-            y: y coordinate of the point.
+            xyCoords: 2D array of shape (N, 2) of the [x, y] coordinates of the
+                points.
+            gateIndexes: Index of the most recently passed gate for all the
+                points, or 1D array of the index for each point. None to use
+                the global interpolators or the z height raster.
 
         Returns:
-            z coordinate of the track for the point (x, y).
+            1D array of the z coordinates of the track for the points.
         """
-        # Try linear interpolation first
-        z = self.zLinInterp(x, y)
+        xyCoords = np.asarray(xyCoords, dtype=float).reshape(-1, 2)
+        if gateIndexes is not None:
+            return self.__getZFromWindows(xyCoords, gateIndexes)
+        if self.zRaster is not None:
+            return self.__getZFromRaster(xyCoords)
+        return self.__getZFromInterpolators(xyCoords)
 
-        # Check if linear interpolation was successful - if failed then do nearest neighbour interpolation
-        if np.isnan(z):
-            z = self.zNNInterp(x, y)
 
+    def __getZFromWindows(self,
+                          xyCoords: NDArrayFloat2D,
+                          gateIndexes: int | NDArrayInt1D) -> NDArrayFloat1D:
+        """
+        Internal function to calculate the z coordinates of the track at an
+        array of points using the local z interpolators of the gate windows,
+        with one interpolator call for all the points in each window.
+
+        Args:
+            xyCoords: 2D array of shape (N, 2) of the [x, y] coordinates.
+            gateIndexes: Index of the most recently passed gate for all the
+                points, or 1D array of the index for each point.
+
+        Returns:
+            1D array of the z coordinates of the track for the points.
+        """
+        nWindows = int(np.ceil(len(self.gateTable) / Z_WINDOW_GATE_COUNT))
+        windowIndexes = np.clip(np.broadcast_to(gateIndexes, np.size(xyCoords, 0)) // Z_WINDOW_GATE_COUNT, 0, nWindows - 1)
+        z = np.empty(np.size(xyCoords, 0))
+        for windowIndex in np.unique(windowIndexes):
+            inWindow = windowIndexes == windowIndex
+            windowInterps = self.__getZWindowInterps(int(windowIndex))
+            if windowInterps is None:
+                z[inWindow] = self.__getZFromInterpolators(xyCoords[inWindow])
+                continue
+            zWindow = windowInterps[0](xyCoords[inWindow])
+            outside = np.isnan(zWindow)
+            if np.any(outside):
+                zWindow[outside] = windowInterps[1](xyCoords[inWindow][outside])
+            z[inWindow] = zWindow
+        return z
+
+
+    def __getZFromInterpolators(self,
+                                xyCoords: NDArrayFloat2D) -> NDArrayFloat1D:
+        """
+        Internal function to calculate the z coordinates of the track at an
+        array of points using the linear interpolator, with nearest neighbour
+        interpolation for the points where linear interpolation fails.
+
+        Args:
+            xyCoords: 2D array of shape (N, 2) of the [x, y] coordinates.
+
+        Returns:
+            1D array of the z coordinates of the track for the points.
+        """
+        # Create the global interpolators on first use
+        if self.zLinInterp is None:
+            with profiling.timer('zInterpolatorBuild'):
+                self.zLinInterp = scipy.interpolate.LinearNDInterpolator(self.zCoords, self.zValues)
+                self.zNNInterp = scipy.interpolate.NearestNDInterpolator(self.zCoords, self.zValues)
+
+        # Linear interpolation for all points, then nearest neighbour interpolation for the points outside the convex hull
+        z = self.zLinInterp(xyCoords)
+        outside = np.isnan(z)
+        if np.any(outside):
+            z[outside] = self.zNNInterp(xyCoords[outside])
         return z
+
+
+    def buildZRaster(self,
+                     gridSpacing: float = Z_RASTER_GRID_SPACING) -> None:
+        """
+        Builds a regular grid raster of the track z height over the bounds of
+        the track, after which getZArray() uses constant time bilinear lookups
+        on the raster instead of the interpolators. Accuracy is limited by the
+        grid spacing and points outside the bounds are clamped to the edge.
+
+        Args:
+            gridSpacing: Distance between the grid points in metres.
+        """
+        xGrid = np.arange(self.xMin, self.xMax + gridSpacing, gridSpacing)
+        yGrid = np.arange(self.yMin, self.yMax + gridSpacing, gridSpacing)
+        xMesh, yMesh = np.meshgrid(xGrid, yGrid, indexing='ij')
+        zGrid = self.__getZFromInterpolators(np.column_stack((xMesh.ravel(), yMesh.ravel())))
+        self.zRaster = zGrid.reshape(np.shape(xMesh))
+        self.zRasterOrigin = np.array([xGrid[0], yGrid[0]])
+        self.zRasterGridSpacing = gridSpacing
+
+
+    def __getZFromRaster(self,
+                         xyCoords: NDArrayFloat2D) -> NDArrayFloat1D:
+        """
+        Internal function to calculate the z coordinates of the track at an
+        array of points by bilinear interpolation of the z height raster.
+
+        Args:
+            xyCoords: 2D array of shape (N, 2) of the [x, y] coordinates.
+
+        Returns:
+            1D array of the z coordinates of the track for the points.
+        """
+        gridShape = np.array(np.shape(self.zRaster))
+        gridCoords = np.clip((xyCoords - self.zRasterOrigin) / self.zRasterGridSpacing, 0, gridShape - 1)
+        gridIndexes = np.minimum(gridCoords.astype(int), np.maximum(gridShape - 2, 0))
+        tx, ty = np.transpose(gridCoords - gridIndexes)
+        ix, iy = np.transpose(gridIndexes)
+        ix1 = np.minimum(ix + 1, gridShape[0] - 1)
+        iy1 = np.minimum(iy + 1, gridShape[1] - 1)
+        return ((1 - tx) * (1 - ty) * self.zRaster[ix, iy] + tx * (1 - ty) * self.zRaster[ix1, iy]
+                + (1 - tx) * ty * self.zRaster[ix, iy1] + tx * ty * self.zRaster[ix1, iy1])
@@ -14,9 +14,963 @@ import numpy as np
 import matplotlib.pyplot as plt
 
 # Import project python files
+from Utils import profiling
 from Utils.typeAliases import *
 from track import Track
 
+# Logger for the trajectory module
+LOGGER = profiling.getLogger(__name__)
+
+# Trajectory constants
+TRAJ_TYPES = ['Closed Circuit', 'Point to Point', 'Point to Point with Run Up', 'Single Lap']  # Valid trajectory types
+P_SAMPLES_PER_CP = 20                   # Number of spline samples per control point interval used to integrate the distance along the trajectory
+CAMBER_SAMPLE_OFFSET = 1                # Lateral distance in metres either side of the trajectory at which the track z height is sampled for the camber
+DIRECTION_SIMILARITY_THRESHOLD = 0      # Threshold for the dot product of the trajectory and gate directions (each with magnitude of 1)
+                                        # for the trajectory to be travelling forwards through a gate
+TRACK_LIMITS_SEARCH_WINDOW = 200        # Distance in metres either side of the expected crossing of each gate searched for the trajectory crossing it
+SPLINE_BASIS_CACHE_SIZE = 16            # Number of spline bases (knots, coefficient and basis matrices) kept in the LRU cache of getSplineBasis()
+TRAJECTORY_BATCH_CHUNK_SAMPLES = 250000 # Maximum total number of dense spline samples of the candidates evaluated at once by TrajectoryBatch,
+                                        # which bounds its memory use
+
+# Objective constants
+LAP_TIME_PROXY_LAT_ACCEL = 15           # Lateral acceleration limit in m/s^2 of the apex speed lap time proxy
+LAP_TIME_PROXY_MAX_SPEED = 90           # Maximum speed in m/s of the apex speed lap time proxy
+LAP_TIME_PROXY_CURVATURE_SMOOTHING = 1e-4  # Curvature in 1/m below which |curvature| is smoothed so the lap time proxy is differentiable
+LIMITS_PENALTY_WEIGHT = 1               # Weight of the area in m^2 outside the track limits in trajectoryObjective()
+LIMITS_EXTEND_PENALTY_WEIGHT = 100      # Weight of the area in m^2 outside the extend limits in trajectoryObjective()
+
+# Global LRU cache of the spline bases - (nCP, degree, trajType, nSamples) -> (knots, cardinalCoefficients, basisMatrices), ordered from least
+# to most recently used
+SPLINE_BASIS_CACHE = {}
+
+
+def getSplineDerivatives(spline: scipy.interpolate.BSpline,
+                         p: NDArrayFloat1D,
+                         nu: int = 2) -> NDArrayFloat2D:
+    """
+    Evaluates the spline and its derivatives with respect to the control point
+    value up to order nu, for all the control point values at once.
+
+    Args:
+        spline: SciPy BSpline of the trajectory.
+        p: 1D array of the control point values to evaluate the spline at.
+        nu: Highest order of derivative to evaluate.
+
+    Returns:
+        3D array of shape (nu + 1, len(p), 2) where index i is the i-th
+        derivative of the [x, y] coordinates at each control point value.
+    """
+    return np.stack([spline(p, i) for i in range(nu + 1)])
+
+
+def getBatchSplineDerivatives(knots: NDArrayFloat1D,
+                              degree: int,
+                              coefficients: np.ndarray,
+                              p: NDArrayFloat1D,
+                              candidateIndexes: NDArrayInt1D,
+                              nu: int = 2) -> np.ndarray:
+    """
+    Evaluates the splines of a batch of candidates with the same knots and
+    their derivatives up to order nu, where each control point value is of a
+    different candidate, with one sparse basis matrix for all the points.
+
+    Args:
+        knots: 1D array of the knots of the splines.
+        degree: Degree of the splines.
+        coefficients: 3D array of shape (nCandidates, nCoefficients, 2) of the
+            spline coefficients of each candidate.
+        p: 1D array of the control point values to evaluate the splines at,
+            within the base interval of the knots.
+        candidateIndexes: 1D array of the index of the candidate of each
+            control point value.
+        nu: Highest order of derivative to evaluate.
+
+    Returns:
+        3D array of shape (nu + 1, len(p), 2) where index i is the i-th
+        derivative of the [x, y] coordinates at each control point value.
+    """
+    derivatives = np.empty((nu + 1, np.size(p), 2))
+    for i, basisMatrix in enumerate(getBasisMatrices(knots, degree, p, nu)):
+        # Each non-zero of the basis matrix multiplies the coefficient of the candidate of its row
+        basisMatrix = basisMatrix.tocoo()
+        weightedCoefficients = basisMatrix.data[:, np.newaxis] * coefficients[candidateIndexes[basisMatrix.row], basisMatrix.col]
+        for j in range(2):
+            derivatives[i, :, j] = np.bincount(basisMatrix.row, weights=weightedCoefficients[:, j], minlength=np.size(p))
+    return derivatives
+
+
+def getDerivativeMatrix(knots: NDArrayFloat1D,
+                        degree: int) -> scipy.sparse.csr_array:
+    """
+    Creates the sparse matrix which maps the coefficients of a BSpline to the
+    coefficients of its derivative, which has the knots knots[1:-1] and is of
+    degree - 1.
+
+    Args:
+        knots: 1D array of the knots of the BSpline.
+        degree: Degree of the BSpline.
+
+    Returns:
+        Sparse matrix of shape (nCoefficients - 1, nCoefficients).
+    """
+    nCoefficients = np.size(knots) - degree - 1
+    knotSpans = knots[degree + 1:degree + nCoefficients] - knots[1:nCoefficients]
+    scales = np.divide(degree, knotSpans, out=np.zeros(nCoefficients - 1), where=knotSpans > 0)
+    return scipy.sparse.diags_array([-scales, scales], offsets=[0, 1], shape=(nCoefficients - 1, nCoefficients), format='csr')
+
+
+def getBasisMatrices(knots: NDArrayFloat1D,
+                     degree: int,
+                     p: NDArrayFloat1D,
+                     nu: int = 2) -> list[scipy.sparse.csr_array]:
+    """
+    Creates the sparse (banded) matrices which evaluate a BSpline and its
+    derivatives at the control point values p from its coefficients, i.e.
+    spline(p, i) = basisMatrices[i] @ spline.c.
+
+    Args:
+        knots: 1D array of the knots of the BSpline.
+        degree: Degree of the BSpline.
+        p: 1D array of the control point values, within the base interval of
+            the knots.
+        nu: Highest order of derivative.
+
+    Returns:
+        List of nu + 1 sparse matrices of shape (len(p), nCoefficients).
+    """
+    nCoefficients = np.size(knots) - degree - 1
+    basisMatrices = [scipy.sparse.csr_array(scipy.interpolate.BSpline.design_matrix(p, knots, degree))]
+    derivativeMatrix = scipy.sparse.eye_array(nCoefficients, format='csr')
+    for i in range(1, nu + 1):
+        if degree - i < 0:
+            basisMatrices.append(scipy.sparse.csr_array((np.size(p), nCoefficients)))
+            continue
+        derivativeMatrix = getDerivativeMatrix(knots[i - 1:np.size(knots) - i + 1], degree - i + 1) @ derivativeMatrix
+        basisMatrix = scipy.interpolate.BSpline.design_matrix(p, knots[i:np.size(knots) - i], degree - i)
+        basisMatrices.append(scipy.sparse.csr_array(basisMatrix @ derivativeMatrix))
+    return basisMatrices
+
+
+def getCardinalCoefficients(nCP: int,
+                            degree: int,
+                            bcType: str | None) -> tuple[NDArrayFloat1D, NDArrayFloat2D]:
+    """
+    Finds the linear map from the control points to the coefficients of the
+    trajectory spline, by interpolating the identity matrix. The knots of the
+    spline only depend on the number of control points, the degree and the
+    boundary conditions, so spline.c = cardinalCoefficients @ CP for all
+    control points.
+
+    Args:
+        nCP: Number of control points of the spline, including the repeated
+            first control point of a periodic spline.
+        degree: Degree of the spline.
+        bcType: Boundary conditions of the spline ('periodic' or None).
+
+    Returns:
+        Tuple of (knots, cardinalCoefficients) where cardinalCoefficients is a
+        2D array of shape (nCoefficients, nUniqueCP), where nUniqueCP excludes
+        the repeated first control point of a periodic spline.
+    """
+    nUniqueCP = nCP - 1 if bcType == 'periodic' else nCP
+    identity = np.eye(nUniqueCP)
+    if bcType == 'periodic':
+        identity = np.vstack((identity, identity[0]))
+    cardinalSpline = scipy.interpolate.make_interp_spline(np.arange(nCP), identity, k=degree, bc_type=bcType)
+    return cardinalSpline.t, cardinalSpline.c
+
+
+def getSplineBasis(nCP: int,
+                   degree: int,
+                   trajType: str,
+                   nSamples: int) -> tuple[NDArrayFloat1D, NDArrayFloat2D, list[scipy.sparse.csr_array]]:
+    """
+    Gets the knots, the map from the control points to the coefficients and
+    the sparse basis matrices of the dense samples of a trajectory spline,
+    which only depend on the number of control points, the degree, the
+    trajectory type and the number of samples. During optimisation only the
+    control points change, so they're cached (least recently used entries are
+    evicted beyond SPLINE_BASIS_CACHE_SIZE) and building the spline of a new
+    set of control points is a couple of matrix multiplications.
+
+    The returned arrays are shared between all the trajectories using them so
+    must not be modified.
+
+    Args:
+        nCP: Number of control points of the spline, including the repeated
+            first control point of a 'Closed Circuit' spline.
+        degree: Degree of the spline.
+        trajType: Trajectory type.
+        nSamples: Number of samples evenly spaced from control point value 0
+            to nCP - 1.
+
+    Returns:
+        Tuple of (knots, cardinalCoefficients, basisMatrices) as returned by
+        getCardinalCoefficients() and getBasisMatrices() for the samples, up
+        to the second derivative.
+    """
+    cacheKey = (nCP, degree, trajType, nSamples)
+    if cacheKey in SPLINE_BASIS_CACHE:
+        basis = SPLINE_BASIS_CACHE.pop(cacheKey)
+        profiling.count('splineBasisCacheHits')
+    else:
+        with profiling.timer('splineBasisBuild'):
+            knots, cardinalCoefficients = getCardinalCoefficients(nCP, degree, 'periodic' if trajType == 'Closed Circuit' else None)
+            knots.flags.writeable = False
+            cardinalCoefficients.flags.writeable = False
+            basis = (knots, cardinalCoefficients, getBasisMatrices(knots, degree, np.linspace(0, nCP - 1, nSamples), 2))
+
+    # Re-insert so the dictionary order is least to most recently used, then evict the least recently used entries
+    SPLINE_BASIS_CACHE[cacheKey] = basis
+    while len(SPLINE_BASIS_CACHE) > SPLINE_BASIS_CACHE_SIZE:
+        SPLINE_BASIS_CACHE.pop(next(iter(SPLINE_BASIS_CACHE)))
+    return basis
+
+
+def getSignedCurvature(dxy: NDArrayFloat2D,
+                       ddxy: NDArrayFloat2D) -> NDArrayFloat1D:
+    """
+    Calculates the signed curvature of a 2D parametric curve analytically from
+    its first and second derivatives.
+
+    Args:
+        dxy: 2D array where each index is the first derivative [x', y'].
+        ddxy: 2D array where each index is the second derivative [x'', y''].
+
+    Returns:
+        1D array of the curvature at each point, positive for a left hand
+        corner and negative for a right hand corner.
+    """
+    speedSquared = np.sum(dxy ** 2, axis=1)
+    return (dxy[:, 0] * ddxy[:, 1] - dxy[:, 1] * ddxy[:, 0]) / speedSquared ** 1.5
+
+
+def getLineCrossings(pSamples: NDArrayFloat1D,
+                     xySamples: NDArrayFloat2D,
+                     lineMidpoint: NDArrayFloat1D,
+                     lineDirection: NDArrayFloat1D,
+                     leftWidth: float,
+                     rightWidth: float) -> NDArrayFloat1D:
+    """
+    Finds the control point values where the sampled trajectory crosses a gate
+    line in the forwards direction, with one vectorised pass over the segments
+    between the samples.
+
+    Args:
+        pSamples: 1D array of the control point values of the samples.
+        xySamples: 2D array of the [x, y] coordinates of the samples.
+        lineMidpoint: Coordinates of the midpoint of the line, in the form
+            [x, y].
+        lineDirection: Direction vector of the line in the direction of forward
+            travel, normalised to a magnitude of 1.
+        leftWidth: Length of the line on the left of the midpoint.
+        rightWidth: Length of the line on the right of the midpoint.
+
+    Returns:
+        1D array of the control point values of the crossings in ascending
+        order, linearly interpolated between the samples. Empty if the
+        trajectory doesn't cross the line.
+    """
+    # Signed distance of each sample ahead of the line, and the samples where it changes from behind to ahead of the line
+    offsets = xySamples - lineMidpoint
+    ahead = offsets @ lineDirection
+    iCrossings = np.flatnonzero((ahead[:-1] < 0) & (ahead[1:] >= 0))
+    t = -ahead[iCrossings] / (ahead[iCrossings + 1] - ahead[iCrossings])
+
+    # Only keep the crossings within the width of the line (lateral offset is positive on the left)
+    crossingOffsets = offsets[iCrossings] + t[:, np.newaxis] * (offsets[iCrossings + 1] - offsets[iCrossings])
+    lateral = lineDirection[0] * crossingOffsets[:, 1] - lineDirection[1] * crossingOffsets[:, 0]
+    BWithinLine = (lateral <= leftWidth) & (lateral >= -rightWidth)
+    return (pSamples[iCrossings] + t * (pSamples[iCrossings + 1] - pSamples[iCrossings]))[BWithinLine]
+
+
+def searchGateCrossings(xySamples: NDArrayFloat2D,
+                        iGuess: NDArrayInt1D,
+                        nWindow: int,
+                        gatesMidpoint: NDArrayFloat2D,
+                        gatesDirection: NDArrayFloat2D,
+                        isClosed: bool) -> tuple[NDArrayInt1D, NDArrayFloat1D, NDArrayFloat1D]:
+    """
+    Searches the segments of the sampled trajectory within nWindow segments of
+    the guessed segment of each gate for where the trajectory crosses the
+    gate, for all the gates in one vectorised pass.
+
+    Of the segments crossing the gate line forwards, the crossing closest to
+    the gate midpoint is used. If no segment crosses the gate line, the sample
+    closest to the gate line is used instead so the lateral offset is still
+    defined.
+
+    Args:
+        xySamples: 2D array of the [x, y] coordinates of the samples.
+        iGuess: 1D array of the index of the segment each gate is expected to
+            be crossed in.
+        nWindow: Number of segments either side of the guess to search.
+        gatesMidpoint: 2D array of the [x, y] midpoint of each gate.
+        gatesDirection: 2D array of the direction vector of each gate in the
+            direction of forward travel, normalised to a magnitude of 1.
+        isClosed: Whether the samples form a closed loop (the last sample is
+            the first sample again), so the search wraps around.
+
+    Returns:
+        Tuple of (iSegments, t, lateral) 1D arrays with a value for each
+        gate.
+        iSegments is the index of the segment of the crossing.
+        t is the fraction along the segment of the crossing.
+        lateral is the lateral offset of the crossing from the gate midpoint
+        (positive on the left).
+    """
+    # Segments to search for each gate
+    nSegments = np.size(xySamples, 0) - 1
+    iSegments = iGuess[:, np.newaxis] + np.arange(-nWindow, nWindow + 1)
+    if isClosed:
+        iSegments %= nSegments
+        BValid = np.ones(np.shape(iSegments), dtype=bool)
+    else:
+        BValid = (iSegments >= 0) & (iSegments < nSegments)
+        iSegments = np.clip(iSegments, 0, nSegments - 1)
+
+    # Signed distance of the start and end of each segment ahead of the gate line, and the segments crossing it forwards
+    startOffsets = xySamples[iSegments] - gatesMidpoint[:, np.newaxis]
+    endOffsets = xySamples[iSegments + 1] - gatesMidpoint[:, np.newaxis]
+    startAhead = np.einsum('ijk,ik->ij', startOffsets, gatesDirection)
+    endAhead = np.einsum('ijk,ik->ij', endOffsets, gatesDirection)
+    BCrossing = BValid & (startAhead < 0) & (endAhead >= 0)
+    t = np.where(BCrossing, startAhead / np.where(BCrossing, startAhead - endAhead, 1), 0)
+
+    # Lateral offset of each crossing, then choose the crossing closest to the gate midpoint (or the sample closest to the gate line if missed)
+    crossingOffsets = startOffsets + t[..., np.newaxis] * (endOffsets - startOffsets)
+    lateral = gatesDirection[:, np.newaxis, 0] * crossingOffsets[..., 1] - gatesDirection[:, np.newaxis, 1] * crossingOffsets[..., 0]
+    iBest = np.argmin(np.where(BCrossing, np.abs(lateral), np.inf), axis=1)
+    BMissed = ~np.any(BCrossing, axis=1)
+    iBest[BMissed] = np.argmin(np.where(BValid, np.abs(startAhead), np.inf)[BMissed], axis=1)
+    iGates = np.arange(np.size(iGuess))
+    return iSegments[iGates, iBest], t[iGates, iBest], lateral[iGates, iBest]
+
+
+def getGateCrossings(xySamples: NDArrayFloat2D,
+                     sSamples: NDArrayFloat1D,
+                     visitS: NDArrayFloat1D,
+                     gatesMidpoint: NDArrayFloat2D,
+                     gatesDirection: NDArrayFloat2D,
+                     searchWindow: float,
+                     coarseStep: int,
+                     isClosed: bool) -> tuple[NDArrayInt1D, NDArrayFloat1D, NDArrayFloat1D]:
+    """
+    Locates where the sampled trajectory crosses each gate, with no Shapely
+    geometry.
+
+    As the gates are in order along the track, the distance along the
+    trajectory where each gate is expected to be crossed is known, so only the
+    segments within searchWindow of it are searched (see
+    searchGateCrossings()). The search is first done on every coarseStep-th
+    sample, then on the samples within a coarse segment of the coarse
+    crossing, so the wide window is only searched at the coarse resolution.
+
+    Args:
+        xySamples: 2D array of the [x, y] coordinates of the samples.
+        sSamples: 1D array of the cumulative distance of the samples.
+        visitS: 1D array of the expected distance along the samples where each
+            gate is crossed.
+        gatesMidpoint: 2D array of the [x, y] midpoint of each gate.
+        gatesDirection: 2D array of the direction vector of each gate in the
+            direction of forward travel, normalised to a magnitude of 1.
+        searchWindow: Distance either side of the expected crossing to search.
+        coarseStep: Number of samples per segment of the coarse search.
+        isClosed: Whether the samples form a closed loop (the last sample is
+            the first sample again), so the search wraps around.
+
+    Returns:
+        Tuple of (iSegments, t, lateral) 1D arrays with a value for each
+        gate.
+        iSegments is the index of the segment of the crossing.
+        t is the fraction along the segment of the crossing.
+        lateral is the lateral offset of the crossing from the gate midpoint
+        (positive on the left).
+    """
+    # Coarse search, keeping the last sample so the coarse samples cover the whole trajectory
+    iCoarse = np.unique(np.append(np.arange(0, np.size(sSamples), coarseStep), np.size(sSamples) - 1))
+    sCoarse = sSamples[iCoarse]
+    nCoarseSegments = np.size(iCoarse) - 1
+    iGuess = np.clip(np.searchsorted(sCoarse, visitS) - 1, 0, nCoarseSegments - 1)
+    nWindow = min(int(np.ceil(searchWindow * nCoarseSegments / (sCoarse[-1] - sCoarse[0]))), nCoarseSegments)
+    iCoarseSegments, tCoarse, _ = searchGateCrossings(xySamples[iCoarse], iGuess, nWindow, gatesMidpoint, gatesDirection, isClosed)
+
+    # Fine search within a coarse segment either side of the coarse crossing
+    iFineGuess = np.interp(iCoarseSegments + tCoarse, np.arange(np.size(iCoarse)), iCoarse).astype(int)
+    iFineGuess = np.minimum(iFineGuess, np.size(sSamples) - 2)
+    return searchGateCrossings(xySamples, iFineGuess, min(coarseStep, np.size(sSamples) - 1), gatesMidpoint, gatesDirection, isClosed)
+
+
+def getPassedGateIndexes(p: NDArrayFloat1D,
+                         pCrossings: NDArrayFloat1D,
+                         crossingGates: NDArrayInt1D,
+                         isClosed: bool) -> NDArrayInt1D:
+    """
+    Finds the most recently passed gate at each control point value, e.g. for
+    the track z height where the track crosses over itself.
+
+    Args:
+        p: 1D array of the control point values.
+        pCrossings: 1D array of the control point values of the gate crossings
+            in ascending order.
+        crossingGates: 1D array of the gate index of each crossing.
+        isClosed: Whether the trajectory is closed, so the points before the
+            first crossing have passed the last crossing.
+
+    Returns:
+        1D array of the index of the most recently passed gate at each control
+        point value.
+    """
+    iCrossings = np.searchsorted(pCrossings, p, side='right') - 1
+    if isClosed:
+        return crossingGates[iCrossings]
+    return np.where(iCrossings >= 0, crossingGates[np.maximum(iCrossings, 0)], max(crossingGates[0] - 1, 0))
+
+
+def getLimitsOvershoot(lateral: NDArrayFloat1D,
+                       leftWidths: NDArrayFloat1D,
+                       rightWidths: NDArrayFloat1D) -> NDArrayFloat1D:
+    """
+    Calculates the signed lateral overshoot of the track limits at each gate
+    crossing.
+
+    Args:
+        lateral: 1D array of the lateral offset of each crossing from the gate
+            midpoint (positive on the left).
+        leftWidths: 1D array of the distance from each gate midpoint to the
+            left limits.
+        rightWidths: 1D array of the distance from each gate midpoint to the
+            right limits.
+
+    Returns:
+        1D array of the distance outside the limits (positive), or the negative
+        distance to the closest limits if inside them.
+    """
+    return np.maximum(lateral - leftWidths, -lateral - rightWidths)
+
+
+def getViolatedArea(S: NDArrayFloat1D,
+                    overshoots: NDArrayFloat1D,
+                    sLap: float | None = None) -> float:
+    """
+    Calculates the area outside the track limits, as the exact integral over
+    distance of the positive part of the overshoot linearly interpolated
+    between the gate crossings. This is continuous in the overshoots, unlike
+    counting the gates outside the limits.
+
+    Args:
+        S: 1D array of the distance of each gate crossing in ascending order.
+        overshoots: 1D array of the signed lateral overshoot at each crossing.
+        sLap: Lap distance if the trajectory is closed, so the area between the
+            last and first crossings is included. None if not closed.
+
+    Returns:
+        Area outside the track limits.
+    """
+    return getViolatedAreaGradient(S, overshoots, sLap)[0]
+
+
+def getViolatedAreaGradient(S: NDArrayFloat1D,
+                            overshoots: NDArrayFloat1D,
+                            sLap: float | None = None) -> tuple[float, NDArrayFloat1D, NDArrayFloat1D, float]:
+    """
+    Calculates the area outside the track limits (see getViolatedArea()) and
+    its partial derivatives with respect to the distances and overshoots of
+    the gate crossings.
+
+    Args:
+        S: 1D array of the distance of each gate crossing in ascending order.
+        overshoots: 1D array of the signed lateral overshoot at each crossing.
+        sLap: Lap distance if the trajectory is closed, so the area between the
+            last and first crossings is included. None if not closed.
+
+    Returns:
+        Tuple of (area, dArea_dS, dArea_dOvershoots, dArea_dsLap) where the
+        derivatives with respect to S and the overshoots are 1D arrays of the
+        derivative for each crossing, and dArea_dsLap is 0 if not closed.
+    """
+    nCrossings = np.size(S)
+    if sLap is not None:
+        S = np.append(S, S[0] + sLap)
+        overshoots = np.append(overshoots, overshoots[0])
+    startOvershoots = overshoots[:-1]
+    endOvershoots = overshoots[1:]
+    sDeltas = np.diff(S)
+
+    # Area per distance between each pair of crossings - trapezium where both ends are outside, triangle where only one end is outside
+    BBothOutside = (startOvershoots > 0) & (endOvershoots > 0)
+    maxOvershoots = np.maximum(startOvershoots, endOvershoots)
+    minOvershoots = np.minimum(startOvershoots, endOvershoots)
+    BOneOutside = (maxOvershoots > 0) & ~BBothOutside
+    overshootDeltas = np.where(BOneOutside, maxOvershoots - minOvershoots, 1)
+    meanAreas = np.where(BBothOutside, (startOvershoots + endOvershoots) / 2, np.where(BOneOutside, maxOvershoots ** 2 / (2 * overshootDeltas), 0))
+    area = float(np.sum(meanAreas * sDeltas))
+
+    # Derivatives of the area between each pair of crossings with respect to its end overshoots and distance
+    dMax = np.where(BOneOutside, maxOvershoots * (maxOvershoots - 2 * minOvershoots) / (2 * overshootDeltas ** 2), 0)
+    dMin = np.where(BOneOutside, maxOvershoots ** 2 / (2 * overshootDeltas ** 2), 0)
+    BStartMax = startOvershoots >= endOvershoots
+    dStart = np.where(BBothOutside, 0.5, np.where(BStartMax, dMax, dMin)) * sDeltas
+    dEnd = np.where(BBothOutside, 0.5, np.where(BStartMax, dMin, dMax)) * sDeltas
+
+    # Sum the derivatives for each crossing, with the lap distance end of a closed trajectory wrapping to the first crossing
+    dArea_dOvershoots = np.zeros(np.size(S))
+    dArea_dOvershoots[:-1] += dStart
+    dArea_dOvershoots[1:] += dEnd
+    dArea_dS = np.zeros(np.size(S))
+    dArea_dS[:-1] -= meanAreas
+    dArea_dS[1:] += meanAreas
+    dArea_dsLap = 0.0
+    if sLap is not None:
+        dArea_dOvershoots[0] += dArea_dOvershoots[-1]
+        dArea_dS[0] += dArea_dS[-1]
+        dArea_dsLap = float(dArea_dS[-1])
+    return area, dArea_dS[:nCrossings], dArea_dOvershoots[:nCrossings], dArea_dsLap
+
+
+def getDistanceGradient(pSamples: NDArrayFloat1D,
+                        iSegments: NDArrayInt1D,
+                        t: NDArrayFloat1D,
+                        dObj_dS: NDArrayFloat1D,
+                        dObj_dsTotal: float = 0) -> NDArrayFloat1D:
+    """
+    Back-propagates the derivatives of an objective with respect to the
+    distances of points along the samples to the speed |dxy/dp| of each
+    sample, where the distances are the trapezoidal integral of the speed
+    from the first sample.
+
+    Args:
+        pSamples: 1D array of the control point values of the samples.
+        iSegments: 1D array of the segment index of each point.
+        t: 1D array of the fraction along its segment of each point.
+        dObj_dS: 1D array of the derivative of the objective with respect to
+            the distance of each point.
+        dObj_dsTotal: Derivative of the objective with respect to the total
+            distance of the samples.
+
+    Returns:
+        1D array of the derivative of the objective with respect to the speed
+        of each sample.
+    """
+    # Derivative with respect to the length of each segment - the segments before each point, and the fraction of the segment of the point
+    nSegments = np.size(pSamples) - 1
+    segmentSums = np.bincount(iSegments, dObj_dS, minlength=nSegments)
+    dObj_dLengths = np.sum(dObj_dS) - np.cumsum(segmentSums) + np.bincount(iSegments, dObj_dS * t, minlength=nSegments) + dObj_dsTotal
+
+    # Each segment length is the mean speed of its samples multiplied by its change in control point value
+    halfSteps = np.diff(pSamples) / 2
+    dObj_dSpeeds = np.zeros(np.size(pSamples))
+    dObj_dSpeeds[:-1] += dObj_dLengths * halfSteps
+    dObj_dSpeeds[1:] += dObj_dLengths * halfSteps
+    return dObj_dSpeeds
+
+
+def checkTrajectoryArgs(trajType: str,
+                        sDelta: float) -> None:
+    """
+    Checks that the trajectory type and discretisation step of a trajectory
+    (or batch of trajectories) are valid, raising an exception if not.
+
+    Args:
+        trajType: Trajectory type.
+        sDelta: Desired discretisation step distance.
+    """
+    if trajType not in TRAJ_TYPES:
+        raise Exception("\'" + trajType + "\' is not a valid trajectory type. Valid trajectory types are " + str(TRAJ_TYPES))
+    if sDelta <= 0:
+        raise Exception("Invalid sDelta " + str(sDelta) + " - must be positive")
+
+
+def getClosedCP(trajType: str,
+                CP: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Closes the control points if the trajectory type is 'Closed Circuit' (i.e.
+    last control point == first control point), so the spline is periodic.
+
+    Args:
+        trajType: Trajectory type.
+        CP: Array of shape (..., nCP, 2) of the [x, y] control points of one
+            or more trajectories.
+
+    Returns:
+        Tuple of (CP, uniqueCP) of the (closed) control points and the control
+        points without the repeated last control point of a closed trajectory.
+    """
+    if trajType != 'Closed Circuit':
+        return CP, CP
+    if not np.array_equal(CP[..., 0, :], CP[..., -1, :]):
+        CP = np.concatenate((CP, CP[..., :1, :]), axis=-2)
+    return CP, CP[..., :-1, :]
+
+
+def getGateP(track: Track,
+             gateIndex: int,
+             pSamples: NDArrayFloat1D,
+             xySamples: NDArrayFloat2D,
+             dxySamples: NDArrayFloat2D,
+             pMin: float,
+             BUseClosest: bool) -> float:
+    """
+    Finds the control point value where the trajectory first crosses a track
+    gate forwards after pMin.
+
+    If the trajectory doesn't cross the gate within its extend widths and
+    BUseClosest is True, the sample closest to the gate midpoint that's
+    travelling forwards through the gate is used instead.
+
+    Args:
+        track: Track object of the trajectory.
+        gateIndex: Index of the gate in the track.
+        pSamples: 1D array of the control point values of the samples.
+        xySamples: 2D array of the [x, y] coordinates of the samples.
+        dxySamples: 2D array of the derivatives of the [x, y] coordinates of
+            the samples with respect to the control point value.
+        pMin: Control point value after which to find the crossing.
+        BUseClosest: Whether to use the closest sample to the gate if the
+            trajectory doesn't cross it, otherwise an exception is raised.
+
+    Returns:
+        Control point value at the gate.
+    """
+    gateMidpoint = track.gatesMidpoint[gateIndex]
+    gateDirection = track.gatesDirection[gateIndex]
+    crossings = getLineCrossings(pSamples, xySamples, gateMidpoint, gateDirection, track.leftExtendWidths[gateIndex],
+                                 track.rightExtendWidths[gateIndex])
+    crossings = crossings[crossings > pMin]
+    if np.size(crossings) > 0:
+        return float(crossings[0])
+
+    # Handling for the trajectory spline not intersecting the gate
+    if not BUseClosest:
+        raise Exception("Trajectory doesn't cross gate " + str(gateIndex) + " after the start line")
+    BForwards = (dxySamples @ gateDirection > DIRECTION_SIMILARITY_THRESHOLD * np.linalg.norm(dxySamples, axis=1)) & (pSamples > pMin)
+    if not np.any(BForwards):
+        raise Exception("Trajectory doesn't travel forwards through gate " + str(gateIndex))
+    iClosest = np.flatnonzero(BForwards)[np.argmin(np.linalg.norm(xySamples[BForwards] - gateMidpoint, axis=1))]
+    LOGGER.warning("Trajectory doesn't cross gate %d - using the closest point to the gate midpoint at p = %.3f", gateIndex, pSamples[iClosest])
+    return float(pSamples[iClosest])
+
+
+def getStartFinishP(trajType: str,
+                    track: Track,
+                    pSamples: NDArrayFloat1D,
+                    xySamples: NDArrayFloat2D,
+                    dxySamples: NDArrayFloat2D) -> tuple[float, float]:
+    """
+    Finds the control point values of the start and finish lines of a sampled
+    trajectory - the first forwards crossing of the start line, and the first
+    forwards crossing of the finish line after it (the same as the start line
+    for a 'Closed Circuit' trajectory).
+
+    Args:
+        trajType: Trajectory type.
+        track: Track object of the trajectory.
+        pSamples: 1D array of the control point values of the samples.
+        xySamples: 2D array of the [x, y] coordinates of the samples.
+        dxySamples: 2D array of the derivatives of the [x, y] coordinates of
+            the samples with respect to the control point value.
+
+    Returns:
+        Tuple of (pStart, pFinish).
+    """
+    pStart = getGateP(track, track.startGateIndex, pSamples, xySamples, dxySamples, -1, True)
+    if trajType == 'Closed Circuit':
+        return pStart, pStart
+    return pStart, getGateP(track, track.finishGateIndex, pSamples, xySamples, dxySamples, pStart, False)
+
+
+def getGateVisits(trajType: str,
+                  track: Track,
+                  sStart: float,
+                  sFinish: float,
+                  sLast: float) -> tuple[NDArrayInt1D, NDArrayFloat1D]:
+    """
+    Finds the gates the trajectory passes through and the distance along it
+    where each is expected to be crossed, by scaling the distance along the
+    gate midpoints from the start gate to match the trajectory distance from
+    the start line to the finish line.
+
+    Gates of a closed track can be visited more than once, e.g. the run up
+    and the end of the lap of a 'Single Lap' trajectory.
+
+    Args:
+        trajType: Trajectory type.
+        track: Track object of the trajectory.
+        sStart: Distance along the trajectory of the start line.
+        sFinish: Distance along the trajectory of the finish line.
+        sLast: Distance along the trajectory of its end.
+
+    Returns:
+        Tuple of (visitGates, visitS) of the gate index of each visit and the
+        expected distance along the trajectory of the visit.
+    """
+    # Distance along the gate midpoints from the start gate
+    gateDists = np.concat(([0], np.cumsum(np.linalg.norm(np.diff(track.gatesMidpoint, axis=0), axis=1))))
+    gateDists -= gateDists[track.startGateIndex]
+    if track.isClosed:
+        trackLap = gateDists[-1] - gateDists[0] + np.linalg.norm(track.gatesMidpoint[0] - track.gatesMidpoint[-1])
+        gateDists %= trackLap
+    elif trajType == 'Closed Circuit':
+        raise Exception("\'Closed Circuit\' trajectories can only be created on closed tracks")
+
+    if trajType == 'Closed Circuit':
+        # Each gate once, wrapped around the lap of the trajectory
+        rScale = sLast / trackLap
+        return np.arange(len(track.gatesMidpoint)), (sStart + gateDists * rScale) % sLast
+
+    trackDist = gateDists[track.finishGateIndex]
+    if track.isClosed and trackDist <= 0:
+        trackDist += trackLap
+    rScale = (sFinish - sStart) / max(trackDist, 1e-9)
+    if track.isClosed:
+        # Repeat the gates for each lap the trajectory covers
+        nLapsBefore = int(np.ceil(sStart / rScale / trackLap))
+        nLapsAfter = int(np.ceil((sLast - sStart) / rScale / trackLap))
+        gateDists = np.concat([gateDists + iLap * trackLap for iLap in range(-nLapsBefore, nLapsAfter + 1)])
+    visitGates = np.arange(np.size(gateDists)) % len(track.gatesMidpoint)
+    visitS = sStart + gateDists * rScale
+    BOnTrajectory = (visitS >= 0) & (visitS <= sLast)
+    return visitGates[BOnTrajectory], visitS[BOnTrajectory]
+
+
+def getSampleGateCrossings(trajType: str,
+                           track: Track,
+                           pSamples: NDArrayFloat1D,
+                           xySamples: NDArrayFloat2D,
+                           s2DSamples: NDArrayFloat1D,
+                           pStart: float,
+                           pFinish: float) -> tuple[NDArrayInt1D, NDArrayInt1D, NDArrayFloat1D, NDArrayFloat1D]:
+    """
+    Finds where a sampled trajectory crosses each gate it passes, from where
+    each gate is expected to be crossed along the planar distance of the
+    samples (see getGateVisits() and getGateCrossings()).
+
+    Args:
+        trajType: Trajectory type.
+        track: Track object of the trajectory.
+        pSamples: 1D array of the control point values of the samples.
+        xySamples: 2D array of the [x, y] coordinates of the samples.
+        s2DSamples: 1D array of the cumulative planar distance of the samples.
+        pStart: Control point value of the start line.
+        pFinish: Control point value of the finish line.
+
+    Returns:
+        Tuple of (crossingGates, crossingSegments, crossingLateral, pCrossings)
+        in order along the samples, of the gate index of each crossing, the
+        index of the segment of the samples crossing it, the lateral offset of
+        the crossing from the gate midpoint and the control point value of the
+        crossing.
+    """
+    crossingGates, visitS = getGateVisits(trajType, track, *np.interp([pStart, pFinish], pSamples, s2DSamples), s2DSamples[-1])
+    with profiling.timer('trajTrackLimits'):
+        crossingSegments, crossingT, crossingLateral = getGateCrossings(xySamples, s2DSamples, visitS, track.gatesMidpoint[crossingGates],
+                                                                        track.gatesDirection[crossingGates], TRACK_LIMITS_SEARCH_WINDOW, P_SAMPLES_PER_CP,
+                                                                        trajType == 'Closed Circuit')
+    crossingOrder = np.argsort(crossingSegments + crossingT)
+    crossingSegments = crossingSegments[crossingOrder]
+    pCrossings = pSamples[crossingSegments] + crossingT[crossingOrder] * np.diff(pSamples)[crossingSegments]
+    return crossingGates[crossingOrder], crossingSegments, crossingLateral[crossingOrder], pCrossings
+
+
+def getSampleDistances(pSamples: NDArrayFloat1D,
+                       dxySamplesNorm: np.ndarray,
+                       zSamples: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Calculates the ds/dp (rate of change of distance with control point value)
+    and cumulative distance of the dense samples of one or more trajectories,
+    along the last axis.
+
+    ds/dp includes the rate of change of the track z height so distance is
+    always longitudinal to the trajectory even for steep up/downhill. The
+    cumulative distance integrates ds/dp with respect to p (Simpson's rule),
+    made non-decreasing so it can be inverted with np.interp.
+
+    Args:
+        pSamples: 1D array of the control point values of the samples.
+        dxySamplesNorm: Array of the norm of the derivative of the [x, y]
+            coordinates of the samples with respect to the control point value.
+        zSamples: Array of the track z height of the samples, the same shape
+            as dxySamplesNorm.
+
+    Returns:
+        Tuple of (dzSamples, dsdpSamples, sSamples) of the derivative of the z
+        height with respect to the control point value, ds/dp and the
+        cumulative distance of the samples.
+    """
+    dzSamples = np.gradient(zSamples, pSamples, axis=-1)
+    dsdpSamples = np.sqrt(dxySamplesNorm ** 2 + dzSamples ** 2)
+    sSamples = np.maximum.accumulate(scipy.integrate.cumulative_simpson(dsdpSamples, x=pSamples, axis=-1, initial=0), axis=-1)
+    return dzSamples, dsdpSamples, sSamples
+
+
+def getDiscretisation(trajType: str,
+                      pSamples: NDArrayFloat1D,
+                      sSamples: NDArrayFloat1D,
+                      pStart: float,
+                      pFinish: float,
+                      sDelta: float) -> tuple[float, float, NDArrayFloat1D, NDArrayFloat1D]:
+    """
+    Discretises a sampled trajectory with discretisation step as close to
+    sDelta as possible, so there is a whole number of steps from the start
+    line to the finish line and S is 0 at the start line.
+
+    'Closed Circuit' trajectories have one lap of points from the start line,
+    excluding the finish point as it's the start point again. Other trajectory
+    types have points along the whole spline, with negative distances before
+    the start line and distances beyond sTotal after the finish line.
+
+    Args:
+        trajType: Trajectory type.
+        pSamples: 1D array of the control point values of the samples.
+        sSamples: 1D array of the non-decreasing cumulative distance of the
+            samples.
+        pStart: Control point value of the start line.
+        pFinish: Control point value of the finish line.
+        sDelta: Desired discretisation step distance.
+
+    Returns:
+        Tuple of (sTotal, sDelta, S, P) of the distance from the start line to
+        the finish line, the adjusted discretisation step, and the distance
+        from the start line and control point value of each point.
+    """
+    # Calculate total distance from start gate to finish gate
+    sStart, sFinish = np.interp([pStart, pFinish], pSamples, sSamples)
+    if trajType == 'Closed Circuit':
+        sTotal = sSamples[-1]
+    else:
+        sTotal = sFinish - sStart
+        if sTotal <= 0:
+            raise Exception("Trajectory crosses the finish line " + str(pFinish) + " before the start line " + str(pStart))
+
+    nSteps = max(int(np.round(sTotal / sDelta)), 1)
+    sDelta = sTotal / nSteps
+    if trajType == 'Closed Circuit':
+        # Distances are wrapped around the lap
+        S = np.arange(nSteps) * sDelta
+        return sTotal, sDelta, S, np.interp((S + sStart) % sTotal, sSamples, pSamples)
+    kFirst = int(np.ceil((sSamples[0] - sStart) / sDelta - 1e-9))
+    kLast = max(int(np.floor((sSamples[-1] - sStart) / sDelta + 1e-9)), nSteps)
+    S = np.arange(kFirst, kLast + 1) * sDelta
+    return sTotal, sDelta, S, np.interp(S + sStart, sSamples, pSamples)
+
+
+def getTrackLimits(trajType: str,
+                   track: Track,
+                   pSamples: NDArrayFloat1D,
+                   sSamples: NDArrayFloat1D,
+                   pStart: float,
+                   sTotal: float,
+                   crossingGates: NDArrayInt1D,
+                   crossingSegments: NDArrayInt1D,
+                   crossingLateral: NDArrayFloat1D,
+                   pCrossings: NDArrayFloat1D) -> tuple[NDArrayInt1D, NDArrayInt1D, NDArrayFloat1D, NDArrayFloat1D, NDArrayFloat1D]:
+    """
+    Finds the signed lateral overshoot of the limits and extend limits at each
+    gate crossing of a sampled trajectory, in order of distance from the start
+    line.
+
+    Args:
+        trajType: Trajectory type. The distances of a 'Closed Circuit'
+            trajectory are wrapped around the lap.
+        track: Track object of the trajectory.
+        pSamples: 1D array of the control point values of the samples.
+        sSamples: 1D array of the cumulative distance of the samples.
+        pStart: Control point value of the start line.
+        sTotal: Distance from the start line to the finish line.
+        crossingGates: 1D array of the gate index of each crossing.
+        crossingSegments: 1D array of the index of the segment of the samples
+            crossing each gate.
+        crossingLateral: 1D array of the lateral offset of each crossing from
+            the gate midpoint.
+        pCrossings: 1D array of the control point value of each crossing.
+
+    Returns:
+        Tuple of (limitsGateIndexes, limitsSegments, limitsS, limitsOvershoot,
+        limitsExtendOvershoot) ordered by the distance from the start line.
+    """
+    limitsS = np.interp(pCrossings, pSamples, sSamples) - np.interp(pStart, pSamples, sSamples)
+    if trajType == 'Closed Circuit':
+        limitsS %= sTotal
+    limitsOrder = np.argsort(limitsS)
+    limitsGateIndexes = crossingGates[limitsOrder]
+    limitsOvershoot = getLimitsOvershoot(crossingLateral[limitsOrder], track.leftWidths[limitsGateIndexes], track.rightWidths[limitsGateIndexes])
+    limitsExtendOvershoot = getLimitsOvershoot(crossingLateral[limitsOrder], track.leftExtendWidths[limitsGateIndexes],
+                                               track.rightExtendWidths[limitsGateIndexes])
+    return limitsGateIndexes, crossingSegments[limitsOrder], limitsS[limitsOrder], limitsOvershoot, limitsExtendOvershoot
+
+
+def getLimitsViolation(trajType: str,
+                       S: NDArrayFloat1D,
+                       sTotal: float,
+                       limitsS: NDArrayFloat1D,
+                       limitsOvershoot: NDArrayFloat1D,
+                       limitsExtendOvershoot: NDArrayFloat1D) -> tuple[float, float, NDArrayBool1D]:
+    """
+    Calculates the area outside the track limits and extend limits of a
+    trajectory (see getViolatedArea()), and whether each of its points is
+    within the track limits.
+
+    Args:
+        trajType: Trajectory type. The limits of a 'Closed Circuit' trajectory
+            wrap around the lap.
+        S: 1D array of the distance from the start line of the points.
+        sTotal: Distance from the start line to the finish line.
+        limitsS: 1D array of the distance from the start line of the gate
+            crossings, in order (see getTrackLimits()).
+        limitsOvershoot: 1D array of the overshoot of the limits at each
+            crossing.
+        limitsExtendOvershoot: 1D array of the overshoot of the extend limits
+            at each crossing.
+
+    Returns:
+        Tuple of (areaInvalid, areaExtendInvalid, valid).
+    """
+    sLap = sTotal if trajType == 'Closed Circuit' else None
+    areaInvalid = getViolatedArea(limitsS, limitsOvershoot, sLap)
+    areaExtendInvalid = getViolatedArea(limitsS, limitsExtendOvershoot, sLap)
+    valid = np.interp(S, limitsS, limitsOvershoot, period=sLap) <= 0
+    return areaInvalid, areaExtendInvalid, valid
+
+
+def trajectoryObjective(CPFlat: NDArrayFloat1D,
+                        trajType: str,
+                        track: Track,
+                        sDelta: float,
+                        degree: int = 3,
+                        proxy: str = 'LapTime',
+                        limitsWeight: float = LIMITS_PENALTY_WEIGHT,
+                        limitsExtendWeight: float = LIMITS_EXTEND_PENALTY_WEIGHT) -> tuple[float, NDArrayFloat1D]:
+    """
+    Objective function of the trajectory control points and its gradient, in
+    the form for SciPy minimize with jac=True, e.g.
+
+        scipy.optimize.minimize(trajectoryObjective, CP.ravel(), args=('Closed Circuit', track, 1), jac=True, method='L-BFGS-B')
+
+    Args:
+        CPFlat: 1D array of the flattened [x, y] control points.
+        trajType: Trajectory type.
+        track: Track object that the trajectory is made for.
+        sDelta: Desired discretisation step distance.
+        degree: B-spline degree of the trajectory.
+        proxy: Lap time proxy to minimise, 'LapTime' or 'Length' (see
+            Trajectory.getGradients()).
+        limitsWeight: Weight of the area outside the track limits.
+        limitsExtendWeight: Weight of the area outside the extend limits.
+
+    Returns:
+        Tuple of (objective, gradient) where gradient is the same shape as
+        CPFlat.
+    """
+    if proxy not in ('LapTime', 'Length'):
+        raise Exception("Invalid proxy " + str(proxy) + " - must be 'LapTime' or 'Length'")
+    gradients = Trajectory(trajType, track, np.reshape(CPFlat, (-1, 2)), sDelta, degree).getGradients()
+    objective = 0.0
+    gradient = np.zeros((np.size(CPFlat) // 2, 2))
+    for key, weight in ((proxy, 1), ('LimitsArea', limitsWeight), ('LimitsExtendArea', limitsExtendWeight)):
+        objective += weight * gradients[key][0]
+        gradient += weight * gradients[key][1]
+    return objective, gradient.ravel()
+
 
 class Trajectory:
     def __init__(self,
@@ -25,46 +979,394 @@ class Trajectory:
                  CP: list[list[float]] | NDArrayFloat2D,
                  sDelta: float,
                  degree: int = 3) -> None:
-        # Check that trajectory type is valid and finishGate is passed if required
-        allowedTypes = ['Closed Circuit', 'Point to Point', 'Point to Point with Run Up', 'Single Lap']
-        if trajType in allowedTypes:
-            self.trajType = trajType
-        else:
-            raise Exception("\'" + trajType + "\' is not a valid trajectory type. Valid trajectory types are " + str(allowedTypes))
+        # Check that trajectory type and sDelta are valid
+        checkTrajectoryArgs(trajType, sDelta)
+        self.trajType = trajType
 
         # Convert control points coordinate list/array to NumPy array
-        CP = np.array(CP)
-        self.CP = CP.copy
+        CP = np.array(CP, dtype=float)
+        self.CP = CP.copy()
 
         # If the trajectory type is 'Closed Circuit', make the trajectory spline periodic and closed
-        if trajType == 'Closed Circuit':
-            bc_type = 'periodic'
-            if not np.array_equal(CP[0], CP[-1]):
-                CP = np.vstack((CP, CP[0]))
-        else:
-            bc_type = None
+        CP, uniqueCP = getClosedCP(trajType, CP)
 
-        # Create trajectory spline object
-        nCP = np.arange(len(CP))
-        self.spline = scipy.interpolate.make_interp_spline(nCP, CP, k=degree, bc_type=bc_type)
+        # Create trajectory spline object from the cached basis of this number of control points, degree and trajectory type, which is the same
+        # spline as interpolating the control points with make_interp_spline()
+        pMax = len(CP) - 1
+        pSamples = np.linspace(0, pMax, P_SAMPLES_PER_CP * pMax + 1)
+        knots, cardinalCoefficients, basisMatrices = getSplineBasis(len(CP), degree, trajType, np.size(pSamples))
+        self.spline = scipy.interpolate.BSpline.construct_fast(knots, cardinalCoefficients @ uniqueCP, degree,
+                                                               extrapolate='periodic' if trajType == 'Closed Circuit' else True)
+        self.track = track
 
-        # Calculate the ds/dp array (rate of change of distance with control point value) - idk if this is compatible https://stackoverflow.com/a/2184220
-        # and find the pStart and pFinish (control point values at the start and finish gate - these will be done by start/finish gate intersections
-        # and if there are multiple intersections then choose the one that is closest to the gateMidpoint and with the direction dot product closest to 1)
-        # NOTE: this will need to consider the track z height so that distance is always longitudinal to the trajectory even for steep up/downhill
-        #       possibly make another array that's dz/ds at 0.1m intervals of s or something idk then interpolate on that for the actual trajectory z
+        # Sample the spline and its derivatives on a dense grid of control point values
+        self.pSamples = pSamples
+        with profiling.timer('trajSplineSampling'):
+            xySamples, dxySamples = (basisMatrix @ self.spline.c for basisMatrix in basisMatrices[:2])
 
-        # Handling for the trajectory spline not intersecting the start or finish gates
+        # Find the pStart and pFinish (control point values at the start and finish gates) and where the samples cross each gate
+        self.pStart, self.pFinish = getStartFinishP(trajType, track, pSamples, xySamples, dxySamples)
+        dxySamplesNorm = np.linalg.norm(dxySamples, axis=1)
+        s2DSamples = scipy.integrate.cumulative_simpson(dxySamplesNorm, x=pSamples, initial=0)
+        crossingGates, crossingSegments, crossingLateral, pCrossings = getSampleGateCrossings(trajType, track, pSamples, xySamples, s2DSamples,
+                                                                                              self.pStart, self.pFinish)
 
-        # Calculate cumulative distance along the pSamples array by integrating ds/dp with respect to p
+        # Track z height of the samples, using the most recently passed gate so it's correct where the track crosses over itself
+        zSamples = track.getZArray(xySamples, getPassedGateIndexes(pSamples, pCrossings, crossingGates, trajType == 'Closed Circuit'))
 
-        # Calculate total distance from start gate to finish gate, offset cumulative distance array so it's 0 at the start line
-        # and wrap distances if the trajectory is 'Closed Circuit'
+        # Calculate the ds/dp array (rate of change of distance with control point value) and cumulative distance along the pSamples array
+        dzSamples, dsdpSamples, sSamples = getSampleDistances(pSamples, dxySamplesNorm, zSamples)
 
         # Discretise the trajectory spline with discretisation step as close to sDelta as possible
+        self.sTotal, self.sDelta, self.S, self.P = getDiscretisation(trajType, pSamples, sSamples, self.pStart, self.pFinish, sDelta)
+
+        # Evaluate the spline and its derivatives at the trajectory points
+        with profiling.timer('trajSplineSampling'):
+            xy, dxy, ddxy = getSplineDerivatives(self.spline, self.P, 2)
+        dxyNorm = np.linalg.norm(dxy, axis=1)
+        self.direction = dxy / dxyNorm[:, np.newaxis]
+        self.gateIndexes = getPassedGateIndexes(self.P, pCrossings, crossingGates, trajType == 'Closed Circuit')
+
+        # Calculate track z height and camber, sampling the track either side of the trajectory in the same call
+        # (camber is positive when the track is banked for a left hand corner, i.e. the left side is lower)
+        leftNormals = np.column_stack((-self.direction[:, 1], self.direction[:, 0])) * CAMBER_SAMPLE_OFFSET
+        nPoints = np.size(self.P)
+        zPoints = track.getZArray(np.vstack((xy, xy + leftNormals, xy - leftNormals)), np.tile(self.gateIndexes, 3))
+        self.XYZ = np.column_stack((xy, zPoints[:nPoints]))
+        self.camber = np.arctan2(zPoints[2 * nPoints:] - zPoints[nPoints:2 * nPoints], 2 * CAMBER_SAMPLE_OFFSET)
+
+        # Calculate trajectory slope (positive uphill) and its rate of change with distance from the dense samples, and the curvature (2D
+        # curvature in the xy plane) analytically from the spline derivatives
+        slopeSamples = np.arctan2(dzSamples, dxySamplesNorm)
+        self.slope = np.interp(self.P, pSamples, slopeSamples)
+        self.dSlope_ds = np.interp(self.P, pSamples, np.gradient(slopeSamples, pSamples) / dsdpSamples)
+        self.curvature = getSignedCurvature(dxy, ddxy)
+
+        # Track limits - signed lateral overshoot of the limits and extend limits at each gate crossing, in order of distance, and the area
+        # outside them, which are all continuous in the control points unlike counting the gates outside the limits
+        (self.limitsGateIndexes, self.limitsSegments, self.limitsS, self.limitsOvershoot,
+         self.limitsExtendOvershoot) = getTrackLimits(trajType, track, pSamples, sSamples, self.pStart, self.sTotal, crossingGates, crossingSegments,
+                                                      crossingLateral, pCrossings)
+        self.areaInvalid, self.areaExtendInvalid, self.valid = getLimitsViolation(trajType, self.S, self.sTotal, self.limitsS, self.limitsOvershoot,
+                                                                                  self.limitsExtendOvershoot)
+
+        LOGGER.debug("Trajectory discretised - %d points, sTotal %.3f, sDelta %.4f", nPoints, self.sTotal, self.sDelta)
+
+
+    def getGradients(self,
+                     latAccelMax: float = LAP_TIME_PROXY_LAT_ACCEL,
+                     speedMax: float = LAP_TIME_PROXY_MAX_SPEED) -> dict:
+        """
+        Calculates the lap time proxies and track limits penalties of the
+        trajectory and their analytic gradients with respect to the control
+        points, so a gradient based optimiser (e.g. L-BFGS-B) needs one
+        evaluation per step instead of perturbing each control point.
+
+        The spline is linear in its control points, so the samples and their
+        derivatives are fixed sparse basis matrices multiplied by the spline
+        coefficients, which are a fixed matrix multiplied by the control
+        points. The gradients are back-propagated through these matrices.
+
+        All objectives are calculated on the dense spline samples in the xy
+        plane with trapezoidal integration, so they differ slightly from the
+        attributes of the trajectory (e.g. sTotal includes the z height). The
+        segment of the samples crossing each gate is held fixed, which is exact
+        for small changes of the control points.
+
+        Args:
+            latAccelMax: Lateral acceleration limit of the lap time proxy.
+            speedMax: Maximum speed of the lap time proxy.
+
+        Returns:
+            Dictionary of (value, gradient) tuples, where the gradient is an
+            array in the same shape as CP, with the keys:
+            'Length' - Distance from the start line to the finish line.
+            'LapTime' - Integral of 1 / v over distance, where the apex speed
+            v is given by 1 / v^2 = |curvature| / latAccelMax + 1 / speedMax^2.
+            'LimitsArea' - Area outside the track limits.
+            'LimitsExtendArea' - Area outside the extend limits.
+        """
+        # Basis matrices of the samples and the map from the control points to the spline coefficients
+        pSamples = self.pSamples
+        knots, cardinalCoefficients, basisMatrices = getSplineBasis(int(round(pSamples[-1])) + 1, self.spline.k, self.trajType, np.size(pSamples))
+        xy, dxy, ddxy = (basisMatrix @ self.spline.c for basisMatrix in basisMatrices)
+        speeds = np.linalg.norm(dxy, axis=1)
+        unitDxy = dxy / speeds[:, np.newaxis]
+
+        # Trapezoidal weights of the samples between the start and finish lines (the whole lap for 'Closed Circuit')
+        if self.trajType == 'Closed Circuit':
+            segmentSteps = np.diff(pSamples)
+        else:
+            segmentSteps = np.maximum(np.minimum(pSamples[1:], self.pFinish) - np.maximum(pSamples[:-1], self.pStart), 0)
+        weights = np.zeros(np.size(pSamples))
+        weights[:-1] += segmentSteps / 2
+        weights[1:] += segmentSteps / 2
+
+        # Derivatives of the start/finish control point values with respect to the samples either side of the start/finish lines, for the
+        # change in the integrals at their limits (not for 'Closed Circuit' as the whole lap is integrated, or if the line wasn't crossed)
+        lineGradients = []
+        if self.trajType != 'Closed Circuit':
+            for pLine, gateIndex, sign in ((self.pStart, self.track.startGateIndex, -1), (self.pFinish, self.track.finishGateIndex, 1)):
+                iSegment = int(np.clip(np.searchsorted(pSamples, pLine) - 1, 0, np.size(pSamples) - 2))
+                gateDirection = self.track.gatesDirection[gateIndex]
+                a0, a1 = (xy[iSegment:iSegment + 2] - self.track.gatesMidpoint[gateIndex]) @ gateDirection
+                if a0 < 0 <= a1:
+                    pStep = pSamples[iSegment + 1] - pSamples[iSegment]
+                    dp_dXy = np.zeros(np.shape(xy))
+                    dp_dXy[iSegment] = pStep * -a1 / (a0 - a1) ** 2 * gateDirection
+                    dp_dXy[iSegment + 1] = pStep * a0 / (a0 - a1) ** 2 * gateDirection
+                    lineGradients.append((iSegment, sign * dp_dXy))
+
+        def getLineGradient(integrand: NDArrayFloat1D) -> NDArrayFloat2D | None:
+            # Gradient of the integral from the start/finish lines moving, where the integrand is the mean of the segment they're on
+            if not lineGradients:
+                return None
+            return sum((integrand[iSegment] + integrand[iSegment + 1]) / 2 * dp_dXy for iSegment, dp_dXy in lineGradients)
+
+        # Gradients with respect to the samples and their first and second derivatives, for each objective
+        objectives = {}
+        length = float(np.sum(weights * speeds))
+        objectives['Length'] = (length, (getLineGradient(speeds), weights[:, np.newaxis] * unitDxy, None))
+
+        # Lap time proxy - the smoothed |curvature| and apex speed are differentiable everywhere
+        cross = dxy[:, 0] * ddxy[:, 1] - dxy[:, 1] * ddxy[:, 0]
+        curvature = cross / speeds ** 3
+        smoothCurvature = np.sqrt(curvature ** 2 + LAP_TIME_PROXY_CURVATURE_SMOOTHING ** 2)
+        inverseSpeeds = np.sqrt(smoothCurvature / latAccelMax + 1 / speedMax ** 2)
+        lapTime = float(np.sum(weights * speeds * inverseSpeeds))
+        dInverseSpeed_dCurvature = curvature / (2 * inverseSpeeds * latAccelMax * smoothCurvature)
+        dCurvature_dDxy = (np.column_stack((ddxy[:, 1], -ddxy[:, 0])) / speeds[:, np.newaxis] ** 3
+                           - 3 * (cross / speeds ** 5)[:, np.newaxis] * dxy)
+        dCurvature_dDdxy = np.column_stack((-dxy[:, 1], dxy[:, 0])) / speeds[:, np.newaxis] ** 3
+        dLapTime_dCurvature = weights * speeds * dInverseSpeed_dCurvature
+        objectives['LapTime'] = (lapTime, (getLineGradient(speeds * inverseSpeeds), (weights * inverseSpeeds)[:, np.newaxis] * unitDxy
+                                           + dLapTime_dCurvature[:, np.newaxis] * dCurvature_dDxy,
+                                           dLapTime_dCurvature[:, np.newaxis] * dCurvature_dDdxy))
+
+        # Track limits - lateral offset of each gate crossing, and its derivatives with respect to the signed distances of the ends of its
+        # segment ahead of (a) and to the left of (b) the gate midpoint
+        iSegments = self.limitsSegments
+        gatesMidpoint = self.track.gatesMidpoint[self.limitsGateIndexes]
+        gatesDirection = self.track.gatesDirection[self.limitsGateIndexes]
+        gatesNormal = np.column_stack((-gatesDirection[:, 1], gatesDirection[:, 0]))
+        startOffsets = xy[iSegments] - gatesMidpoint
+        endOffsets = xy[iSegments + 1] - gatesMidpoint
+        a0, a1 = np.sum(startOffsets * gatesDirection, axis=1), np.sum(endOffsets * gatesDirection, axis=1)
+        b0, b1 = np.sum(startOffsets * gatesNormal, axis=1), np.sum(endOffsets * gatesNormal, axis=1)
+        BCrossing = (a0 < 0) & (a1 >= 0)
+        aDeltas = np.where(BCrossing, a0 - a1, 1)
+        t = np.where(BCrossing, a0 / aDeltas, 0)
+        lateral = b0 + t * (b1 - b0)
+        dLateral_da0 = np.where(BCrossing, a1 * (b0 - b1) / aDeltas ** 2, 0)
+        dLateral_da1 = np.where(BCrossing, a0 * (b1 - b0) / aDeltas ** 2, 0)
+        dLateral_db0 = np.where(BCrossing, -a1 / aDeltas, 1)
+        dLateral_db1 = np.where(BCrossing, a0 / aDeltas, 0)
+        dt_da0 = np.where(BCrossing, -a1 / aDeltas ** 2, 0)
+        dt_da1 = np.where(BCrossing, a0 / aDeltas ** 2, 0)
+
+        # Distance of each crossing along the samples, in order along the samples
+        segmentLengths = np.diff(pSamples) * (speeds[:-1] + speeds[1:]) / 2
+        crossingS = np.concat(([0], np.cumsum(segmentLengths)))[iSegments] + t * segmentLengths[iSegments]
+        sOrder = np.argsort(crossingS)
+        sLap = float(np.sum(segmentLengths)) if self.trajType == 'Closed Circuit' else None
+
+        for key, leftWidths, rightWidths in (('LimitsArea', self.track.leftWidths, self.track.rightWidths),
+                                             ('LimitsExtendArea', self.track.leftExtendWidths, self.track.rightExtendWidths)):
+            leftWidths = leftWidths[self.limitsGateIndexes]
+            rightWidths = rightWidths[self.limitsGateIndexes]
+            overshoots = getLimitsOvershoot(lateral, leftWidths, rightWidths)
+            dOvershoot_dLateral = np.where(lateral - leftWidths >= -lateral - rightWidths, 1, -1)
+            area, dArea_dS, dArea_dOvershoots, dArea_dsLap = getViolatedAreaGradient(crossingS[sOrder], overshoots[sOrder], sLap)
+            dArea_dS[sOrder] = dArea_dS.copy()
+            dArea_dOvershoots[sOrder] = dArea_dOvershoots.copy()
+
+            # Back-propagate to the ends of the segments crossing the gates, and the speeds of the samples for the distances
+            dArea_dLateral = dArea_dOvershoots * dOvershoot_dLateral
+            dArea_dt = dArea_dS * segmentLengths[iSegments]
+            dArea_da0 = dArea_dLateral * dLateral_da0 + dArea_dt * dt_da0
+            dArea_da1 = dArea_dLateral * dLateral_da1 + dArea_dt * dt_da1
+            dArea_dXy = np.zeros(np.shape(xy))
+            np.add.at(dArea_dXy, iSegments, dArea_da0[:, np.newaxis] * gatesDirection + (dArea_dLateral * dLateral_db0)[:, np.newaxis] * gatesNormal)
+            np.add.at(dArea_dXy, iSegments + 1, dArea_da1[:, np.newaxis] * gatesDirection + (dArea_dLateral * dLateral_db1)[:, np.newaxis] * gatesNormal)
+            dArea_dSpeeds = getDistanceGradient(pSamples, iSegments, t, dArea_dS, dArea_dsLap)
+            objectives[key] = (area, (dArea_dXy, dArea_dSpeeds[:, np.newaxis] * unitDxy, None))
+
+        # Gradients with respect to the spline coefficients, then the control points
+        gradients = {}
+        for key, (value, sampleGradients) in objectives.items():
+            dCoefficients = sum(basisMatrix.T @ sampleGradient for basisMatrix, sampleGradient in zip(basisMatrices, sampleGradients)
+                                if sampleGradient is not None)
+            dCP = cardinalCoefficients.T @ dCoefficients
+            if np.size(dCP, 0) < np.size(self.CP, 0):
+                # The repeated first control point of a closed trajectory doesn't have its own gradient
+                dCP = np.vstack((dCP, np.zeros((1, 2))))
+            gradients[key] = (value, dCP)
+        return gradients
+
+
+class TrajectoryBatch:
+    """
+    Batch of candidate trajectories of the same type, number of control points
+    and degree on the same track, for population based optimisers (e.g.
+    differential evolution, particle swarm) which evaluate many sets of control
+    points at once.
+
+    The spline coefficients and dense samples of all the candidates come from
+    the shared cached basis (see getSplineBasis()) with one sparse matrix
+    product per derivative, and the track z height lookups of all the
+    candidates are done together. The candidates are evaluated in chunks of at
+    most TRAJECTORY_BATCH_CHUNK_SAMPLES dense samples to bound the memory use.
+
+    Each candidate has the same S, XYZ, curvature, valid, areaInvalid and
+    areaExtendInvalid as a Trajectory of its control points. The candidates
+    have different numbers of points, so the per point arrays are padded to
+    the most points with NaN (False for valid), and nPoints is the number of
+    points of each candidate.
+    """
+    def __init__(self,
+                 trajType: str,
+                 track: Track,
+                 CP: np.ndarray,
+                 sDelta: float,
+                 degree: int = 3,
+                 chunkSize: int | None = None) -> None:
+        """
+        Args:
+            trajType: Trajectory type.
+            track: Track object that the trajectories are made for.
+            CP: 3D array of shape (nCandidates, nCP, 2) of the [x, y] control
+                points of each candidate.
+            sDelta: Desired discretisation step distance.
+            degree: B-spline degree of the trajectories.
+            chunkSize: Number of candidates evaluated at once. Defaults to as
+                many as fit in TRAJECTORY_BATCH_CHUNK_SAMPLES dense samples.
+        """
+        checkTrajectoryArgs(trajType, sDelta)
+        CP = np.array(CP, dtype=float)
+        if np.ndim(CP) != 3 or np.size(CP, 2) != 2:
+            raise Exception("Invalid control points shape " + str(np.shape(CP)) + " - must be (nCandidates, nCP, 2)")
+        self.trajType = trajType
+        self.track = track
+        self.CP = CP.copy()
+
+        # If the trajectory type is 'Closed Circuit', close the control points of every candidate
+        CP, uniqueCP = getClosedCP(trajType, CP)
+
+        # Spline coefficients of all the candidates from the shared basis
+        nCandidates, nCP = np.shape(CP)[:2]
+        pSamples = np.linspace(0, nCP - 1, P_SAMPLES_PER_CP * (nCP - 1) + 1)
+        knots, cardinalCoefficients, basisMatrices = getSplineBasis(nCP, degree, trajType, np.size(pSamples))
+        coefficients = np.einsum('ij,pjk->pik', cardinalCoefficients, uniqueCP)
+
+        # Evaluate the candidates in chunks
+        self.pStart = np.empty(nCandidates)
+        self.pFinish = np.empty(nCandidates)
+        self.sTotal = np.empty(nCandidates)
+        self.sDelta = np.empty(nCandidates)
+        self.areaInvalid = np.empty(nCandidates)
+        self.areaExtendInvalid = np.empty(nCandidates)
+        if chunkSize is None:
+            chunkSize = max(int(TRAJECTORY_BATCH_CHUNK_SAMPLES // np.size(pSamples)), 1)
+        pointArrays = []
+        for iFirst in range(0, nCandidates, chunkSize):
+            with profiling.timer('trajBatchChunk'):
+                pointArrays += self.__evaluateChunk(pSamples, knots, degree, basisMatrices, coefficients[iFirst:iFirst + chunkSize], sDelta, iFirst)
+
+        # Stack the per point arrays of the candidates, padded to the most points
+        self.nPoints = np.array([np.size(S) for S, _, _, _ in pointArrays], dtype=int)
+        nPointsMax = int(np.max(self.nPoints, initial=0))
+        self.S = np.full((nCandidates, nPointsMax), np.nan)
+        self.XYZ = np.full((nCandidates, nPointsMax, 3), np.nan)
+        self.curvature = np.full((nCandidates, nPointsMax), np.nan)
+        self.valid = np.zeros((nCandidates, nPointsMax), dtype=bool)
+        for i, (S, XYZ, curvature, valid) in enumerate(pointArrays):
+            self.S[i, :self.nPoints[i]] = S
+            self.XYZ[i, :self.nPoints[i]] = XYZ
+            self.curvature[i, :self.nPoints[i]] = curvature
+            self.valid[i, :self.nPoints[i]] = valid
+
+        LOGGER.debug("Trajectory batch discretised - %d candidates, up to %d points", nCandidates, nPointsMax)
+
+
+    def __evaluateChunk(self,
+                        pSamples: NDArrayFloat1D,
+                        knots: NDArrayFloat1D,
+                        degree: int,
+                        basisMatrices: list[scipy.sparse.csr_array],
+                        coefficients: np.ndarray,
+                        sDelta: float,
+                        iFirst: int) -> list[tuple[NDArrayFloat1D, NDArrayFloat2D, NDArrayFloat1D, NDArrayBool1D]]:
+        """
+        Internal function to evaluate a chunk of the candidates, following the
+        same steps as Trajectory.__init__() with the spline sampling and track
+        z height lookups done for all the candidates of the chunk at once.
+
+        Args:
+            pSamples: 1D array of the control point values of the samples.
+            knots: 1D array of the knots of the splines.
+            degree: Degree of the splines.
+            basisMatrices: Sparse basis matrices of the samples.
+            coefficients: 3D array of shape (nChunk, nCoefficients, 2) of the
+                spline coefficients of the candidates in the chunk.
+            sDelta: Desired discretisation step distance.
+            iFirst: Index of the first candidate of the chunk in the batch.
+
+        Returns:
+            List of (S, XYZ, curvature, valid) tuples of the points of each
+            candidate of the chunk.
+        """
+        track = self.track
+        BClosed = self.trajType == 'Closed Circuit'
+        nChunk, nCoefficients = np.shape(coefficients)[:2]
+        nSamples = np.size(pSamples)
+
+        # Dense samples of all the candidates, with the coefficients of each candidate as columns of one matrix product per derivative
+        coefficientColumns = np.moveaxis(coefficients, 0, 1).reshape(nCoefficients, 2 * nChunk)
+        with profiling.timer('trajSplineSampling'):
+            xySamples, dxySamples = (np.moveaxis((basisMatrix @ coefficientColumns).reshape(nSamples, nChunk, 2), 1, 0)
+                                     for basisMatrix in basisMatrices[:2])
+        dxySamplesNorm = np.linalg.norm(dxySamples, axis=2)
+        s2DSamples = scipy.integrate.cumulative_simpson(dxySamplesNorm, x=pSamples, axis=1, initial=0)
+
+        # Start/finish lines and gate crossings of each candidate
+        crossings = []
+        for i in range(nChunk):
+            self.pStart[iFirst + i], self.pFinish[iFirst + i] = getStartFinishP(self.trajType, track, pSamples, xySamples[i], dxySamples[i])
+            crossings.append(getSampleGateCrossings(self.trajType, track, pSamples, xySamples[i], s2DSamples[i], self.pStart[iFirst + i],
+                                                    self.pFinish[iFirst + i]))
+
+        # Track z height and cumulative distance of the samples of all the candidates
+        passedGateIndexes = np.concat([getPassedGateIndexes(pSamples, pCrossings, crossingGates, BClosed)
+                                       for crossingGates, _, _, pCrossings in crossings])
+        zSamples = track.getZArray(xySamples.reshape(-1, 2), passedGateIndexes).reshape(nChunk, nSamples)
+        sSamples = getSampleDistances(pSamples, dxySamplesNorm, zSamples)[2]
 
-        # Calculate trajectory slope, dSlope_ds, camber, curvature (probably helps if i calculate trajectory direction vector and normal vector first)
+        # Discretise each candidate
+        discretisations = []
+        for i in range(nChunk):
+            self.sTotal[iFirst + i], self.sDelta[iFirst + i], SCandidate, PCandidate = getDiscretisation(self.trajType, pSamples, sSamples[i],
+                                                                                                       self.pStart[iFirst + i],
+                                                                                                       self.pFinish[iFirst + i], sDelta)
+            discretisations.append((SCandidate, PCandidate))
+        nPoints = np.array([np.size(PCandidate) for _, PCandidate in discretisations])
 
-        # Track limits
+        # Evaluate the splines, track z height and curvature at the points of all the candidates
+        PAll = np.concat([PCandidate for _, PCandidate in discretisations])
+        with profiling.timer('trajSplineSampling'):
+            xy, dxy, ddxy = getBatchSplineDerivatives(knots, degree, coefficients, PAll, np.repeat(np.arange(nChunk), nPoints))
+        gateIndexes = np.concat([getPassedGateIndexes(PCandidate, pCrossings, crossingGates, BClosed)
+                                 for (_, PCandidate), (crossingGates, _, _, pCrossings) in zip(discretisations, crossings)])
+        XYZ = np.column_stack((xy, track.getZArray(xy, gateIndexes)))
+        curvature = getSignedCurvature(dxy, ddxy)
+        splitIndexes = np.cumsum(nPoints)[:-1]
 
-        pass # Trajectory initialised :)
+        # Track limits of each candidate
+        pointArrays = []
+        for i, ((SCandidate, _), XYZCandidate, curvatureCandidate) in enumerate(zip(discretisations, np.split(XYZ, splitIndexes),
+                                                                                   np.split(curvature, splitIndexes))):
+            _, _, limitsS, limitsOvershoot, limitsExtendOvershoot = getTrackLimits(self.trajType, track, pSamples, sSamples[i], self.pStart[iFirst + i],
+                                                                                   self.sTotal[iFirst + i], *crossings[i])
+            self.areaInvalid[iFirst + i], self.areaExtendInvalid[iFirst + i], valid = getLimitsViolation(self.trajType, SCandidate, self.sTotal[iFirst + i],
+                                                                                                         limitsS, limitsOvershoot, limitsExtendOvershoot)
+            pointArrays.append((SCandidate, XYZCandidate, curvatureCandidate, valid))
+        return pointArrays